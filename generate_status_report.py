@@ -1,151 +1,159 @@
 #!/usr/bin/env python3
-"""Generate TipUs client-facing status report PDF — updated 17 Feb 2026."""
-
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.colors import HexColor, white
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import mm, cm
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-    PageBreak, HRFlowable,
-)
-from datetime import datetime
-
-# Brand colors
-CORAL = HexColor("#d4856a")
-CORAL_LIGHT = HexColor("#f5e0d7")
-CORAL_DARK = HexColor("#b06b52")
-DARK_TEXT = HexColor("#1e293b")
-MEDIUM_TEXT = HexColor("#475569")
-LIGHT_TEXT = HexColor("#64748b")
-GREEN = HexColor("#16a34a")
-GREEN_BG = HexColor("#dcfce7")
-AMBER = HexColor("#d97706")
-SURFACE_100 = HexColor("#f1f5f9")
-SURFACE_200 = HexColor("#e2e8f0")
-WHITE = white
-
-
-def build_pdf():
-    output_path = "/Users/mukelakatungu/tipus/TipUs_Status_Report.pdf"
-    doc = SimpleDocTemplate(
-        output_path,
-        pagesize=A4,
-        topMargin=2 * cm,
-        bottomMargin=2 * cm,
-        leftMargin=2.5 * cm,
-        rightMargin=2.5 * cm,
-    )
-
-    width = A4[0] - 5 * cm  # usable width
-    styles = getSampleStyleSheet()
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        "CustomTitle", parent=styles["Title"],
-        fontName="Helvetica-Bold", fontSize=28, textColor=CORAL,
-        spaceAfter=4 * mm, alignment=TA_LEFT,
-    )
-    subtitle_style = ParagraphStyle(
-        "CustomSubtitle", parent=styles["Normal"],
-        fontName="Helvetica", fontSize=12, textColor=MEDIUM_TEXT,
-        spaceAfter=6 * mm,
-    )
-    heading_style = ParagraphStyle(
-        "CustomH2", parent=styles["Heading2"],
-        fontName="Helvetica-Bold", fontSize=16, textColor=CORAL_DARK,
-        spaceBefore=8 * mm, spaceAfter=4 * mm,
-    )
-    subheading_style = ParagraphStyle(
-        "CustomH3", parent=styles["Heading3"],
-        fontName="Helvetica-Bold", fontSize=12, textColor=DARK_TEXT,
-        spaceBefore=4 * mm, spaceAfter=2 * mm,
-    )
-    body_style = ParagraphStyle(
-        "CustomBody", parent=styles["Normal"],
-        fontName="Helvetica", fontSize=10, textColor=DARK_TEXT,
-        leading=15, spaceAfter=3 * mm,
-    )
-    body_light = ParagraphStyle(
-        "BodyLight", parent=body_style,
-        textColor=MEDIUM_TEXT, fontSize=9.5,
-    )
-    check_style = ParagraphStyle(
-        "CheckItem", parent=body_style,
-        leftIndent=5 * mm, spaceAfter=2 * mm, fontSize=10, leading=14,
-    )
-    footer_style = ParagraphStyle(
-        "Footer", parent=styles["Normal"],
-        fontName="Helvetica", fontSize=8, textColor=LIGHT_TEXT,
-        alignment=TA_CENTER,
-    )
-
-    story = []
-    date_str = "17 February 2026"
-
+"""Generate TipUs client-facing status report PDF — updated 17 Feb 2026.
+
+The report is a reports.templates.Template filled from CONTENT. reportlab
+and the style registry are imported inside the functions that build PDFs,
+so --help and --dry-run start without loading them.
+"""
+
+import argparse
+import io
+import os
+from datetime import date
+
+from reports import assets, fonts
+from reports.cache import BuildCache, DEFAULT_CACHE_DIR, content_key, file_digest
+from reports.palettes import DEFAULT_THEME, PALETTES
+from reports.sinks import DirectorySink, sink_for
+from reports.templates import Template, builder_digest, render
+
+OUTPUT_NAME = "TipUs_Status_Report.pdf"
+
+CHECK = '<font color="{color.success}"><b>&#10003;</b></font>  '
+STEP_BODY = '<b>{title}</b><br/><font size="9" color="{color.text_muted}">{desc}</font>'
+
+TEMPLATE = Template("status-report", page={
+    "pagesize": "A4",
+    "topMargin": "2cm",
+    "bottomMargin": "2cm",
+    "leftMargin": "2.5cm",
+    "rightMargin": "2.5cm",
+}, nodes=[
     # ─── COVER / HEADER ───
-    story.append(Spacer(1, 15 * mm))
-    story.append(Paragraph("TipUs", title_style))
-    story.append(Paragraph("Digital Tipping Platform for Australian Hospitality", subtitle_style))
-    story.append(HRFlowable(width=width, thickness=2, color=CORAL, spaceAfter=6 * mm))
-    story.append(Spacer(1, 2 * mm))
-    story.append(Paragraph(
-        f'<font color="{LIGHT_TEXT.hexval()}">Project Status Report  |  {date_str}</font>',
-        body_light,
-    ))
-    story.append(Spacer(1, 8 * mm))
+    ("section", "Cover"),
+    ("spacer", "15mm"),
+    ("paragraph", "status.title", "TipUs"),
+    ("paragraph", "status.subtitle", "Digital Tipping Platform for Australian Hospitality"),
+    ("rule", {"thickness": 2, "color": "primary", "space_after": "6mm"}),
+    ("spacer", "2mm"),
+    ("paragraph", "status.body_light",
+     '<font color="{color.text_light}">Project Status Report  |  {date}</font>'),
+    ("spacer", "8mm"),
 
     # ─── 1. EXECUTIVE SUMMARY ───
-    story.append(Paragraph("1. Executive Summary", heading_style))
-    story.append(Paragraph(
-        "<b>TipUs</b> is a digital tipping platform designed for Australian hospitality venues. "
-        "It allows customers to tip staff by scanning a QR code at a venue, selecting an amount, "
-        "and paying instantly with their card or digital wallet (Apple Pay / Google Pay).",
-        body_style,
-    ))
-    story.append(Paragraph(
-        "All tip money stays on the TipUs platform. Venues never touch money or Stripe directly. "
-        "At payout time, TipUs keeps a 5% platform fee and distributes 95% to employees, "
-        "prorated by their active days in the period. Money goes directly to each employee's "
-        "Australian bank account via Stripe.",
-        body_style,
-    ))
-
-    # Status summary table
-    summary_data = [
-        ["Overall Completion", "~98%"],
-        ["Core Features", "All implemented and tested (10 of 11 phases)"],
-        ["Payment Processing", "Fully working via Stripe (platform-direct model)"],
-        ["Money Flow", "100% stays on TipUs platform until payout"],
-        ["Payout Safety", "Per-employee tracking prevents double-payments"],
-        ["Mode", "Test mode (ready for live switch)"],
-    ]
-    summary_table = Table(summary_data, colWidths=[width * 0.35, width * 0.65])
-    summary_table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (0, -1), CORAL_LIGHT),
-        ("BACKGROUND", (1, 0), (1, -1), SURFACE_100),
-        ("TEXTCOLOR", (0, 0), (-1, -1), DARK_TEXT),
-        ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-        ("FONTNAME", (1, 0), (1, -1), "Helvetica"),
-        ("FONTSIZE", (0, 0), (-1, -1), 10),
-        ("TOPPADDING", (0, 0), (-1, -1), 6),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-        ("LEFTPADDING", (0, 0), (-1, -1), 10),
-        ("GRID", (0, 0), (-1, -1), 0.5, SURFACE_200),
-    ]))
-    story.append(Spacer(1, 2 * mm))
-    story.append(summary_table)
-    story.append(Spacer(1, 6 * mm))
+    ("section", "1. Executive Summary"),
+    ("paragraph", "status.heading", "1. Executive Summary"),
+    ("paragraph", "status.body",
+     "<b>TipUs</b> is a digital tipping platform designed for Australian hospitality venues. "
+     "It allows customers to tip staff by scanning a QR code at a venue, selecting an amount, "
+     "and paying instantly with their card or digital wallet (Apple Pay / Google Pay)."),
+    ("paragraph", "status.body",
+     "All tip money stays on the TipUs platform. Venues never touch money or Stripe directly. "
+     "At payout time, TipUs keeps a 5% platform fee and distributes 95% to employees, "
+     "prorated by their active days in the period. Money goes directly to each employee's "
+     "Australian bank account via Stripe."),
+    ("spacer", "2mm"),
+    ("table", {"rows": "summary", "widths": (0.35, 0.65), "style": "status.summary"}),
+    ("spacer", "6mm"),
 
     # ─── 2. WHAT'S WORKING ───
-    story.append(Paragraph("2. What's Working", heading_style))
-    story.append(Paragraph(
-        "Every core feature has been built, deployed, and tested end-to-end:",
-        body_style,
-    ))
+    ("section", "2. What's Working"),
+    ("paragraph", "status.heading", "2. What's Working"),
+    ("paragraph", "status.body",
+     "Every core feature has been built, deployed, and tested end-to-end:"),
+    ("list", {"items": "features", "fields": ("title", "desc"), "each": [
+        ("status.check", CHECK + "<b>{title}</b> &mdash; {desc}"),
+    ]}),
+    ("page_break",),
+
+    # ─── 3. HOW THE MONEY FLOWS ───
+    ("section", "3. How the Money Flows"),
+    ("paragraph", "status.heading", "3. How the Money Flows"),
+    ("paragraph", "status.body",
+     "TipUs uses a <b>platform-direct</b> model: all tip money stays on the TipUs Stripe "
+     "account. Venues never touch money or need to connect Stripe."),
+    ("spacer", "3mm"),
+    ("steps", {
+        "items": "flow_steps", "fields": ("title", "desc"),
+        "number": ("status.step_num", '<font color="{color.white}" size="14"><b>{n}</b></font>'),
+        "body": ("status.body", STEP_BODY),
+        "widths": ("12mm", "-14mm"), "style": "status.flow_step", "gap": "2mm",
+    }),
+    ("spacer", "4mm"),
+
+    # ─── 4. WHAT'S NEW: PAYOUT SAFETY ───
+    ("section", "4. What's New: Payout Safety"),
+    ("paragraph", "status.heading", "4. What's New: Payout Safety"),
+    ("paragraph", "status.body",
+     "A critical improvement has been made to the payout system to handle partial failures "
+     "safely."),
+    ("paragraph", "status.subheading", "<b>The Problem (Before)</b>"),
+    ("paragraph", "status.body",
+     "If one employee's bank transfer failed (e.g. incorrect bank details), the entire payout "
+     "was marked as \"failed\". Retrying would re-send money to <b>all</b> employees, including "
+     "those already paid &mdash; risking double-payments."),
+    ("paragraph", "status.subheading", "<b>The Solution (Now)</b>"),
+    ("list", {"items": "safety_items", "each": [("status.check", CHECK + "{item}")]}),
+    ("spacer", "4mm"),
+
+    # ─── 5. WHAT'S REMAINING ───
+    ("section", "5. What's Remaining"),
+    ("paragraph", "status.heading", "5. What's Remaining for Production"),
+    ("paragraph", "status.body",
+     "The platform is fully functional in <b>test mode</b>. To go live with real money:"),
+    ("spacer", "3mm"),
+    ("paragraph", "status.subheading", "Must Complete Before Launch"),
+    ("list", {"items": "critical_items", "fields": ("title", "desc"), "each": [
+        ("status.crit_item", '<font color="{color.warning}"><b>&#9679;</b></font>  <b>{title}</b>'),
+        ("status.crit_desc", "{desc}"),
+    ]}),
+    ("spacer", "2mm"),
+    ("paragraph", "status.subheading", "Nice to Have (After Launch)"),
+    ("list", {"items": "nice_items", "each": [
+        ("status.check", '<font color="{color.text_light}">&#9675;</font>  {item}'),
+    ]}),
+    ("page_break",),
 
-    features = [
+    # ─── 6. NEXT STEPS ───
+    ("section", "6. Next Steps"),
+    ("paragraph", "status.heading", "6. Next Steps"),
+    ("paragraph", "status.body",
+     "Here is the recommended order of actions to bring TipUs live:"),
+    ("spacer", "3mm"),
+    ("steps", {
+        "items": "next_steps", "fields": ("title", "desc"),
+        "number": ("status.num", '<font size="10"><b>{n}</b></font>'),
+        "body": ("status.body", STEP_BODY),
+        "widths": ("10mm", "-12mm"), "style": "status.next_step", "gap": "1mm",
+    }),
+
+    # ─── TECH OVERVIEW ───
+    ("section", "7. Technical Overview"),
+    ("spacer", "8mm"),
+    ("paragraph", "status.heading", "7. Technical Overview"),
+    ("table", {
+        "header": ("Component", "Technology"), "rows": "tech",
+        "widths": (0.3, 0.7), "style": "status.tech",
+    }),
+
+    # ─── FOOTER ───
+    ("section", "Footer"),
+    ("spacer", "15mm"),
+    ("rule", {"thickness": 1, "color": "border", "space_after": "4mm"}),
+    ("paragraph", "status.footer", "TipUs Status Report  |  {date}  |  Confidential"),
+])
+
+CONTENT = {
+    "date": "17 February 2026",
+    "summary": [
+        ("Overall Completion", "~98%"),
+        ("Core Features", "All implemented and tested (10 of 11 phases)"),
+        ("Payment Processing", "Fully working via Stripe (platform-direct model)"),
+        ("Money Flow", "100% stays on TipUs platform until payout"),
+        ("Payout Safety", "Per-employee tracking prevents double-payments"),
+        ("Mode", "Test mode (ready for live switch)"),
+    ],
+    "features": [
         ("Venue Owner Onboarding", "Sign up, create venue, start receiving tips immediately (no Stripe setup needed)"),
         ("Employee Management", "Add/edit/deactivate employees, send email invitations"),
         ("Employee Onboarding", "Employees receive invite, create account, enter bank details"),
@@ -163,112 +171,31 @@ def build_pdf():
         ("Email System", "Invitation emails sent via Resend"),
         ("Mobile Responsive", "Full mobile experience with bottom navigation"),
         ("Security", "Row-level security, no secrets in frontend, encrypted data at rest"),
-    ]
-
-    for name, desc in features:
-        story.append(Paragraph(
-            f'<font color="{GREEN.hexval()}"><b>&#10003;</b></font>  '
-            f'<b>{name}</b> &mdash; {desc}',
-            check_style,
-        ))
-
-    story.append(PageBreak())
-
-    # ─── 3. HOW THE MONEY FLOWS ───
-    story.append(Paragraph("3. How the Money Flows", heading_style))
-    story.append(Paragraph(
-        "TipUs uses a <b>platform-direct</b> model: all tip money stays on the TipUs Stripe "
-        "account. Venues never touch money or need to connect Stripe.",
-        body_style,
-    ))
-    story.append(Spacer(1, 3 * mm))
-
-    flow_steps = [
-        ("1", "Customer Scans QR Code",
+    ],
+    "flow_steps": [
+        ("Customer Scans QR Code",
          "The customer scans a QR code at the venue with their phone camera."),
-        ("2", "Customer Pays",
+        ("Customer Pays",
          "They choose a tip amount and pay with their card, Apple Pay, or Google Pay."),
-        ("3", "Money Stays on TipUs Platform",
+        ("Money Stays on TipUs Platform",
          "100% of the tip lands on the TipUs Stripe account. No money goes to the venue. "
          "The tip is recorded in the database automatically via webhook."),
-        ("4", "Venue Owner Distributes",
+        ("Venue Owner Distributes",
          "The venue owner triggers a payout (or it runs on auto-schedule). "
          "TipUs keeps 5% and calculates each employee's share based on days worked."),
-        ("5", "Money Reaches Employees",
+        ("Money Reaches Employees",
          "Each employee's share is transferred to their bank account via Stripe. "
          "Each transfer is tracked individually with status and receipt."),
-    ]
-
-    for num, title, desc in flow_steps:
-        step_data = [[
-            Paragraph(
-                f'<font color="{WHITE.hexval()}" size="14"><b>{num}</b></font>',
-                ParagraphStyle("StepNum", alignment=TA_CENTER, fontName="Helvetica-Bold"),
-            ),
-            Paragraph(
-                f'<b>{title}</b><br/><font size="9" color="{MEDIUM_TEXT.hexval()}">{desc}</font>',
-                body_style,
-            ),
-        ]]
-        step_table = Table(step_data, colWidths=[12 * mm, width - 14 * mm])
-        step_table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (0, 0), CORAL),
-            ("BACKGROUND", (1, 0), (1, 0), SURFACE_100),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("TOPPADDING", (0, 0), (-1, -1), 6),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-            ("LEFTPADDING", (0, 0), (0, 0), 4),
-            ("LEFTPADDING", (1, 0), (1, 0), 8),
-        ]))
-        story.append(step_table)
-        story.append(Spacer(1, 2 * mm))
-
-    story.append(Spacer(1, 4 * mm))
-
-    # ─── 4. WHAT'S NEW: PAYOUT SAFETY ───
-    story.append(Paragraph("4. What's New: Payout Safety", heading_style))
-    story.append(Paragraph(
-        "A critical improvement has been made to the payout system to handle partial failures safely.",
-        body_style,
-    ))
-
-    story.append(Paragraph("<b>The Problem (Before)</b>", subheading_style))
-    story.append(Paragraph(
-        "If one employee's bank transfer failed (e.g. incorrect bank details), the entire payout "
-        "was marked as \"failed\". Retrying would re-send money to <b>all</b> employees, including "
-        "those already paid &mdash; risking double-payments.",
-        body_style,
-    ))
-
-    story.append(Paragraph("<b>The Solution (Now)</b>", subheading_style))
-
-    safety_items = [
+    ],
+    "safety_items": [
         "Each employee's transfer is tracked individually (completed, failed, or pending)",
         "If some transfers succeed and others fail, the payout is marked \"partially completed\"",
         "Clicking \"Retry Failed\" only processes employees who haven't been paid yet",
         "Already-paid employees are safely skipped &mdash; no risk of double-payments",
         "Error messages are shown per-employee so you know exactly what went wrong",
         "Works the same way for both manual and automatic scheduled payouts",
-    ]
-    for item in safety_items:
-        story.append(Paragraph(
-            f'<font color="{GREEN.hexval()}"><b>&#10003;</b></font>  {item}',
-            check_style,
-        ))
-
-    story.append(Spacer(1, 4 * mm))
-
-    # ─── 5. WHAT'S REMAINING ───
-    story.append(Paragraph("5. What's Remaining for Production", heading_style))
-    story.append(Paragraph(
-        "The platform is fully functional in <b>test mode</b>. To go live with real money:",
-        body_style,
-    ))
-    story.append(Spacer(1, 3 * mm))
-
-    story.append(Paragraph("Must Complete Before Launch", subheading_style))
-
-    critical_items = [
+    ],
+    "critical_items": [
         (
             "Employee Identity Verification",
             "Switch from Custom to Express Stripe accounts so Stripe handles identity "
@@ -289,43 +216,13 @@ def build_pdf():
             "Set up a production domain (e.g. app.tipus.com.au). Restrict backend "
             "to only accept requests from this domain.",
         ),
-    ]
-
-    for title, desc in critical_items:
-        story.append(Paragraph(
-            f'<font color="{AMBER.hexval()}"><b>&#9679;</b></font>  <b>{title}</b>',
-            ParagraphStyle("CritItem", parent=body_style, spaceAfter=1 * mm),
-        ))
-        story.append(Paragraph(
-            desc,
-            ParagraphStyle("CritDesc", parent=body_light, leftIndent=7 * mm, spaceAfter=4 * mm),
-        ))
-
-    story.append(Spacer(1, 2 * mm))
-    story.append(Paragraph("Nice to Have (After Launch)", subheading_style))
-
-    nice_items = [
+    ],
+    "nice_items": [
         "Analytics dashboard with charts and trends",
         "Bulk employee invite (add multiple employees at once)",
         "Email notifications when payouts are processed",
-    ]
-    for item in nice_items:
-        story.append(Paragraph(
-            f'<font color="{LIGHT_TEXT.hexval()}">&#9675;</font>  {item}',
-            check_style,
-        ))
-
-    story.append(PageBreak())
-
-    # ─── 6. NEXT STEPS ───
-    story.append(Paragraph("6. Next Steps", heading_style))
-    story.append(Paragraph(
-        "Here is the recommended order of actions to bring TipUs live:",
-        body_style,
-    ))
-    story.append(Spacer(1, 3 * mm))
-
-    next_steps = [
+    ],
+    "next_steps": [
         ("Complete Stripe account setup", "Verify business details, enable Connect, complete platform profile"),
         ("Switch employees to Express accounts", "Let Stripe handle identity verification (recommended approach)"),
         ("Register production domain", "Set up app.tipus.com.au or similar, configure SSL"),
@@ -334,73 +231,672 @@ def build_pdf():
         ("Test with a real payment", "Make a small real tip ($1) and verify the full flow end-to-end"),
         ("Monitor for 24-48 hours", "Watch Stripe Dashboard and database logs for any issues"),
         ("Launch", "Share QR codes with venues and start accepting real tips"),
-    ]
-
-    for i, (title, desc) in enumerate(next_steps, 1):
-        step_data = [[
-            Paragraph(
-                f'<font size="10"><b>{i}</b></font>',
-                ParagraphStyle("Num", alignment=TA_CENTER, fontName="Helvetica-Bold", textColor=CORAL),
-            ),
-            Paragraph(
-                f'<b>{title}</b><br/><font size="9" color="{MEDIUM_TEXT.hexval()}">{desc}</font>',
-                body_style,
-            ),
-        ]]
-        step_table = Table(step_data, colWidths=[10 * mm, width - 12 * mm])
-        step_table.setStyle(TableStyle([
-            ("BACKGROUND", (1, 0), (1, 0), SURFACE_100),
-            ("VALIGN", (0, 0), (-1, -1), "TOP"),
-            ("TOPPADDING", (0, 0), (-1, -1), 4),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-            ("LEFTPADDING", (1, 0), (1, 0), 8),
-        ]))
-        story.append(step_table)
-        story.append(Spacer(1, 1 * mm))
+    ],
+    "tech": [
+        ("Frontend", "React 19, TypeScript 5.9, Tailwind CSS 4"),
+        ("Backend", "Supabase (PostgreSQL, Auth, Edge Functions)"),
+        ("Payments", "Stripe (Platform-Direct + Custom accounts for employees)"),
+        ("Email", "Resend (transactional email service)"),
+        ("Hosting", "Netlify (frontend) + Supabase (backend)"),
+        ("Security", "Row-level security, encrypted at rest, role-based access"),
+        ("Build Size", "~210KB gzipped (production-optimized)"),
+    ],
+}
+
+
+def build_pdf(sink=None, filename=OUTPUT_NAME, cache_dir=DEFAULT_CACHE_DIR, theme=DEFAULT_THEME,
+              metrics=None):
+    """Build the PDF into sink as filename (default: the working directory)."""
+    from reports.theme import get_theme
+
+    sink = sink or DirectorySink()
+    t = get_theme(theme)
+    # All content lives in this file: its digest, the template code's and the theme make the key
+    cache = BuildCache(cache_dir)
+    key = content_key(
+        [file_digest(__file__), builder_digest()], t.fingerprint("status."), "status-report",
+    )
+    # An instrumented build has to actually lay the document out
+    data = cache.load(key) if metrics is None else None
+    if data is not None:
+        sink.write(filename, data)
+        print(f"PDF unchanged, restored {sink.location(filename)} from cache")
+        return
+
+    # Layout holds the whole PDF in memory anyway; buffering it lets the
+    # same bytes go to the sink and the cache without reading a file back
+    buf = io.BytesIO()
+    doc = TEMPLATE.doc(buf)
+    story = render(TEMPLATE, CONTENT, theme, doc.width)
+    if metrics is None:
+        doc.build(story)
+    else:
+        metrics.build(doc, story, buf)
+    data = buf.getvalue()
+    sink.write(filename, data)
+    cache.store(key, data)
+    cache.evict()
+    print(f"PDF saved to {sink.location(filename)}")
+
+
+def _print_results(results, what, out_dir):
+    """Count a journalled run's (path, status) results by status and list the failures."""
+    counts = {}
+    failed = []
+    for path, status in results:
+        if status.startswith("failed"):
+            failed.append((path, status))
+            status = "failed"
+        counts[status] = counts.get(status, 0) + 1
+    summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    print(f"{len(results)} {what} in {out_dir} ({summary or 'none'})")
+    for path, status in failed:
+        print(f"  {os.path.basename(path)}: {status}")
+    if failed:
+        print("Run again to resume; statements that gave up need --retry-failed")
+
+
+def build_statements(source_path, out_dir, workers=None, cache_dir=None, theme=DEFAULT_THEME,
+                     metrics_path=None, profile=(), trace_memory=False, max_attempts=None,
+                     retry_failed=False):
+    from reports.batch import render_statements
+    from reports.journal import DEFAULT_MAX_ATTEMPTS
+
+    results = render_statements(
+        source_path, out_dir, workers=workers, cache_dir=cache_dir, theme=theme,
+        metrics_path=metrics_path, profile=profile, trace_memory=trace_memory,
+        max_attempts=max_attempts or DEFAULT_MAX_ATTEMPTS, retry_failed=retry_failed,
+    )
+    _print_results(results, "payout statements", out_dir)
+    return results
+
+
+def build_earnings(source_path, out_dir, start, end, employee_ids=None, workers=None,
+                   cache_dir=None, theme=DEFAULT_THEME, dry_run=False, max_attempts=None,
+                   retry_failed=False):
+    if dry_run:
+        from reports.earnings import build_employee_jobs, earnings_filename, earnings_totals
+        from reports.sources import open_source
+
+        source = open_source(source_path)
+        try:
+            jobs = build_employee_jobs(source, start, end, employee_ids)
+        finally:
+            source.close()
+        for job in jobs:
+            totals = earnings_totals(job["rows"])
+            print(
+                f"{earnings_filename(job)}  {job['employee']['name']}  "
+                f"{len(job['rows'])} payouts  earned {totals['earned'] / 100:,.2f}"
+            )
+        print(f"{len(jobs)} earnings statements")
+        return jobs
+
+    from reports.earnings import render_earnings
+    from reports.journal import DEFAULT_MAX_ATTEMPTS
+
+    results = render_earnings(
+        source_path, out_dir, start, end, employee_ids=employee_ids, workers=workers,
+        cache_dir=cache_dir, theme=theme, max_attempts=max_attempts or DEFAULT_MAX_ATTEMPTS,
+        retry_failed=retry_failed,
+    )
+    _print_results(results, "earnings statements", out_dir)
+    return results
+
+
+def watch_statements(source_path, out_dir, workers=1, cache_dir=None, theme=DEFAULT_THEME,
+                     quiet=None, max_delay=None, poll=None, once=False, recheck=None):
+    from reports import changefeed
+
+    if source_path.endswith(".json") and not once:
+        raise SystemExit("a .json export never changes; watch a SQLite database or pass --once")
+    os.makedirs(out_dir, exist_ok=True)
+    refresher = changefeed.StatementRefresher(
+        source_path, out_dir, workers=workers, cache_dir=cache_dir, theme=theme,
+        quiet=changefeed.DEFAULT_QUIET if quiet is None else quiet,
+        max_delay=changefeed.DEFAULT_MAX_DELAY if max_delay is None else max_delay,
+        recheck=changefeed.DEFAULT_RECHECK if recheck is None else (recheck or None),
+    )
+    with refresher:
+        try:
+            for results in refresher.run(poll or changefeed.DEFAULT_POLL, once=once):
+                if all(status == "skipped" for _path, status in results):
+                    # A recheck of the open payouts that found nothing changed
+                    continue
+                counts = {}
+                for _path, status in results:
+                    counts[status] = counts.get(status, 0) + 1
+                summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+                print(f"{len(results)} statements refreshed in {out_dir} ({summary})", flush=True)
+        except KeyboardInterrupt:
+            pass
+    pending = len(refresher.debouncer.pending)
+    if pending:
+        print(f"{pending} statements still pending; they render on the next run")
+
+
+def schedule_statements(source_path, out_dir, day=None, start=None, window=None, rate=None,
+                        workers=None, reserved=None, cache_dir=None, theme=DEFAULT_THEME,
+                        dry_run=False, forecast_days=0):
+    """Render a payout run's statements spread over a window, or show the plan."""
+    import asyncio
+    from datetime import datetime, timedelta, timezone
+
+    from reports import scheduler
+    from reports.batch import statement_filename
+    from reports.sources import open_source
+
+    day = date.fromisoformat(day) if day else datetime.now(timezone.utc).date()
+    if start is not None:
+        start = datetime.combine(day, datetime.strptime(start, "%H:%M").time(), timezone.utc)
+    window = scheduler.DEFAULT_WINDOW if window is None else timedelta(minutes=window)
+    rate = scheduler.DEFAULT_RATE if rate is None else rate
+
+    if forecast_days:
+        source = open_source(source_path)
+        try:
+            runs = scheduler.forecast(source, day, forecast_days)
+        finally:
+            source.close()
+        for run_day, venues in runs:
+            print(f"{run_day:%a %Y-%m-%d}  {len(venues):4} payouts")
+        return runs
+
+    if dry_run:
+        source = open_source(source_path)
+        try:
+            plan = scheduler.plan_run(source, day, start, window)
+        finally:
+            source.close()
+        for at, job, cost in plan:
+            print(
+                f"{at:%H:%M:%S}  {statement_filename(job)}  "
+                f"{len(job['distributions'])} employees  cost {cost}"
+            )
+        print(f"{len(plan)} payout statements for the {day} run")
+        return plan
+
+    plan, results = asyncio.run(scheduler.run_schedule(
+        source_path, out_dir, day, start, window, rate, workers=workers, cache_dir=cache_dir,
+        theme=theme, reserved=scheduler.DEFAULT_RESERVED if reserved is None else reserved,
+    ))
+    failed = [(path, status) for path, status in results if status != "written"]
+    for path, status in failed:
+        print(f"{os.path.basename(path)}: {status}")
+    print(
+        f"{len(results) - len(failed)} of {len(plan)} payout statements for the {day} run "
+        f"written to {out_dir}"
+    )
+    return results
 
-    # ─── TECH OVERVIEW ───
-    story.append(Spacer(1, 8 * mm))
-    story.append(Paragraph("7. Technical Overview", heading_style))
-
-    tech_data = [
-        ["Component", "Technology"],
-        ["Frontend", "React 19, TypeScript 5.9, Tailwind CSS 4"],
-        ["Backend", "Supabase (PostgreSQL, Auth, Edge Functions)"],
-        ["Payments", "Stripe (Platform-Direct + Custom accounts for employees)"],
-        ["Email", "Resend (transactional email service)"],
-        ["Hosting", "Netlify (frontend) + Supabase (backend)"],
-        ["Security", "Row-level security, encrypted at rest, role-based access"],
-        ["Build Size", "~210KB gzipped (production-optimized)"],
-    ]
-    tech_table = Table(tech_data, colWidths=[width * 0.3, width * 0.7])
-    tech_table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), CORAL),
-        ("TEXTCOLOR", (0, 0), (-1, 0), WHITE),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTNAME", (0, 1), (0, -1), "Helvetica-Bold"),
-        ("FONTNAME", (1, 1), (1, -1), "Helvetica"),
-        ("FONTSIZE", (0, 0), (-1, -1), 10),
-        ("BACKGROUND", (0, 1), (-1, -1), SURFACE_100),
-        ("TOPPADDING", (0, 0), (-1, -1), 6),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-        ("LEFTPADDING", (0, 0), (-1, -1), 8),
-        ("GRID", (0, 0), (-1, -1), 0.5, SURFACE_200),
-        ("TEXTCOLOR", (0, 1), (-1, -1), DARK_TEXT),
-    ]))
-    story.append(tech_table)
 
-    # ─── FOOTER ───
-    story.append(Spacer(1, 15 * mm))
-    story.append(HRFlowable(width=width, thickness=1, color=SURFACE_200, spaceAfter=4 * mm))
-    story.append(Paragraph(
-        f"TipUs Status Report  |  {date_str}  |  Confidential",
-        footer_style,
-    ))
+def export_statements(source_path, out_dir, formats=("csv",), run_date=None, pdf=True,
+                      theme=DEFAULT_THEME):
+    from reports.columnar import export_run
+
+    try:
+        paths = export_run(source_path, out_dir, formats, run_date, pdf, theme)
+    except ImportError as exc:
+        raise SystemExit(str(exc)) from None
+    pdfs = sum(path.endswith(".pdf") for path in paths)
+    print(f"{len(paths) - pdfs} data files and {pdfs} payout statements in {out_dir}")
+    return paths
+
+
+def build_audit(source_path, output, start=None, end=None, theme=DEFAULT_THEME):
+    from reports.audit import CHECKS, render_audit
 
-    # Build
-    doc.build(story)
-    print(f"PDF saved to {output_path}")
+    sink, filename = sink_for(output)
+    result = render_audit(source_path, sink, filename, start, end, theme)
+    for check, label in CHECKS.items():
+        found = len(result.discrepancies[check])
+        print(f"{label}: {f'{found} discrepancies' if found else 'verified'}")
+    print(
+        f"{result.counts['payouts']} payouts, {result.counts['tips']} tips audited in "
+        f"{result.seconds:.1f}s; report saved to {sink.location(filename)}"
+    )
+    return result
+
+
+def _open_work_table(location):
+    from reports.worktable import open_work_table
+
+    try:
+        return open_work_table(location)
+    except ImportError as exc:
+        raise SystemExit(str(exc)) from None
+
+
+def enqueue_work(source_path, location, run_date=None, activity_year=None):
+    """Queue a run's statements (and venues' activity reports) in a shared work table."""
+    from reports import worktable
+    from reports.sources import open_source
+
+    source = open_source(source_path)
+    try:
+        with _open_work_table(location) as table:
+            added = worktable.enqueue_statements(table, source, run_date)
+            if activity_year:
+                added += worktable.enqueue_activity(table, source, activity_year)
+            counts = table.counts()
+    finally:
+        source.close()
+    print(f"{added} items queued in {location} ({_work_summary(counts)})")
+
+
+def _work_summary(counts):
+    return ", ".join(f"{n} {status}" for status, n in counts.items())
+
+
+def run_work(source_path, location, out_dir, workers=None, lease=None, claim=None,
+             max_attempts=None, follow=False, retry_failed=False, cache_dir=None,
+             theme=DEFAULT_THEME):
+    """Render work table items on this host until the table is drained."""
+    from reports import worktable
+
+    with _open_work_table(location) as table:
+        if retry_failed:
+            print(f"{table.retry_failed()} failed items queued again")
+    options = {
+        "lease": lease or worktable.DEFAULT_LEASE, "claim": claim or worktable.DEFAULT_CLAIM,
+        "max_attempts": max_attempts or worktable.DEFAULT_MAX_ATTEMPTS, "follow": follow,
+        "cache_dir": cache_dir or None, "theme": theme,
+    }
+    try:
+        totals = worktable.run_workers(location, source_path, out_dir, workers, **options)
+    except KeyboardInterrupt:
+        totals = None
+    with _open_work_table(location) as table:
+        counts = table.counts()
+        failures = table.failures()
+    if totals is not None:
+        print(
+            f"{totals['done']} documents written to {out_dir} by this host, "
+            f"{totals['failed']} failed, {totals['lost']} lost to expired leases"
+        )
+    for kind, venue_id, period, attempts, error in failures:
+        print(f"  {kind} {venue_id} {period}: failed after {attempts} attempts ({error})")
+    print(f"Work table {location}: {_work_summary(counts)}")
+
+
+def list_statements(source_path, out_dir=None, run_date=None):
+    """Print the statements a run would produce, without rendering anything."""
+    from reports.batch import build_jobs, statement_filename
+    from reports.bundle import run_jobs
+    from reports.sources import open_source
+
+    source = open_source(source_path)
+    try:
+        jobs = run_jobs(build_jobs(source), run_date)
+    finally:
+        source.close()
+    for job in jobs:
+        payout = job["payout"]
+        name = statement_filename(job)
+        notes = []
+        if out_dir and os.path.exists(os.path.join(out_dir, name)):
+            notes.append("exists")
+        if job["reconciliation"]:
+            notes.append(f"{len(job['reconciliation'])} reconciliation issues")
+        print(
+            f"{name}  {job['venue'].get('name') or payout['venue_id']}  "
+            f"{payout['period_start'][:10]}..{payout['period_end'][:10]}  "
+            f"net {payout['net_amount'] / 100:,.2f}" + (f"  ({', '.join(notes)})" if notes else "")
+        )
+    print(f"{len(jobs)} payout statements")
+    return jobs
+
+
+def build_bundle(source_path, output, run_date=None, theme=DEFAULT_THEME):
+    from reports.bundle import render_bundle
+
+    sink, filename = sink_for(output)
+    statements, pages = render_bundle(source_path, sink, filename, run_date=run_date, theme=theme)
+    print(f"{statements} payout statements, {pages} pages in {sink.location(filename)}")
+
+
+def update_rollups(source_path, rebuild=False, today=None):
+    import sqlite3
+
+    from reports import rollups
+
+    if source_path.endswith(".json"):
+        raise SystemExit("rollups are kept in the SQLite database; a .json export has none")
+    conn = sqlite3.connect(source_path)
+    try:
+        update = rollups.rebuild_rollups if rebuild else rollups.update_rollups
+        rows = update(conn, today)
+        closed = rollups.closed_through(conn)
+    finally:
+        conn.close()
+    print(f"{rows} venue-days rolled up; tip_daily closed through {closed or 'nothing yet'}")
+
+
+def build_activity(source_path, venue_id, year, output=None, theme=DEFAULT_THEME):
+    from reports.activity import render_activity
+
+    sink, filename = sink_for(output) if output else (DirectorySink(), None)
+    try:
+        filename, days = render_activity(source_path, venue_id, year, sink, filename, theme)
+    except LookupError as exc:
+        raise SystemExit(str(exc)) from None
+    print(f"{days} days of tips in {year}, report saved to {sink.location(filename)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate TipUs PDF reports.")
+    sub = parser.add_subparsers(dest="command")
+    status = sub.add_parser("status", help="project status report (default)")
+    statements = sub.add_parser("statements", help="one payout statement per payouts row")
+    bundle = sub.add_parser("bundle", help="every statement of a payout run in one PDF")
+    earnings = sub.add_parser("earnings", help="one earnings statement per employee for a period")
+    rollup = sub.add_parser("rollup", help="fold closed days of tips into the daily rollup store")
+    activity = sub.add_parser("activity", help="a venue's tip activity for a year, from rollups")
+    watch = sub.add_parser(
+        "watch", help="re-render statements as notifications report tip and payout changes",
+    )
+    audit = sub.add_parser(
+        "audit", help="check every payout's tips, fee, splits and double payments",
+    )
+    audit.add_argument("source", help="SQLite database or .json export, as for statements")
+    audit.add_argument(
+        "-o", "--output", default="reconciliation-audit.pdf",
+        help="output PDF path (default: reconciliation-audit.pdf)",
+    )
+    audit.add_argument("--from", dest="start", metavar="YYYY-MM-DD",
+                       help="only payouts whose period ends on or after this day")
+    audit.add_argument("--to", dest="end", metavar="YYYY-MM-DD",
+                       help="only payouts whose period ends on or before this day")
+    export = sub.add_parser(
+        "export", help="each venue's payout, distribution and tip data, with its statements",
+    )
+    export.add_argument("source", help="SQLite database or .json export, as for statements")
+    export.add_argument("-o", "--out-dir", default="export", help="output directory")
+    export.add_argument(
+        "--format", dest="formats", action="append", choices=("csv", "parquet", "arrow"),
+        help="data file format (repeatable; default: csv; parquet and arrow need pyarrow)",
+    )
+    export.add_argument(
+        "--run-date", metavar="YYYY-MM-DD",
+        help="only payouts created by that day's auto-payout run (default: all payouts)",
+    )
+    export.add_argument(
+        "--no-pdf", dest="pdf", action="store_false", help="write the data files only",
+    )
+    enqueue = sub.add_parser(
+        "enqueue", help="queue a run's statements in a work table shared by `work` processes",
+    )
+    enqueue.add_argument("source", help="SQLite database or .json export, as for statements")
+    enqueue.add_argument(
+        "--run-date", metavar="YYYY-MM-DD",
+        help="only payouts created by that day's auto-payout run (default: all payouts)",
+    )
+    enqueue.add_argument(
+        "--activity", type=int, metavar="YEAR", help="also queue every venue's activity report",
+    )
+    work = sub.add_parser(
+        "work", help="render queued work table items; run on any number of hosts at once",
+    )
+    work.add_argument("source", help="SQLite database or .json export, as for statements")
+    work.add_argument("-o", "--out-dir", default="statements", help="output directory")
+    work.add_argument(
+        "--lease", type=float, metavar="SECONDS",
+        help="reclaim an item when its worker has not renewed its lease this long (default: 60)",
+    )
+    work.add_argument(
+        "--claim", type=int, metavar="N", help="items a worker leases at a time (default: 2)",
+    )
+    work.add_argument(
+        "--max-attempts", type=int, metavar="N",
+        help="mark an item failed after N claims (default: 3)",
+    )
+    work.add_argument(
+        "--retry-failed", action="store_true", help="queue failed items again first",
+    )
+    work.add_argument(
+        "--follow", action="store_true", help="keep polling for new items instead of exiting",
+    )
+    for p in (enqueue, work):
+        p.add_argument(
+            "--table", default="work.db",
+            help="work table: a SQLite path or postgresql:// URL (default: work.db)",
+        )
+    schedule = sub.add_parser(
+        "schedule", help="render an auto-payout run's statements spread over a window",
+    )
+    schedule.add_argument("source", help="SQLite database or .json export, as for statements")
+    schedule.add_argument("-o", "--out-dir", default="statements", help="output directory")
+    schedule.add_argument(
+        "--day", metavar="YYYY-MM-DD", help="the auto-payout run to render (default: today, UTC)",
+    )
+    schedule.add_argument(
+        "--start", metavar="HH:MM",
+        help="UTC time of the first statement (default: 02:15, after the 02:00 payout cron)",
+    )
+    schedule.add_argument(
+        "--window", type=float, metavar="MINUTES",
+        help="spread the statements over this long (default: 120)",
+    )
+    schedule.add_argument(
+        "--rate", type=float, metavar="N", help="start at most N statements a second (default: 2)",
+    )
+    schedule.add_argument(
+        "--reserve", type=int, metavar="N",
+        help="workers kept free for on-demand statements (default: 1)",
+    )
+    schedule.add_argument(
+        "--forecast", type=int, default=0, metavar="DAYS",
+        help="print how many payouts each of the next DAYS runs will create, and exit",
+    )
+    watch.add_argument("source", help="SQLite database with a notifications table")
+    watch.add_argument("-o", "--out-dir", default="statements", help="output directory")
+    watch.add_argument(
+        "--quiet", type=float, metavar="SECONDS",
+        help="render a statement once its payout has had no events this long (default: 30)",
+    )
+    watch.add_argument(
+        "--max-delay", type=float, metavar="SECONDS",
+        help="render a busy payout's statement at least this often (default: 300)",
+    )
+    watch.add_argument(
+        "--poll", type=float, metavar="SECONDS", help="seconds between polls (default: 5)",
+    )
+    watch.add_argument(
+        "--recheck", type=float, metavar="SECONDS",
+        help="look for changes no event reports (refunds, transfer retries) in open payouts "
+             "this often (default: 600; 0 = never)",
+    )
+    watch.add_argument(
+        "--once", action="store_true",
+        help="render everything the pending events affect, without debouncing, and exit",
+    )
+    rollup.add_argument("source", help="SQLite database laid out like reports.sources.SCHEMA")
+    rollup.add_argument("--rebuild", action="store_true", help="recompute every closed day")
+    rollup.add_argument(
+        "--today", metavar="YYYY-MM-DD", help="first day left open (default: today, UTC)",
+    )
+    activity.add_argument("source", help="SQLite database or .json export, as for statements")
+    activity.add_argument("venue_id", help="venues.id of the venue")
+    activity.add_argument(
+        "--year", type=int, default=date.today().year, help="calendar year (default: this year)",
+    )
+    activity.add_argument(
+        "-o", "--output", default=None, help="output PDF path (default: <venue>_activity_<year>.pdf)",
+    )
+    earnings.add_argument("source", help="SQLite database or .json export, as for statements")
+    earnings.add_argument("--from", dest="start", required=True, metavar="YYYY-MM-DD",
+                          help="first day of the period (payouts ending on or after it)")
+    earnings.add_argument("--to", dest="end", required=True, metavar="YYYY-MM-DD",
+                          help="last day of the period (payouts ending on or before it)")
+    earnings.add_argument("-o", "--out-dir", default="earnings", help="output directory")
+    earnings.add_argument(
+        "--employee", metavar="ID", action="append",
+        help="only the person with this employees.id or user_id, across all their venues "
+             "(repeatable; default: everyone paid in the period)",
+    )
+    bundle.add_argument("source", help="SQLite database or .json export, as for statements")
+    bundle.add_argument(
+        "-o", "--output", default=None, help="output PDF path (default: payout-run-<date>.pdf)",
+    )
+    bundle.add_argument(
+        "--run-date", metavar="YYYY-MM-DD",
+        help="only payouts created by that day's auto-payout run (default: all payouts)",
+    )
+    statements.add_argument(
+        "source", help="SQLite database or .json export of the venues/employees/tips/payouts tables",
+    )
+    statements.add_argument("-o", "--out-dir", default="statements", help="output directory")
+    for p in (statements, earnings):
+        p.add_argument(
+            "--max-attempts", type=int, metavar="N",
+            help="give up on a statement after N failed renders across runs (default: 3)",
+        )
+        p.add_argument(
+            "--retry-failed", action="store_true",
+            help="try statements that gave up again, with their attempts reset",
+        )
+    for p in (statements, earnings, schedule, work):
+        p.add_argument(
+            "-w", "--workers", type=int, default=None,
+            help="render processes (default: number of cores, 1 = in-process)",
+        )
+    watch.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="render processes kept warm between refreshes (default: 1 = in-process)",
+    )
+    for p in (status, statements, bundle, earnings, activity, watch, schedule, export, audit, work):
+        p.add_argument(
+            "--theme", default=DEFAULT_THEME, choices=sorted(PALETTES),
+            help=f"colour theme (default: {DEFAULT_THEME})",
+        )
+        p.add_argument(
+            "--font", metavar="FAMILY",
+            help="embed this TrueType family instead of Helvetica, e.g. noto or TipUsSans "
+                 "(for TipUsSans-Regular.ttf...; default: $TIPUS_FONT)",
+        )
+        p.add_argument(
+            "--compress", type=int, choices=range(10), metavar="0-9",
+            help="zlib level for PDF streams, 0 = none (default: $TIPUS_PDF_COMPRESSION or 6)",
+        )
+    for p in (statements, bundle, activity, watch, schedule, export, work):
+        p.add_argument(
+            "--assets", metavar="DIR",
+            help="file store venues.logo_url points into, as <bucket>/<path>; statements "
+                 "carry no logo without one (default: $TIPUS_ASSET_STORE)",
+        )
+        p.add_argument(
+            "--asset-cache", metavar="DIR",
+            help=f"normalised logo cache (default: $TIPUS_ASSET_CACHE or {assets.DEFAULT_CACHE_DIR})",
+        )
+    for p in (statements, earnings, watch, schedule, work):
+        p.add_argument(
+            "--cache-dir", default=DEFAULT_CACHE_DIR,
+            help=f"build cache directory (default: {DEFAULT_CACHE_DIR}); pass '' to disable",
+        )
+    status.add_argument(
+        "-o", "--output", default=OUTPUT_NAME, help=f"output PDF path (default: {OUTPUT_NAME})",
+    )
+    status.add_argument(
+        "--metrics", action="store_true", help="print per-section layout time, pages and flowables",
+    )
+    for p in (statements, bundle, earnings, schedule):
+        p.add_argument(
+            "-n", "--dry-run", action="store_true",
+            help="list the statements that would be rendered and exit",
+        )
+    statements.add_argument(
+        "--metrics", metavar="FILE", help="write per-section metrics as one JSON line per statement",
+    )
+    for p in (status, statements):
+        p.add_argument(
+            "--profile", metavar="SECTION", action="append", default=[],
+            help="cProfile this section to <section>.prof (repeatable; implies metrics)",
+        )
+        p.add_argument(
+            "--trace-memory", action="store_true", help="record peak allocation per section",
+        )
+    parser.set_defaults(
+        theme=DEFAULT_THEME, output=OUTPUT_NAME, metrics=False, profile=[], trace_memory=False,
+        font=None, compress=None, assets=None, asset_cache=None,
+    )
+    args = parser.parse_args(argv)
+    fonts.configure(args.font, args.compress)
+    if args.font:
+        # Find the family now rather than halfway through the first document
+        try:
+            fonts.current()
+        except ValueError as exc:
+            raise SystemExit(str(exc)) from None
+    assets.configure(args.assets, args.asset_cache)
+    try:
+        assets.current()
+    except ImportError as exc:
+        raise SystemExit(str(exc)) from None
+
+    if args.command == "enqueue":
+        enqueue_work(args.source, args.table, args.run_date, args.activity)
+    elif args.command == "work":
+        run_work(
+            args.source, args.table, args.out_dir, workers=args.workers, lease=args.lease,
+            claim=args.claim, max_attempts=args.max_attempts, follow=args.follow,
+            retry_failed=args.retry_failed, cache_dir=args.cache_dir, theme=args.theme,
+        )
+    elif args.command == "audit":
+        build_audit(args.source, args.output, args.start, args.end, theme=args.theme)
+    elif args.command == "export":
+        export_statements(
+            args.source, args.out_dir, tuple(args.formats or ("csv",)), args.run_date,
+            args.pdf, theme=args.theme,
+        )
+    elif args.command == "schedule":
+        schedule_statements(
+            args.source, args.out_dir, day=args.day, start=args.start, window=args.window,
+            rate=args.rate, workers=args.workers, reserved=args.reserve,
+            cache_dir=args.cache_dir, theme=args.theme, dry_run=args.dry_run,
+            forecast_days=args.forecast,
+        )
+    elif args.command == "watch":
+        watch_statements(
+            args.source, args.out_dir, workers=args.workers, cache_dir=args.cache_dir,
+            theme=args.theme, quiet=args.quiet, max_delay=args.max_delay, poll=args.poll,
+            once=args.once, recheck=args.recheck,
+        )
+    elif args.command == "rollup":
+        update_rollups(args.source, rebuild=args.rebuild, today=args.today)
+    elif args.command == "activity":
+        build_activity(args.source, args.venue_id, args.year, args.output, theme=args.theme)
+    elif args.command == "earnings":
+        build_earnings(
+            args.source, args.out_dir, args.start, args.end, employee_ids=args.employee,
+            workers=args.workers, cache_dir=args.cache_dir, theme=args.theme,
+            dry_run=args.dry_run, max_attempts=args.max_attempts, retry_failed=args.retry_failed,
+        )
+    elif args.command in ("statements", "bundle") and args.dry_run:
+        list_statements(
+            args.source, out_dir=getattr(args, "out_dir", None),
+            run_date=getattr(args, "run_date", None),
+        )
+    elif args.command == "bundle":
+        output = args.output or f"payout-run-{args.run_date or 'all'}.pdf"
+        build_bundle(args.source, output, run_date=args.run_date, theme=args.theme)
+    elif args.command == "statements":
+        build_statements(
+            args.source, args.out_dir, workers=args.workers,
+            cache_dir=args.cache_dir, theme=args.theme, metrics_path=args.metrics,
+            profile=args.profile, trace_memory=args.trace_memory,
+            max_attempts=args.max_attempts, retry_failed=args.retry_failed,
+        )
+    elif args.metrics or args.profile or args.trace_memory:
+        from reports.sections import BuildMetrics
+
+        metrics = BuildMetrics(profile=set(args.profile), trace_memory=args.trace_memory)
+        build_pdf(*sink_for(args.output), theme=args.theme, metrics=metrics)
+        print(metrics.report())
+        for path in metrics.dump_profiles():
+            print(f"Profile written to {path}")
+    else:
+        build_pdf(*sink_for(args.output), theme=args.theme)
 
 
 if __name__ == "__main__":
-    build_pdf()
+    main()
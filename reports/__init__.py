@@ -0,0 +1 @@
+"""TipUs reporting helpers shared by the PDF generator scripts."""
@@ -0,0 +1,138 @@
+"""Yearly tip activity report for one venue, built from daily rollups.
+
+Every figure comes from source.iter_daily(), which serves closed days out
+of the tip_daily rollup store (see reports.rollups), so the report reads
+at most 365 aggregate rows however many tips the venue took.
+reportlab is imported only when the PDF is built.
+"""
+
+import re
+from datetime import date
+
+from reports.palettes import DEFAULT_THEME
+from reports.rollups import sum_days
+from reports.sources import open_source
+
+
+def activity_filename(venue, year):
+    slug = venue.get("slug") or re.sub(r"[^a-z0-9]+", "-", (venue.get("name") or "").lower())
+    return f"{slug.strip('-') or venue['id']}_activity_{year}.pdf"
+
+
+def monthly(days):
+    """(YYYY-MM, column totals) for every month with tips, from daily rows in day order."""
+    months = {}
+    for row in days:
+        months.setdefault(row["day"][:7], []).append(row)
+    return [(month, sum_days(rows)) for month, rows in months.items()]
+
+
+def iter_activity_story(venue, year, days, width, theme=DEFAULT_THEME):
+    """Yield the activity report flowables; days are daily aggregate rows for the year."""
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, Spacer, Table, HRFlowable
+
+    from reports import assets
+    from reports.sections import section
+    from reports.statements import Logo, format_cents
+    from reports.theme import get_theme
+
+    t = get_theme(theme)
+    styles = t.styles("statement")
+    name = t.fonts.markup(venue.get("name") or venue["id"])
+    totals = sum_days(days)
+    logo = assets.logo_path(venue)
+
+    # ─── HEADER ───
+    title = Paragraph(name, styles["title"])
+    if logo:
+        yield section("Header", Logo(logo))
+        yield title
+    else:
+        yield section("Header", title)
+    yield Paragraph(f"Tip Activity  |  {year}", styles["subtitle"])
+    yield HRFlowable(width=width, thickness=2, color=t.primary, spaceAfter=4 * mm)
+
+    # ─── SUMMARY ───
+    yield section("Summary", Paragraph("Summary", styles["heading"]))
+    best = max(days, key=lambda row: row["succeeded_amount"], default=None)
+    summary_data = [
+        ["Tips Received", f"{totals['succeeded']:,}"],
+        ["Total Tipped", format_cents(totals["succeeded_amount"])],
+        ["Refunded", f"{totals['refunded']:,} ({format_cents(totals['refunded_amount'])})"],
+        ["Failed / Pending", f"{totals['failed']:,} / {totals['pending']:,}"],
+        ["Days with Tips", f"{sum(1 for row in days if row['succeeded']):,}"],
+    ]
+    if best is not None and best["succeeded"]:
+        summary_data.append(
+            ["Best Day", f"{best['day']}  ({format_cents(best['succeeded_amount'])})"]
+        )
+    summary_table = Table(summary_data, colWidths=[width * 0.35, width * 0.65])
+    summary_table.setStyle(t.table_style("statement.summary"))
+    yield summary_table
+
+    # ─── BY MONTH ───
+    yield section("By Month", Paragraph("By Month", styles["heading"]))
+    if not days:
+        yield Paragraph(f"No tips recorded in {year}.", styles["body"])
+    else:
+        month_data = [["Month", "Tips", "Tipped", "Refunds", "Refunded"]]
+        for month, m in monthly(days):
+            month_data.append([
+                date.fromisoformat(f"{month}-01").strftime("%B"),
+                f"{m['succeeded']:,}",
+                format_cents(m["succeeded_amount"]),
+                f"{m['refunded']:,}",
+                format_cents(m["refunded_amount"]),
+            ])
+        month_data.append([
+            "Total", f"{totals['succeeded']:,}", format_cents(totals["succeeded_amount"]),
+            f"{totals['refunded']:,}", format_cents(totals["refunded_amount"]),
+        ])
+        month_table = Table(
+            month_data,
+            colWidths=[width * 0.28, width * 0.14, width * 0.22, width * 0.14, width * 0.22],
+            repeatRows=1,
+        )
+        month_table.setStyle(t.table_style("statement.distributions"))
+        yield month_table
+
+    # ─── FOOTER ───
+    yield section("Footer", Spacer(1, 10 * mm))
+    yield HRFlowable(width=width, thickness=0.5, color=t.border, spaceAfter=3 * mm)
+    yield Paragraph(f"TipUs  |  {name}  |  Tip Activity {year}  |  Confidential", styles["footer"])
+
+
+def build_activity(venue, year, days, output, theme=DEFAULT_THEME):
+    """Render the activity report into output, a path or a binary file."""
+    from reportlab.platypus import SimpleDocTemplate
+
+    from reports.statements import PAGE_SETUP
+    from reports.story import StreamingStory
+
+    doc = SimpleDocTemplate(
+        output, **PAGE_SETUP,
+        title=f"Tip Activity {year} {venue['id']}", author="TipUs", invariant=1,
+    )
+    doc.build(StreamingStory(iter_activity_story(venue, year, days, doc.width, theme)))
+    return output
+
+
+def render_activity(source_path, venue_id, year, sink, filename=None, theme=DEFAULT_THEME):
+    """Build venue_id's report for year into sink; returns (filename, days with tips).
+
+    LookupError if the venue is not in the source.
+    """
+    source = open_source(source_path)
+    try:
+        venue = next((v for v in source.iter_table("venues") if v["id"] == venue_id), None)
+        if venue is None:
+            raise LookupError(f"no venue {venue_id}")
+        days = list(source.iter_daily(venue_id, f"{year}-01-01", f"{year}-12-31"))
+    finally:
+        source.close()
+    filename = filename or activity_filename(venue, year)
+    with sink.open(filename) as f:
+        build_activity(venue, year, days, f, theme)
+    return filename, len(days)
+
@@ -0,0 +1,249 @@
+"""Venue logos fetched once, normalised once and shared by every render process.
+
+venues.logo_url points into Supabase Storage. FileStore is its local
+stand-in: a directory laid out as <bucket>/<path>, so that
+".../storage/v1/object/public/logos/acme.png", "logos/acme.png" and
+"file:///.../logos/acme.png" all resolve to a file under it.
+
+The first render that needs a venue's logo decodes it with Pillow and fits
+it inside LOGO_SIZE pixels on a white canvas of exactly that size. It is
+saved as a baseline JPEG under the cache directory as
+<digest[:2]>/<digest>.jpg, named by the SHA-256 of those bytes. An index
+(INDEX_NAME, SQLite in WAL mode) maps each venue to the updated_at and
+logo_url it was normalised from and the resulting digest. Every process
+reads the same index and the same files, so a pool renders each logo once
+per change rather than once per statement per worker. A venue whose
+updated_at has moved on is fetched again, and a logo that is missing or
+cannot be decoded is recorded as no logo until then.
+
+Statements hand reportlab the cached file's path. reportlab embeds a JPEG
+file's data as it is, without decoding it, and the OS page cache holds one
+copy of each file for all the workers. Handing it the pixels would make
+every document decode and re-encode the image.
+
+Nothing is fetched until a store is configured ($TIPUS_ASSET_STORE or
+configure()). Without one, documents carry no logo and come out exactly
+as before.
+"""
+
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+from functools import lru_cache
+from urllib.parse import unquote, urlparse
+
+from reports.sinks import FILE_MODE
+
+DEFAULT_CACHE_DIR = ".asset-cache"
+INDEX_NAME = "index.sqlite"
+
+# Pixels of every normalised logo, 3:1, and the size it is drawn at in
+# points (36 x 12 mm), about 300 dpi
+LOGO_SIZE = (432, 144)
+LOGO_BOX = (36 * 72 / 25.4, 12 * 72 / 25.4)
+LOGO_QUALITY = 90
+# Part of the index key: bump when normalisation changes so logos are redone
+NORMALISE_VERSION = "1"
+
+STORAGE_PREFIX = "/storage/v1/object/"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logos (
+    venue_id TEXT PRIMARY KEY,
+    updated_at TEXT,
+    logo_url TEXT NOT NULL,
+    version TEXT NOT NULL,
+    digest TEXT
+)
+"""
+
+_settings = {
+    "store": os.environ.get("TIPUS_ASSET_STORE") or None,
+    "cache_dir": os.environ.get("TIPUS_ASSET_CACHE") or DEFAULT_CACHE_DIR,
+}
+
+
+# ─── Configuration ───
+
+def configure(store=None, cache_dir=None):
+    """Set the file store logos are fetched from and the cache directory for this process.
+
+    None keeps the current setting ($TIPUS_ASSET_STORE / $TIPUS_ASSET_CACHE
+    unless changed).
+    """
+    if store is not None:
+        _settings["store"] = store
+    if cache_dir is not None:
+        _settings["cache_dir"] = cache_dir
+
+
+def settings():
+    """(store, cache_dir) in effect, e.g. to hand on to pool workers."""
+    return _settings["store"], _settings["cache_dir"]
+
+
+def current():
+    """The AssetCache for the configured store, or None when there is no store."""
+    store, cache_dir = settings()
+    return _asset_cache(store, cache_dir) if store else None
+
+
+@lru_cache(maxsize=None)
+def _asset_cache(store, cache_dir):
+    _pillow()
+    return AssetCache(cache_dir, FileStore(store))
+
+
+def _pillow():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError as exc:
+        raise ImportError("venue logos need Pillow (pip install pillow)") from exc
+    return Image, ImageOps
+
+
+def logo_path(venue):
+    """Path of the venue's normalised logo (a JPEG of LOGO_SIZE), or None."""
+    cache = current()
+    if cache is None or not venue.get("logo_url"):
+        return None
+    return cache.logo(venue)
+
+
+def draw_logo(canv, path, page_setup):
+    """Draw a logo in the top margin, flush with the right edge of the text frame."""
+    pagesize = page_setup["pagesize"]
+    width, height = LOGO_BOX
+    x = pagesize[0] - page_setup["rightMargin"] - width
+    y = pagesize[1] - page_setup["topMargin"] + (page_setup["topMargin"] - height) / 2
+    canv.drawImage(path, x, y, width, height)
+
+
+# ─── Store ───
+
+class FileStore:
+    """Local stand-in for Supabase Storage: <root>/<bucket>/<path>."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def path(self, url):
+        """The file a logo_url refers to; ValueError if it points outside the store."""
+        parsed = urlparse(url)
+        if parsed.scheme == "file":
+            path = os.path.abspath(unquote(parsed.path))
+        else:
+            key = unquote(parsed.path)
+            if STORAGE_PREFIX in key:
+                # object/public/<bucket>/<path> or object/sign/<bucket>/<path>
+                key = key.split(STORAGE_PREFIX, 1)[1].split("/", 1)[-1]
+            path = os.path.abspath(os.path.join(self.root, key.lstrip("/")))
+        if os.path.commonpath((path, self.root)) != self.root:
+            raise ValueError(f"logo {url!r} is outside the asset store")
+        return path
+
+    def read(self, url):
+        with open(self.path(url), "rb") as f:
+            return f.read()
+
+
+def normalise_logo(data):
+    """JPEG bytes of an image fitted inside LOGO_SIZE on a white canvas of that size.
+
+    The logo keeps its aspect ratio and sits against the right edge,
+    centred vertically. Transparency is flattened onto white and the EXIF
+    orientation applied; no metadata is kept, so the same image always
+    gives the same bytes.
+    """
+    Image, ImageOps = _pillow()
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA")
+        image.thumbnail(LOGO_SIZE, Image.LANCZOS)
+        canvas = Image.new("RGB", LOGO_SIZE, "white")
+        offset = (LOGO_SIZE[0] - image.width, (LOGO_SIZE[1] - image.height) // 2)
+        canvas.paste(image, offset, image)
+    out = io.BytesIO()
+    canvas.save(out, "JPEG", quality=LOGO_QUALITY, progressive=False, optimize=False)
+    return out.getvalue()
+
+
+# ─── Cache ───
+
+class AssetCache:
+    """Normalised logos under directory, keyed by content, indexed by venue."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, store=None):
+        self.directory = directory
+        self.store = store
+        self._conn = None
+        self._pid = None
+        # (venue_id, updated_at, logo_url) -> path, or "" for no logo, in this process
+        self._memo = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _index(self):
+        # A pool worker forked after the parent opened the index needs its own connection
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(os.path.join(self.directory, INDEX_NAME), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def blob_path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.jpg")
+
+    def put(self, data):
+        """Store normalised bytes under their digest, once; returns the digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Readers only ever see a whole file: write aside, then rename into place
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            os.fchmod(fd, FILE_MODE)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return digest
+
+    def logo(self, venue):
+        """Path of the venue's normalised logo, fetching it if the index is stale; or None."""
+        memo_key = (venue["id"], venue.get("updated_at"), venue["logo_url"])
+        if memo_key not in self._memo:
+            path = self._lookup(venue)
+            self._memo[memo_key] = self._fetch(venue) if path is None else path
+        return self._memo[memo_key] or None
+
+    def _lookup(self, venue):
+        """The indexed path while the index matches the venue row, "" for no logo, else None."""
+        row = self._index().execute(
+            "SELECT updated_at, logo_url, version, digest FROM logos WHERE venue_id = ?",
+            (venue["id"],),
+        ).fetchone()
+        if row is None or row[:3] != (venue.get("updated_at"), venue["logo_url"], NORMALISE_VERSION):
+            return None
+        if row[3] is None:
+            return ""
+        path = self.blob_path(row[3])
+        return path if os.path.exists(path) else None
+
+    def _fetch(self, venue):
+        Image, _ImageOps = _pillow()
+        try:
+            digest = self.put(normalise_logo(self.store.read(venue["logo_url"])))
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Missing, outside the store or not an image (Pillow's errors are OSErrors)
+            digest = None
+        conn = self._index()
+        conn.execute(
+            "INSERT OR REPLACE INTO logos (venue_id, updated_at, logo_url, version, digest) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (venue["id"], venue.get("updated_at"), venue["logo_url"], NORMALISE_VERSION, digest),
+        )
+        conn.commit()
+        return self.blob_path(digest) if digest else ""
@@ -0,0 +1,303 @@
+"""Reconciliation audit of every venue's payouts, with a discrepancy report PDF.
+
+"Payout Safety" in the status report promises per-employee tracking that
+prevents double payments. audit() checks that promise and the payout math
+for every venue in one pass over each table:
+
+- tips: the succeeded tips in a payout's period sum to its total_amount
+- fee: platform_fee is 5% of total_amount and net_amount is the rest
+- distributions: a payout's distributions sum to its net_amount
+- double_payment: no employee has two completed distributions for
+  overlapping periods
+
+The joins go through dict indexes instead of nested scans: payouts by id
+and by venue, completed distributions by employee. Tips are never held in
+memory. Each venue's payout periods cut time into segments, each tip adds
+its amount to the segment it falls in (one binary search), and a period's
+tip total is a difference of two running segment sums. Memory grows with
+the number of payouts, not tips. reportlab is imported only when the PDF
+is built.
+"""
+
+import time
+from bisect import bisect_right
+from itertools import accumulate
+
+import numpy as np
+
+from reports.palettes import DEFAULT_THEME
+from reports.payouts import split_fee
+from reports.sources import open_source, period_bounds
+
+CHECKS = {
+    "tips": "Tips in period match total_amount",
+    "fee": "Platform fee is 5% of total_amount",
+    "distributions": "Distributions sum to net_amount",
+    "double_payment": "No employee paid twice for a period",
+}
+# Columns of the discrepancy tables; Expected and Found are right-aligned
+DISCREPANCY_COLUMNS = [
+    ("Venue", 0.18), ("Payout", 0.13), ("Detail", 0.43), ("Expected", 0.13), ("Found", 0.13),
+]
+
+
+class Audit:
+    """Discrepancies found per check, and how much was audited.
+
+    Each discrepancy is a dict with venue_id, payout_id and detail, plus
+    the amount in cents the other tables imply (expected) and the one
+    recorded (found), None where they don't apply.
+    """
+
+    def __init__(self, start=None, end=None):
+        self.start = start
+        self.end = end
+        self.discrepancies = {check: [] for check in CHECKS}
+        self.counts = dict.fromkeys(("venues", "payouts", "distributions", "tips"), 0)
+        self.seconds = 0.0
+
+    def add(self, check, venue_id, payout_id, detail, expected=None, found=None):
+        self.discrepancies[check].append({
+            "venue_id": venue_id, "payout_id": payout_id, "detail": detail,
+            "expected": expected, "found": found,
+        })
+
+    @property
+    def total(self):
+        return sum(len(found) for found in self.discrepancies.values())
+
+
+def _in_range(payout, start, end):
+    day = payout["period_end"][:10]
+    return (start is None or day >= start) and (end is None or day <= end)
+
+
+class _PeriodSums:
+    """Succeeded tip amounts and counts per payout period of one venue, filled one tip at a time.
+
+    Tip t is in [s, e] exactly when s <= t < e + "\\0", so the sorted starts
+    and successor-of-ends cut time into segments, and a period's total is
+    the sum of the segments between its two boundaries.
+    """
+
+    def __init__(self, periods):
+        self.boundaries = sorted({s for s, _e in periods} | {e + "\0" for _s, e in periods})
+        self.amounts = [0] * (len(self.boundaries) + 1)
+        self.counts = [0] * (len(self.boundaries) + 1)
+
+    def add(self, created_at, amount):
+        segment = bisect_right(self.boundaries, created_at)
+        self.amounts[segment] += amount
+        self.counts[segment] += 1
+
+    def totals(self, periods):
+        """(amount, count) per period, in the order given."""
+        position = {b: i for i, b in enumerate(self.boundaries)}
+        amounts = [0, *accumulate(self.amounts)]
+        counts = [0, *accumulate(self.counts)]
+        result = []
+        for s, e in periods:
+            lo, hi = position[s] + 1, position[e + "\0"] + 1
+            result.append((amounts[hi] - amounts[lo], counts[hi] - counts[lo]))
+        return result
+
+
+def audit(source, start=None, end=None):
+    """Audit payouts whose period ends in [start, end] (YYYY-MM-DD; None = unbounded)."""
+    began = time.perf_counter()
+    result = Audit(start, end)
+    payouts = [p for p in source.iter_table("payouts") if _in_range(p, start, end)]
+    position = {p["id"]: i for i, p in enumerate(payouts)}
+    by_venue = {}
+    for i, p in enumerate(payouts):
+        by_venue.setdefault(p["venue_id"], []).append(i)
+    employees = {e["id"]: e["name"] for e in source.iter_table("employees")}
+    result.counts["payouts"] = len(payouts)
+    result.counts["venues"] = len(by_venue)
+
+    # ─── Fee ───
+    total = np.array([p["total_amount"] for p in payouts], dtype=np.int64)
+    fee = np.array([p["platform_fee"] for p in payouts], dtype=np.int64)
+    net = np.array([p["net_amount"] for p in payouts], dtype=np.int64)
+    expected_fee, expected_net = split_fee(total)
+    for i in np.flatnonzero(fee != expected_fee):
+        p = payouts[i]
+        result.add("fee", p["venue_id"], p["id"], f"platform_fee, 5% of ${total[i] / 100:,.2f}",
+                   int(expected_fee[i]), int(fee[i]))
+    for i in np.flatnonzero(net != expected_net):
+        p = payouts[i]
+        result.add("fee", p["venue_id"], p["id"], "net_amount (total less fee)",
+                   int(expected_net[i]), int(net[i]))
+
+    # ─── Distributions ───
+    index, amounts = [], []
+    paid = {}
+    for d in source.iter_table("payout_distributions"):
+        i = position.get(d["payout_id"])
+        if i is None:
+            continue
+        index.append(i)
+        amounts.append(d["amount"])
+        if d.get("status") == "completed":
+            paid.setdefault(d["employee_id"], []).append((i, d["amount"]))
+    result.counts["distributions"] = len(index)
+    index = np.array(index, dtype=np.intp)
+    counts = np.bincount(index, minlength=len(payouts))
+    sums = np.bincount(
+        index, weights=np.array(amounts, dtype=np.int64), minlength=len(payouts),
+    ).astype(np.int64)
+    completed = np.array([p.get("status") == "completed" for p in payouts], dtype=bool)
+    # A payout not yet split has no rows; a completed one must have paid someone
+    missing = (counts == 0) & completed & (net > 0)
+    for i in np.flatnonzero(((counts > 0) & (sums != net)) | missing):
+        p = payouts[i]
+        result.add("distributions", p["venue_id"], p["id"], f"{counts[i]} distributions",
+                   int(net[i]), int(sums[i]))
+
+    # ─── Double payments ───
+    for employee_id, rows in paid.items():
+        if len(rows) < 2:
+            continue
+        rows.sort(key=lambda r: (payouts[r[0]]["period_start"][:10], payouts[r[0]]["id"]))
+        latest = None  # (end day, payout index) reaching furthest so far
+        for i, amount in rows:
+            p = payouts[i]
+            if latest is not None and p["period_start"][:10] <= latest[0]:
+                other = payouts[latest[1]]
+                name = employees.get(employee_id) or employee_id
+                result.add(
+                    "double_payment", p["venue_id"], p["id"],
+                    f"{name}, also paid by {other['id']} "
+                    f"({other['period_start'][:10]}..{other['period_end'][:10]})",
+                    None, amount,
+                )
+            end_day = p["period_end"][:10]
+            if latest is None or end_day > latest[0]:
+                latest = (end_day, i)
+
+    # ─── Tips ───
+    bounds = [period_bounds(p) for p in payouts]
+    period_sums = {
+        venue_id: _PeriodSums([bounds[i] for i in rows]) for venue_id, rows in by_venue.items()
+    }
+    if bounds:
+        scanned = 0
+        lo = min(s for s, _e in bounds)
+        hi = max(e for _s, e in bounds)
+        for venue_id, created_at, amount in source.iter_tip_amounts(lo, hi):
+            venue_sums = period_sums.get(venue_id)
+            if venue_sums is not None:
+                venue_sums.add(created_at, amount)
+                scanned += 1
+        result.counts["tips"] = scanned
+    for venue_id, rows in by_venue.items():
+        for i, (amount, count) in zip(rows, period_sums[venue_id].totals([bounds[i] for i in rows])):
+            if amount != total[i]:
+                p = payouts[i]
+                result.add(
+                    "tips", venue_id, p["id"],
+                    f"{p['period_start'][:10]}..{p['period_end'][:10]}, {count:,} tips",
+                    amount, int(total[i]),
+                )
+
+    for found in result.discrepancies.values():
+        found.sort(key=lambda d: (d["venue_id"], d["payout_id"]))
+    result.seconds = time.perf_counter() - began
+    return result
+
+
+# ─── Report ───
+
+def _scope(result):
+    if result.start is None and result.end is None:
+        return "All payouts"
+    return f"Periods ending {result.start or '…'} to {result.end or '…'}"
+
+
+def iter_audit_story(result, venue_names, width, theme=DEFAULT_THEME):
+    """Yield the audit report flowables."""
+    from reportlab.lib.units import mm
+    from reportlab.platypus import HRFlowable, Paragraph, Spacer, Table
+
+    from reports.ledger import LedgerTable
+    from reports.sections import section
+    from reports.statements import format_cents
+    from reports.theme import get_theme
+
+    t = get_theme(theme)
+    styles = t.styles("statement")
+
+    # ─── HEADER ───
+    yield section("Header", Paragraph("Reconciliation Audit", styles["title"]))
+    yield Paragraph(f"Payout Safety  |  {_scope(result)}", styles["subtitle"])
+    yield HRFlowable(width=width, thickness=2, color=t.primary, spaceAfter=4 * mm)
+
+    # ─── SUMMARY ───
+    yield section("Summary", Paragraph("Summary", styles["heading"]))
+    counts = result.counts
+    summary_data = [
+        ["Audited", f"{counts['payouts']:,} payouts across {counts['venues']:,} venues"],
+        ["Rows Read", f"{counts['distributions']:,} distributions, {counts['tips']:,} tips"],
+    ]
+    for check, label in CHECKS.items():
+        found = len(result.discrepancies[check])
+        summary_data.append([label, f"{found:,} discrepancies" if found else "Verified"])
+    summary_table = Table(summary_data, colWidths=[width * 0.45, width * 0.55])
+    summary_table.setStyle(t.table_style("statement.summary"))
+    yield summary_table
+    if not result.total:
+        yield Spacer(1, 4 * mm)
+        yield Paragraph("No discrepancies found.", styles["body"])
+
+    # ─── DISCREPANCIES ───
+    def rows(found):
+        for d in found:
+            yield (
+                venue_names.get(d["venue_id"]) or d["venue_id"],
+                d["payout_id"],
+                d["detail"],
+                "" if d["expected"] is None else format_cents(d["expected"]),
+                "" if d["found"] is None else format_cents(d["found"]),
+            )
+
+    for check, label in CHECKS.items():
+        found = result.discrepancies[check]
+        if not found:
+            continue
+        yield section(label, Paragraph(label, styles["heading"]))
+        yield LedgerTable(
+            rows(found), DISCREPANCY_COLUMNS, width, t.table_style("audit.discrepancies"),
+            fonts=t.fonts,
+        )
+
+    # ─── FOOTER ───
+    yield section("Footer", Spacer(1, 10 * mm))
+    yield HRFlowable(width=width, thickness=0.5, color=t.border, spaceAfter=3 * mm)
+    yield Paragraph("TipUs  |  Reconciliation Audit  |  Confidential", styles["footer"])
+
+
+def build_audit(result, venue_names, output, theme=DEFAULT_THEME):
+    """Render the audit report into output, a path or a binary file."""
+    from reportlab.platypus import SimpleDocTemplate
+
+    from reports.statements import PAGE_SETUP
+    from reports.story import StreamingStory
+
+    doc = SimpleDocTemplate(
+        output, **PAGE_SETUP, title="Reconciliation Audit", author="TipUs", invariant=1,
+    )
+    doc.build(StreamingStory(iter_audit_story(result, venue_names, doc.width, theme)))
+    return output
+
+
+def render_audit(source_path, sink, filename, start=None, end=None, theme=DEFAULT_THEME):
+    """Audit source_path and write the report into sink; returns the Audit."""
+    source = open_source(source_path)
+    try:
+        result = audit(source, start, end)
+        venue_names = {v["id"]: v.get("name") for v in source.iter_table("venues")}
+    finally:
+        source.close()
+    with sink.open(filename) as f:
+        build_audit(result, venue_names, f, theme)
+    return result
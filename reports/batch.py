@@ -0,0 +1,370 @@
+"""Batch payout statement generation fanned out over a process pool.
+
+Everything that needs reportlab is imported inside the functions that
+render, so building and listing jobs (statements --dry-run) stays quick.
+"""
+
+import json
+import os
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from reports import assets
+from reports.cache import BuildCache, content_key
+from reports.journal import DEFAULT_MAX_ATTEMPTS, JOURNAL_NAME, Journal
+from reports.palettes import DEFAULT_THEME
+from reports.payouts import reconcile
+from reports.sinks import DirectorySink
+from reports.sources import open_source, shared_source, period_bounds
+from reports.workers import warm_pool
+
+MANIFEST_NAME = ".statements.json"
+# Most statements a worker renders before the journal hears about them
+MAX_CHUNK = 16
+
+
+def _make_job(payout, venue, distributions, employee_names):
+    """A statement job: the payout with its venue, distributions and venue staff names.
+
+    distributions need employee_name filled in; they are sorted in place.
+    """
+    distributions.sort(key=lambda d: (d.get("employee_name") or "", d["employee_id"]))
+    return {
+        "payout": payout,
+        "venue": venue or {"id": payout["venue_id"]},
+        "distributions": distributions,
+        "employee_names": employee_names,
+    }
+
+
+def _reconcile(jobs):
+    # One vectorised pass checks the fee and days-active split of every payout
+    issues = reconcile(
+        [job["payout"] for job in jobs],
+        [dist for job in jobs for dist in job["distributions"]],
+    )
+    for job in jobs:
+        job["reconciliation"] = issues[job["payout"]["id"]]
+    return jobs
+
+
+def build_jobs(source, payout_ids=None):
+    """Group distributions under their payout, one statement job per payouts row.
+
+    Tips are not part of the job; each renderer streams them from the source.
+    payout_ids limits the jobs to those payouts.
+    """
+    venues = {v["id"]: v for v in source.iter_table("venues")}
+    employees = {}
+    venue_staff = {}
+    for emp in source.iter_table("employees"):
+        employees[emp["id"]] = emp["name"]
+        venue_staff.setdefault(emp["venue_id"], {})[emp["id"]] = emp["name"]
+
+    by_payout = {}
+    for dist in source.iter_table("payout_distributions"):
+        if payout_ids is not None and dist["payout_id"] not in payout_ids:
+            continue
+        by_payout.setdefault(dist["payout_id"], []).append(
+            {**dist, "employee_name": employees.get(dist["employee_id"])}
+        )
+
+    jobs = []
+    for payout in source.iter_table("payouts"):
+        if payout_ids is not None and payout["id"] not in payout_ids:
+            continue
+        jobs.append(_make_job(
+            payout, venues.get(payout["venue_id"]), by_payout.get(payout["id"], []),
+            venue_staff.get(payout["venue_id"], {}),
+        ))
+    _reconcile(jobs)
+
+    # Stable order so file names and logs don't depend on source ordering
+    jobs.sort(key=lambda j: (j["payout"]["venue_id"], j["payout"]["period_start"], j["payout"]["id"]))
+    return jobs
+
+
+def statement_filename(job):
+    payout = job["payout"]
+    slug = job["venue"].get("slug") or payout["venue_id"]
+    return f"{slug}_{payout['period_start'][:10]}_{payout['id'][:8]}.pdf"
+
+
+def find_job(source, venue_id, period_start):
+    """The job for one venue's payout starting on period_start (YYYY-MM-DD); LookupError if none.
+
+    Reads only that venue's rows and the payout's distributions, not the
+    whole tables as build_jobs() does, so it suits one-off lookups.
+    """
+    payouts = [
+        p for p in source.iter_rows("payouts", "venue_id", venue_id)
+        if p["period_start"][:10] == period_start[:10]
+    ]
+    if not payouts:
+        raise LookupError(f"no payout for venue {venue_id} starting {period_start[:10]}")
+    # The one build_jobs() would list first
+    payout = min(payouts, key=lambda p: (p["period_start"], p["id"]))
+    venue = next(iter(source.iter_rows("venues", "id", venue_id)), None)
+    staff = {e["id"]: e["name"] for e in source.iter_rows("employees", "venue_id", venue_id)}
+    distributions = []
+    for dist in source.iter_rows("payout_distributions", "payout_id", payout["id"]):
+        name = staff.get(dist["employee_id"])
+        if name is None:
+            # Paid at this venue but listed under another one
+            emp = next(iter(source.iter_rows("employees", "id", dist["employee_id"])), None)
+            name = emp and emp["name"]
+        distributions.append({**dist, "employee_name": name})
+    return _reconcile([_make_job(payout, venue, distributions, staff)])[0]
+
+
+def statement_key(job, source, theme=DEFAULT_THEME):
+    from reports.statements import style_digest, TEMPLATE_VERSION
+
+    start, end = period_bounds(job["payout"])
+    tips = source.iter_tips(job["payout"]["venue_id"], start, end)
+    logo = assets.logo_path(job["venue"])
+    if logo:
+        # The venue row keys the logo's URL and updated_at; its file name keys the pixels
+        job = {**job, "logo": os.path.basename(logo)}
+    return content_key(job, style_digest(theme), TEMPLATE_VERSION, tips)
+
+
+def _render(job, out_dir, source_path, cache_dir=None, previous_key=None, theme=DEFAULT_THEME,
+            instrument=None):
+    """Render one statement; returns (path, key, status, metrics).
+
+    status is "skipped" when the output on disk already matches the key,
+    "cached" when it was copied from the build cache, else "rendered".
+    instrument is None or a dict of BuildMetrics arguments; instrumented
+    statements are always laid out, and metrics is their as_dict() (else None).
+    """
+    from reports.charts import statement_series
+    from reports.sections import BuildMetrics, profile_filename
+    from reports.statements import build_statement
+
+    source = shared_source(source_path)
+    sink = DirectorySink(out_dir)
+    name = statement_filename(job)
+    path = sink.path(name)
+    key = statement_key(job, source, theme)
+    cache = BuildCache(cache_dir) if cache_dir else None
+    if instrument is None:
+        if key == previous_key and os.path.exists(path):
+            return path, key, "skipped", None
+        if cache and cache.restore(key, path):
+            return path, key, "cached", None
+
+    start, end = period_bounds(job["payout"])
+    metrics = BuildMetrics(**instrument) if instrument is not None else None
+    with sink.open(name) as f:
+        build_statement(
+            job, f, source.iter_tips(job["payout"]["venue_id"], start, end), theme, metrics,
+            statement_series(source, job),
+        )
+    if cache:
+        cache.store(key, path)
+    if metrics is None:
+        return path, key, "rendered", None
+    stem = os.path.splitext(path)[0]
+    for name, profiler in metrics.profiles.items():
+        profiler.dump_stats(f"{stem}.{profile_filename(name)}")
+    return path, key, "rendered", metrics.as_dict()
+
+
+def load_manifest(out_dir, name=MANIFEST_NAME):
+    """{file name: content key} from the last run into out_dir."""
+    try:
+        with open(os.path.join(out_dir, name), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(out_dir, manifest, name=MANIFEST_NAME):
+    path = os.path.join(out_dir, name)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _render_chunk(jobs, previous, out_dir, source_path, cache_dir=None, theme=DEFAULT_THEME,
+                  instrument=None):
+    """_render() each job; one that raises comes back as a "failed: <error>" result."""
+    results = []
+    for job, prev in zip(jobs, previous):
+        try:
+            results.append(_render(job, out_dir, source_path, cache_dir, prev, theme, instrument))
+        except Exception as exc:
+            path = os.path.join(out_dir, statement_filename(job))
+            results.append((path, None, f"failed: {exc}", None))
+    return results
+
+
+def _render_round(jobs, names, indices, previous, render_chunk, args, pool, chunksize, record):
+    """render_chunk() jobs[i] for i in indices, calling record(chunk indices, results) per chunk.
+
+    args are render_chunk()'s arguments after previous, out_dir first.
+    Chunks are recorded as they finish, in any order; pool=None renders
+    in-process. Returns True if a worker died: the jobs of every chunk it
+    took down are recorded as failed, and the pool cannot be used again.
+    """
+    chunks = [indices[k:k + chunksize] for k in range(0, len(indices), chunksize)]
+    if pool is None:
+        for chunk in chunks:
+            record(chunk, render_chunk(
+                [jobs[i] for i in chunk], [previous[i] for i in chunk], *args,
+            ))
+        return False
+
+    futures = {
+        pool.submit(
+            render_chunk, [jobs[i] for i in chunk], [previous[i] for i in chunk], *args,
+        ): chunk
+        for chunk in chunks
+    }
+    broken = False
+    for future in as_completed(futures):
+        chunk = futures[future]
+        try:
+            results = future.result()
+        except BrokenProcessPool as exc:
+            broken = True
+            results = [
+                (os.path.join(args[0], names[i]), None, f"failed: render worker died ({exc})", None)
+                for i in chunk
+            ]
+        record(chunk, results)
+    return broken
+
+
+def run_journalled(jobs, names, render_chunk, args, manifest, workers=None, theme=DEFAULT_THEME,
+                   pool=None, max_attempts=DEFAULT_MAX_ATTEMPTS, retry_failed=False,
+                   journal_name=JOURNAL_NAME, max_chunk=MAX_CHUNK):
+    """Render jobs to the files names under out_dir (args[0]), journalled; results in job order.
+
+    render_chunk(jobs, previous keys, *args) returns a (path, key, status,
+    metrics) result per job, with status "failed: <error>" for a job that
+    raised. Each chunk's results are committed to the journal as it
+    finishes. A job the journal has finished resumes with its key, else
+    with the one in manifest. Failed jobs are retried one at a time until
+    they have failed max_attempts times across runs; see render_statements().
+    """
+    out_dir = args[0]
+    workers = workers or os.cpu_count() or 1
+    n = len(jobs)
+    in_process = n <= 1 or (workers == 1 and pool is None)
+    own_pool = pool is None and not in_process
+    results = [None] * n
+    journal = Journal(out_dir, journal_name)
+    try:
+        if retry_failed:
+            journal.retry_failed()
+        previous = []
+        pending = []
+        for i, name in enumerate(names):
+            entry = journal.entry(name)
+            # A job the journal knows about resumes from it; others from the manifest
+            previous.append(
+                journal.resume_key(os.path.join(out_dir, name)) if entry else manifest.get(name)
+            )
+            if journal.exhausted(name, max_attempts):
+                results[i] = (
+                    os.path.join(out_dir, name), None,
+                    f"failed: gave up after {entry['attempts']} attempts ({entry['error']})", None,
+                )
+            else:
+                pending.append(i)
+
+        def record(chunk, chunk_results):
+            journal.record(chunk_results)
+            for i, result in zip(chunk, chunk_results):
+                results[i] = result
+
+        # Small jobs are cheap to pickle; batching them keeps IPC overhead down, and the
+        # cap keeps each checkpoint a few jobs apart
+        chunksize = max(1, min(max_chunk, n // (workers * 4)))
+        while pending:
+            if own_pool and pool is None:
+                pool = warm_pool(workers, themes=(theme,))
+            broken = _render_round(
+                jobs, names, pending, previous, render_chunk, args,
+                None if in_process else pool, chunksize, record,
+            )
+            if broken:
+                if not own_pool:
+                    raise BrokenProcessPool("a render worker died; the journal has the finished jobs")
+                pool.shutdown(cancel_futures=True)
+                pool = None
+            # Retries go one at a time, so a job that kills its worker fails alone
+            pending = [
+                i for i in pending
+                if results[i][2].startswith("failed") and not journal.exhausted(names[i], max_attempts)
+            ]
+            chunksize = 1
+    finally:
+        journal.close()
+        if own_pool and pool is not None:
+            pool.shutdown()
+    return results
+
+
+def render_statements(source_path, out_dir, workers=None, cache_dir=None, theme=DEFAULT_THEME,
+                      metrics_path=None, profile=(), trace_memory=False, payout_ids=None,
+                      pool=None, max_attempts=DEFAULT_MAX_ATTEMPTS, retry_failed=False):
+    """Render a statement for every payout in the source.
+
+    Returns (path, status) pairs in job order. workers defaults to the number
+    of cores; workers=1 renders in-process. With cache_dir set, statements
+    whose content key is unchanged since the last run are left untouched and
+    previously rendered keys are restored from the cache.
+
+    Every finished statement is committed to out_dir's reports.journal
+    as it completes. A run that dies part way therefore resumes: the
+    statements it finished are skipped on the next run. A statement that
+    fails is retried until it has failed max_attempts times across runs,
+    and then comes back as "failed: ..." without being tried. retry_failed
+    gives those statements their attempts back. A render worker that dies
+    is replaced, unless the pool was passed in.
+
+    payout_ids renders only those payouts' statements, leaving the rest of
+    out_dir and its manifest as they are. pool is a warm_pool() to render
+    in instead of starting one for this call.
+
+    metrics_path turns on instrumentation: every statement is laid out and
+    one JSON line of per-section metrics per statement is written there.
+    Sections named in profile are profiled to <statement>.<section>.prof.
+    """
+    source = open_source(source_path)
+    try:
+        jobs = build_jobs(source, payout_ids)
+    finally:
+        source.close()
+
+    DirectorySink(out_dir).remove_stale()
+    manifest = load_manifest(out_dir)
+    names = [statement_filename(job) for job in jobs]
+
+    instrument = None
+    if metrics_path or profile or trace_memory:
+        instrument = {"profile": set(profile), "trace_memory": trace_memory}
+
+    results = run_journalled(
+        jobs, names, _render_chunk, (out_dir, source_path, cache_dir, theme, instrument), manifest,
+        workers, theme, pool, max_attempts, retry_failed,
+    )
+
+    # A statement that failed keeps the key of the file it left in place
+    keys = {
+        name: key if key is not None else manifest.get(name)
+        for name, (_path, key, _status, _m) in zip(names, results)
+    }
+    keys = {name: key for name, key in keys.items() if key is not None}
+    save_manifest(out_dir, keys if payout_ids is None else {**manifest, **keys})
+    if cache_dir:
+        BuildCache(cache_dir).evict()
+    if metrics_path:
+        with open(metrics_path, "w", encoding="utf-8") as f:
+            for path, _key, _status, metrics in results:
+                if metrics is not None:
+                    f.write(json.dumps({"file": os.path.basename(path), **metrics}) + "\n")
+    return [(path, status) for path, _key, status, _metrics in results]
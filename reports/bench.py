@@ -0,0 +1,294 @@
+"""Benchmark the statement generator on synthetic data.
+
+    python -m reports.bench --scales 10 1000 100000 -o bench.json
+    python -m reports.bench --baseline bench_baseline.json   # exit 1 on regression
+    python -m reports.bench --save-baseline bench_baseline.json
+
+Each scale is a number of tips rows. A SQLite database in the shape of the
+Supabase tables is generated for it (venues, employees, tips, payouts and
+payout_distributions computed with reports.payouts), then every statement is
+built with the phases timed separately:
+
+    load    open the source, build the jobs, read every venue's tips
+    render  statements.build_statement() into memory, as production renders
+            (the canvas fast path for simple statements)
+    write   write the PDF bytes to disk
+    story   platypus: construct the flowables
+    layout  platypus: doc.build() into memory
+
+story and layout time the platypus path on the same statements, so a
+regression on either renderer is flagged. total is load + render + write,
+the time production takes.
+
+Each scale runs in a fresh process so its peak RSS is its own.
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+PHASES = ("load", "render", "write", "story", "layout")
+# The phases production runs through; story and layout only measure platypus
+PRODUCTION_PHASES = ("load", "render", "write")
+TIPS_PER_VENUE = 2000
+EMPLOYEES_PER_VENUE = 5
+DEFAULT_TOLERANCE = 0.20
+# Phases faster than this in both runs are timer noise, never a regression
+NOISE_FLOOR = 0.05
+
+
+def generate_dataset(path, n_tips, n_venues=None, seed=0):
+    """Write a synthetic database with n_tips tips spread over one week."""
+    import numpy as np
+
+    from reports.payouts import prorate, split_fee
+    from reports.sources import create_schema
+
+    rng = random.Random(seed)
+    n_venues = n_venues or max(1, n_tips // TIPS_PER_VENUE)
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+
+    venues = [(f"venue-{v:05d}", f"Venue {v}", f"venue-{v}") for v in range(n_venues)]
+    conn.executemany("INSERT INTO venues (id, name, slug) VALUES (?, ?, ?)", venues)
+    employees = [
+        (f"emp-{v:05d}-{e}", venue_id, f"Employee {v}-{e}", "2026-01-01T00:00:00Z")
+        for v, (venue_id, _name, _slug) in enumerate(venues)
+        for e in range(EMPLOYEES_PER_VENUE)
+    ]
+    conn.executemany(
+        "INSERT INTO employees (id, venue_id, name, activated_at, is_active, status) "
+        "VALUES (?, ?, ?, ?, 1, 'active')",
+        employees,
+    )
+
+    totals = [0] * n_venues
+
+    def tips():
+        for i in range(n_tips):
+            v = i % n_venues
+            amount = rng.randint(100, 5000)
+            totals[v] += amount
+            yield (
+                f"tip-{i:08d}", venues[v][0], f"emp-{v:05d}-{rng.randrange(EMPLOYEES_PER_VENUE)}",
+                amount, rng.choice(("Alex", "Sam", None, "Jordan")), "succeeded",
+                f"2026-02-{1 + i % 7:02d}T{i % 24:02d}:{i % 60:02d}:00Z",
+            )
+
+    conn.executemany(
+        "INSERT INTO tips (id, venue_id, employee_id, amount, tipper_name, status, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        tips(),
+    )
+
+    fee, net = split_fee(totals)
+    payouts = [
+        (f"payout-{v:05d}", venue_id, "2026-02-01", "2026-02-07", totals[v], int(fee[v]), int(net[v]))
+        for v, (venue_id, _name, _slug) in enumerate(venues)
+    ]
+    conn.executemany(
+        "INSERT INTO payouts (id, venue_id, period_start, period_end, total_amount, "
+        "platform_fee, net_amount, status) VALUES (?, ?, ?, ?, ?, ?, ?, 'completed')",
+        payouts,
+    )
+    days = np.array([rng.randint(1, 7) for _ in employees])
+    index = np.repeat(np.arange(n_venues), EMPLOYEES_PER_VENUE)
+    shares = prorate(net, days, index)
+    conn.executemany(
+        "INSERT INTO payout_distributions (id, payout_id, employee_id, amount, days_active, "
+        "total_period_days, is_prorated, status) VALUES (?, ?, ?, ?, ?, 7, ?, 'completed')",
+        (
+            (f"dist-{i:07d}", payouts[index[i]][0], employees[i][0], int(shares[i]),
+             int(days[i]), int(days[i] < 7))
+            for i in range(len(employees))
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scale(n_tips, n_venues=None, repeat=1):
+    """Benchmark one scale; returns the best time of each phase over repeat runs."""
+    from reports.batch import build_jobs, statement_filename
+    from reports.charts import drawing_cache, series_cache, statement_series
+    from reports.sources import SQLiteSource, period_bounds
+    from reports.statements import build_statement, iter_story, statement_doc
+    from reports.story import StreamingStory
+    from reports.workers import warm_up
+
+    with tempfile.TemporaryDirectory(prefix="tipus-bench-") as tmp:
+        db = os.path.join(tmp, "bench.db")
+        generate_dataset(db, n_tips, n_venues)
+
+        # Production renders in warmed workers: one untimed statement through each
+        # renderer keeps first-use costs out of whichever phase runs first
+        warm_up()
+        source = SQLiteSource(db)
+        job = build_jobs(source)[0]
+        start, end = period_bounds(job["payout"])
+        tips = list(itertools.islice(source.iter_tips(job["payout"]["venue_id"], start, end), 100))
+        build_statement(job, io.BytesIO(), tips, series=statement_series(source, job))
+        doc = statement_doc(job, io.BytesIO())
+        doc.build(StreamingStory(iter_story(job, doc.width, tips)))
+        source.close()
+
+        best = {phase: float("inf") for phase in PHASES}
+        pages = size = 0
+        for _ in range(repeat):
+            timings = dict.fromkeys(PHASES, 0.0)
+
+            # Every repeat pays for its chart series and drawings
+            series_cache.clear()
+            drawing_cache.clear()
+            t0 = time.perf_counter()
+            source = SQLiteSource(db)
+            jobs = build_jobs(source)
+            venue_tips = []
+            venue_series = []
+            for job in jobs:
+                start, end = period_bounds(job["payout"])
+                venue_tips.append(list(source.iter_tips(job["payout"]["venue_id"], start, end)))
+                venue_series.append(statement_series(source, job))
+            source.close()
+            timings["load"] = time.perf_counter() - t0
+
+            pages = size = 0
+            for job, tips, series in zip(jobs, venue_tips, venue_series):
+                buf = io.BytesIO()
+                t0 = time.perf_counter()
+                build_statement(job, buf, tips, series=series)
+                timings["render"] += time.perf_counter() - t0
+
+                t0 = time.perf_counter()
+                with open(os.path.join(tmp, statement_filename(job)), "wb") as f:
+                    f.write(buf.getvalue())
+                timings["write"] += time.perf_counter() - t0
+
+                # platypus draws its own charts rather than the ones render cached
+                drawing_cache.clear()
+                doc = statement_doc(job, io.BytesIO())
+                t0 = time.perf_counter()
+                story = list(iter_story(job, doc.width, tips, series=series))
+                timings["story"] += time.perf_counter() - t0
+
+                t0 = time.perf_counter()
+                doc.build(StreamingStory(story))
+                timings["layout"] += time.perf_counter() - t0
+
+                pages += doc.page
+                size += buf.tell()
+
+            for phase in PHASES:
+                best[phase] = min(best[phase], timings[phase])
+
+    best["total"] = sum(best[phase] for phase in PRODUCTION_PHASES)
+    return {
+        "tips": n_tips,
+        "venues": len(jobs),
+        "pages": pages,
+        "bytes": size,
+        "seconds": {k: round(v, 4) for k, v in best.items()},
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def run(scales, n_venues=None, repeat=1):
+    import reportlab
+
+    results = {
+        "python": platform.python_version(),
+        "reportlab": reportlab.Version,
+        "machine": platform.machine(),
+        "scales": {},
+    }
+    # spawn, not fork: a forked child would inherit the parent's peak RSS
+    ctx = get_context("spawn")
+    for n in scales:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            results["scales"][str(n)] = pool.submit(run_scale, n, n_venues, repeat).result()
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """List of regression messages: phases or peak RSS more than tolerance above baseline."""
+    regressions = []
+    for scale, current in results["scales"].items():
+        base = baseline.get("scales", {}).get(scale)
+        if not base:
+            continue
+        for phase, seconds in current["seconds"].items():
+            before = base["seconds"].get(phase)
+            if before and max(before, seconds) >= NOISE_FLOOR and seconds > before * (1 + tolerance):
+                regressions.append(
+                    f"{scale} tips: {phase} {seconds:.3f}s vs {before:.3f}s baseline "
+                    f"(+{seconds / before - 1:.0%})"
+                )
+        before = base.get("peak_rss_mb")
+        if before and current["peak_rss_mb"] > before * (1 + tolerance):
+            regressions.append(
+                f"{scale} tips: peak RSS {current['peak_rss_mb']} MB vs {before} MB baseline"
+            )
+    return regressions
+
+
+def print_table(results):
+    print(f"{'tips':>8} {'venues':>6} {'pages':>6} " + " ".join(f"{p:>8}" for p in PHASES)
+          + f" {'total':>8} {'rss MB':>7}")
+    for scale in results["scales"].values():
+        secs = scale["seconds"]
+        print(f"{scale['tips']:>8} {scale['venues']:>6} {scale['pages']:>6} "
+              + " ".join(f"{secs[p]:>8.3f}" for p in PHASES)
+              + f" {secs['total']:>8.3f} {scale['peak_rss_mb']:>7.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TipUs statement generation.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 1000, 100000],
+                        help="tips rows per run (default: 10 1000 100000)")
+    parser.add_argument("--venues", type=int, default=None,
+                        help=f"venues per run (default: one per {TIPS_PER_VENUE} tips)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scale, best time kept")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="also write results as a new baseline here")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed slowdown before flagging (default: {DEFAULT_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    results = run(args.scales, args.venues, args.repeat)
+    print_table(results)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION  {line}")
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
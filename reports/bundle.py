@@ -0,0 +1,155 @@
+"""One combined PDF for an auto-payout run: every venue's statement, with an outline.
+
+All statements are laid out into a single document in one pass, so fonts
+and other resources are written once and nothing is merged afterwards.
+The story is streamed: each venue's flowables are generated and its tips
+read from the source only when layout reaches it, and the outline entry
+for a statement or section is added as its first flowable is drawn. The
+finished pages are still held by the PDF writer until the file is saved,
+but only as compressed page streams, not as whole intermediate PDFs.
+"""
+
+from reportlab.platypus import Paragraph, PageBreak, SimpleDocTemplate
+
+from reports.batch import build_jobs
+from reports.charts import statement_series
+from reports.ledger import LedgerTable
+from reports.sections import SECTION_ATTR, section
+from reports.sources import open_source, period_bounds
+from reports.statements import PAGE_SETUP, format_cents, format_period, iter_story
+from reports.story import StreamingStory
+from reports.theme import DEFAULT_THEME, get_theme
+
+OUTLINE_ATTR = "_tipus_outline"
+RUN_SUMMARY = "Run Summary"
+# Sections too small to be worth an outline entry
+UNLISTED_SECTIONS = {"Footer"}
+RUN_COLUMNS = [("Venue", 0.34), ("Period", 0.27), ("Total", 0.13), ("Fee", 0.11), ("Net", 0.15)]
+
+
+def outline(title, key, flowable):
+    """Give flowable a top-level outline entry; returns it."""
+    setattr(flowable, OUTLINE_ATTR, (title, key))
+    return flowable
+
+
+def run_jobs(jobs, run_date=None):
+    """The jobs of one run: payouts created on run_date (YYYY-MM-DD), or all of them.
+
+    auto-payout runs once a day from cron and stamps every payout it creates
+    with that day's created_at, so the date identifies the run.
+    """
+    if run_date is None:
+        return list(jobs)
+    return [job for job in jobs if (job["payout"].get("created_at") or "")[:10] == run_date]
+
+
+class BundleDocTemplate(SimpleDocTemplate):
+    """Adds outline entries as tagged flowables are drawn.
+
+    Statements get a top-level entry on their first page; the sections
+    inside each one get an entry beneath it.
+    """
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._statement_key = None
+        self._sections = 0
+
+    def afterFlowable(self, flowable):
+        canv = self.canv
+        entry = getattr(flowable, OUTLINE_ATTR, None)
+        if entry is not None:
+            title, key = entry
+            canv.bookmarkPage(key)
+            canv.addOutlineEntry(title, key, level=0)
+            canv.showOutline()
+            self._statement_key = key
+            self._sections = 0
+            return
+        name = getattr(flowable, SECTION_ATTR, None)
+        if name is None or name in UNLISTED_SECTIONS or self._statement_key is None:
+            return
+        self._sections += 1
+        key = f"{self._statement_key}.{self._sections}"
+        top = self.frame._y + flowable.getSpaceAfter() + flowable.height
+        canv.bookmarkHorizontal(key, 0, top)
+        canv.addOutlineEntry(name, key, level=1)
+
+
+def summary_rows(jobs):
+    for job in jobs:
+        payout = job["payout"]
+        yield (
+            job["venue"].get("name") or payout["venue_id"],
+            format_period(payout),
+            format_cents(payout["total_amount"]),
+            format_cents(payout["platform_fee"]),
+            format_cents(payout["net_amount"]),
+        )
+
+
+def iter_bundle_story(jobs, width, source, title, theme=DEFAULT_THEME):
+    """A run summary, then every job's statement on its own pages, tips streamed from source."""
+    t = get_theme(theme)
+    styles = t.styles("statement")
+
+    # ─── RUN SUMMARY ───
+    yield outline(RUN_SUMMARY, "run", section(RUN_SUMMARY, Paragraph(title, styles["title"])))
+    total = sum(job["payout"]["total_amount"] for job in jobs)
+    net = sum(job["payout"]["net_amount"] for job in jobs)
+    flagged = sum(1 for job in jobs if job.get("reconciliation"))
+    yield Paragraph(
+        f"{len(jobs):,} venue statements  |  {format_cents(total)} in tips  |  "
+        f"{format_cents(net)} distributed",
+        styles["subtitle"],
+    )
+    if flagged:
+        yield Paragraph(
+            f'<font color="{t.warning.hexval()}"><b>{flagged:,}</b></font> payouts failed '
+            "reconciliation; see their statements.",
+            styles["body"],
+        )
+    yield LedgerTable(
+        summary_rows(jobs), RUN_COLUMNS, width, t.table_style("statement.ledger"), fonts=t.fonts,
+    )
+
+    # ─── STATEMENTS ───
+    for job in jobs:
+        payout = job["payout"]
+        yield PageBreak()
+        start, end = period_bounds(payout)
+        story = iter_story(
+            job, width, source.iter_tips(payout["venue_id"], start, end), theme,
+            statement_series(source, job),
+        )
+        name = job["venue"].get("name") or payout["venue_id"]
+        yield outline(f"{name}  ({format_period(payout)})", f"payout-{payout['id']}", next(story))
+        yield from story
+
+
+def build_bundle(jobs, source, output, title="Payout Run", theme=DEFAULT_THEME, metrics=None):
+    """Lay every job's statement out into one PDF written to output (a path or binary file).
+
+    Returns the page count.
+    """
+    doc = BundleDocTemplate(output, **PAGE_SETUP, title=title, author="TipUs", invariant=1)
+    story = StreamingStory(iter_bundle_story(jobs, doc.width, source, title, theme))
+    if metrics is None:
+        doc.build(story)
+    else:
+        metrics.build(doc, story, output)
+    return doc.page
+
+
+def render_bundle(source_path, sink, filename, run_date=None, theme=DEFAULT_THEME):
+    """Build the run bundle for run_date from source_path into sink; returns (statements, pages)."""
+    source = open_source(source_path)
+    try:
+        jobs = run_jobs(build_jobs(source), run_date)
+        title = f"Payout Run {run_date}" if run_date else "Payout Run"
+        with sink.open(filename) as f:
+            pages = build_bundle(jobs, source, f, title, theme)
+    finally:
+        source.close()
+    return len(jobs), pages
@@ -0,0 +1,121 @@
+"""Content-addressed build cache so unchanged documents are not re-rendered.
+
+A document's key is a SHA-256 over its input data, the style definitions and
+the template version. Cached PDFs live under the cache directory as
+<key[:2]>/<key>.pdf; their mtime doubles as the LRU clock, and the directory
+is trimmed back under max_bytes by evict(), which batch callers run once at
+the end rather than after every store.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+from reports.sinks import sink_for
+
+DEFAULT_CACHE_DIR = ".report-cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+def style_fingerprint(*styles):
+    """Digest of ParagraphStyle attributes (parents resolved), TableStyle commands or strings."""
+    h = hashlib.sha256()
+    for style in styles:
+        if isinstance(style, str):
+            h.update(_canonical(style))
+        elif hasattr(style, "getCommands"):
+            h.update(_canonical([[str(part) for part in cmd] for cmd in style.getCommands()]))
+        else:
+            attrs = {k: str(getattr(style, k)) for k in sorted(style.defaults)}
+            h.update(_canonical([style.name, attrs]))
+    return h.hexdigest()
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def content_key(data, styles_digest, template_version, rows=()):
+    """Key over the job data, style digest, template version and an optional row stream."""
+    h = hashlib.sha256()
+    h.update(_canonical([template_version, styles_digest, data]))
+    for row in rows:
+        h.update(_canonical(row))
+    return h.hexdigest()
+
+
+class BuildCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def restore(self, key, output_path):
+        """Copy the cached PDF for key to output_path; False on a miss."""
+        path = self._path(key)
+        try:
+            os.utime(path)  # bump LRU position before another process evicts it
+            _atomic_copy(path, output_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def load(self, key):
+        """The cached PDF bytes for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def store(self, key, output):
+        """Cache output, either the path of a built PDF or its bytes."""
+        sink, name = sink_for(self._path(key))
+        if isinstance(output, bytes):
+            sink.write(name, output)
+        else:
+            _atomic_copy(output, sink.path(name))
+
+    def evict(self):
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".pdf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def _atomic_copy(src, dst):
+    sink, name = sink_for(dst)
+    with sink.open(name) as out, open(src, "rb") as f:
+        shutil.copyfileobj(f, out)
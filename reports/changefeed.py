@@ -0,0 +1,310 @@
+"""Regenerate payout statements as tips and payouts change, from the notifications feed.
+
+The database records most changes a statement depends on as notifications
+rows: stripe-webhook's succeeded tips raise tip_received, and
+complete-payout's status updates raise payout_completed or payout_failed
+(see supabase/migrations/20260217300000_notifications.sql). A
+StatementRefresher polls that table, maps each event to the payouts whose
+statements it touches and re-renders only those through reports.batch, so
+a statement whose content key did not change is still skipped.
+
+Some changes raise no notification:
+- a refund, which takes a tip from succeeded to refunded
+- a distribution transfer that succeeds or fails on retry while its
+  payout keeps its status (e.g. stays partially_completed)
+Those notifications go to venue owners and employees, so they are not
+added for the reports' sake. Instead, every `recheck` seconds the
+refresher queues the open payouts (open_payouts()): those not yet
+completed, and those whose period ended in the last `recheck_days` days.
+Their keys are recomputed and only the ones that changed render. A refund
+of a tip in a completed payout older than recheck_days still goes
+unnoticed until something else touches that payout.
+
+Busy venues take many tips a minute, so events are debounced per payout.
+A statement is rendered once its payout has had no new events for `quiet`
+seconds, or `max_delay` seconds after its first pending event, whichever
+comes first. The feed cursor and the pending payouts are saved in the
+output directory after every poll. A restarted consumer therefore neither
+misses events nor forgets work it had queued.
+
+QueueFeed stands in for the table when events come from a queue.Queue of
+notification-shaped dicts: {"type": ..., "metadata": {...}}.
+"""
+
+import queue
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+
+from reports.batch import load_manifest, render_statements, save_manifest
+from reports.palettes import DEFAULT_THEME
+from reports.sources import open_source, period_bounds
+from reports.workers import warm_pool
+
+EVENT_TYPES = ("tip_received", "payout_completed", "payout_failed")
+STATE_NAME = ".changefeed.json"
+
+DEFAULT_QUIET = 30
+DEFAULT_MAX_DELAY = 300
+DEFAULT_POLL = 5
+DEFAULT_RECHECK = 600
+DEFAULT_RECHECK_DAYS = 30
+# Transactions can commit rows older than ones already read; reread this far back
+COMMIT_LAG = 10
+
+
+def _seconds_before(ts, seconds):
+    """ISO timestamp ts less some seconds, to the second, in the feed's UTC text format."""
+    dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+# ─── Feeds ───
+
+class NotificationFeed:
+    """New notifications rows of EVENT_TYPES from a source, oldest first.
+
+    Each poll rereads from COMMIT_LAG seconds before the newest row seen
+    and skips the ids it has already returned, so a row committed late
+    with an earlier created_at is still picked up exactly once.
+    """
+
+    def __init__(self, source, state=None, lag=COMMIT_LAG):
+        state = state or {}
+        self.source = source
+        self.lag = lag
+        self.cursor = state.get("cursor", "")
+        self.recent = dict(state.get("recent", {}))
+
+    def poll(self):
+        since = _seconds_before(self.cursor, self.lag) if self.cursor else ""
+        events = []
+        for row in self.source.iter_notifications(since, EVENT_TYPES):
+            if row["id"] in self.recent:
+                continue
+            self.recent[row["id"]] = row["created_at"]
+            self.cursor = max(self.cursor, row["created_at"])
+            events.append(row)
+        if self.cursor:
+            floor = _seconds_before(self.cursor, self.lag)
+            self.recent = {i: ts for i, ts in self.recent.items() if ts >= floor}
+        return events
+
+    def state(self):
+        return {"cursor": self.cursor, "recent": self.recent}
+
+
+class QueueFeed:
+    """Events from a queue.Queue, for producers in the same process."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def poll(self):
+        polled = []
+        while True:
+            try:
+                polled.append(self.events.get_nowait())
+            except queue.Empty:
+                return polled
+
+    def state(self):
+        return {}
+
+
+def affected_payouts(source, events):
+    """Ids of the payouts whose statements events change.
+
+    Payout events name their payout; a tip belongs to every payout of its
+    venue whose period covers the tip's created_at, the same window the
+    statement ledger reads.
+    """
+    payout_ids = set()
+    tip_ids = set()
+    for event in events:
+        metadata = event.get("metadata") or {}
+        if event["type"] in ("payout_completed", "payout_failed") and metadata.get("payout_id"):
+            payout_ids.add(metadata["payout_id"])
+        elif event["type"] == "tip_received" and metadata.get("tip_id"):
+            tip_ids.add(metadata["tip_id"])
+    if not tip_ids:
+        return payout_ids
+
+    tips = list(source.iter_tips_by_id(tip_ids))
+    # Only the batch's venues' payouts, through the venue_id index
+    periods = {}
+    for venue_id in {tip["venue_id"] for tip in tips}:
+        periods[venue_id] = [
+            (*period_bounds(payout), payout["id"])
+            for payout in source.iter_rows("payouts", "venue_id", venue_id)
+        ]
+    for tip in tips:
+        for start, end, payout_id in periods[tip["venue_id"]]:
+            if start <= tip["created_at"] <= end:
+                payout_ids.add(payout_id)
+    return payout_ids
+
+
+def open_payouts(source, today, days=DEFAULT_RECHECK_DAYS):
+    """Ids of the payouts whose statements may still change without an event.
+
+    That is every payout not completed (transfers can still be retried),
+    and every payout whose period ended within days of today, a date (tips
+    can still be refunded).
+    """
+    since = (today - timedelta(days=days)).isoformat()
+    return set(source.iter_open_payout_ids(since))
+
+
+# ─── Debouncing ───
+
+class Debouncer:
+    """Keys waiting to fire, each with the times of its first and latest event.
+
+    A key is due once it has been quiet for `quiet` seconds or `max_delay`
+    seconds have passed since its first event.
+    """
+
+    def __init__(self, quiet=DEFAULT_QUIET, max_delay=DEFAULT_MAX_DELAY, pending=None):
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.pending = {key: list(times) for key, times in (pending or {}).items()}
+
+    def add(self, key, now):
+        times = self.pending.get(key)
+        if times is None:
+            self.pending[key] = [now, now]
+        else:
+            times[1] = now
+
+    def add_quiet(self, key, now):
+        """Queue key as add() does, without holding back one already pending."""
+        if key not in self.pending:
+            self.pending[key] = [now, now]
+
+    def due(self, now):
+        """Remove and return the keys due at now."""
+        keys = [
+            key for key, (first, last) in self.pending.items()
+            if now - last >= self.quiet or now - first >= self.max_delay
+        ]
+        for key in keys:
+            del self.pending[key]
+        return keys
+
+    def flush(self):
+        """Remove and return every pending key."""
+        keys = list(self.pending)
+        self.pending.clear()
+        return keys
+
+
+# ─── Consumer ───
+
+class StatementRefresher:
+    """Keeps the statements in out_dir current from a feed of change events.
+
+    feed defaults to a NotificationFeed over source_path resumed from the
+    saved state; workers > 1 renders in a warm pool kept for the
+    refresher's lifetime. The open payouts are queued on the first poll and
+    every recheck seconds after it (None never).
+    """
+
+    def __init__(self, source_path, out_dir, workers=1, cache_dir=None, theme=DEFAULT_THEME,
+                 quiet=DEFAULT_QUIET, max_delay=DEFAULT_MAX_DELAY, feed=None, clock=time.time,
+                 recheck=DEFAULT_RECHECK, recheck_days=DEFAULT_RECHECK_DAYS):
+        self.source_path = source_path
+        self.out_dir = out_dir
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.theme = theme
+        self.clock = clock
+        self.recheck = recheck
+        self.recheck_days = recheck_days
+        self._rechecked = None
+        self.source = open_source(source_path)
+        state = load_manifest(out_dir, STATE_NAME)
+        self.feed = feed or NotificationFeed(self.source, state.get("feed"))
+        self.debouncer = Debouncer(quiet, max_delay, state.get("pending"))
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.source.close()
+
+    def _save(self):
+        save_manifest(
+            self.out_dir, {"feed": self.feed.state(), "pending": self.debouncer.pending},
+            STATE_NAME,
+        )
+
+    def poll(self, now=None):
+        """Read new events and queue their payouts; returns how many events there were."""
+        now = self.clock() if now is None else now
+        events = self.feed.poll()
+        for payout_id in affected_payouts(self.source, events):
+            self.debouncer.add(payout_id, now)
+        if self.recheck is not None and (
+            self._rechecked is None or now - self._rechecked >= self.recheck
+        ):
+            today = datetime.fromtimestamp(now, timezone.utc).date()
+            for payout_id in open_payouts(self.source, today, self.recheck_days):
+                self.debouncer.add_quiet(payout_id, now)
+            self._rechecked = now
+        # Saved before rendering: a crash mid-render leaves the work queued, not lost
+        self._save()
+        return len(events)
+
+    def refresh(self, payout_ids):
+        """Render payout_ids' statements; (path, status) pairs as from render_statements()."""
+        if not payout_ids:
+            return []
+        for attempt in range(2):
+            if self.workers != 1 and self._pool is None:
+                self._pool = warm_pool(self.workers, themes=(self.theme,))
+            try:
+                results = render_statements(
+                    self.source_path, self.out_dir, workers=self.workers,
+                    cache_dir=self.cache_dir, theme=self.theme, payout_ids=set(payout_ids),
+                    pool=self._pool,
+                )
+            except BrokenProcessPool:
+                # A worker died; the journal has what finished, a fresh pool resumes the rest
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+                if attempt:
+                    raise
+            else:
+                break
+        self._save()
+        return results
+
+    def step(self, now=None, flush=False):
+        """One poll, then render whatever is due (everything pending with flush)."""
+        now = self.clock() if now is None else now
+        self.poll(now)
+        return self.refresh(self.debouncer.flush() if flush else self.debouncer.due(now))
+
+    def run(self, poll_interval=DEFAULT_POLL, once=False):
+        """Poll every poll_interval seconds, yielding each non-empty refresh's results.
+
+        With once, read the events there are now, render everything they
+        affect without waiting out the debounce, and stop.
+        """
+        while True:
+            results = self.step(flush=once)
+            if results:
+                yield results
+            if once:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,278 @@
+"""Statement charts: tips over the period and each employee's share of the payout.
+
+A busy venue can take hundreds of thousands of tips in a period, and a
+reportlab LinePlot draws every point it is given, so the series is
+downsampled with NumPy first: lttb() (Largest-Triangle-Three-Buckets)
+keeps the visual shape of a line in a few hundred points, and minmax()
+keeps every bucket's extremes for spiky series. Series and the drawings
+made from them are kept in small per-process LRU caches keyed by venue
+and period, so a worker or the statement service rendering the same
+period again skips the query, the downsampling and the chart layout.
+Each document gets a shallow copy of a cached drawing, since layout
+leaves state on the flowable it draws (a drawing pushed to the next page
+once would refuse to be pushed again).
+"""
+
+import copy
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from reports.palettes import DEFAULT_THEME
+from reports.rollups import sum_days
+
+CHART_POINTS = 240
+CHART_HEIGHT = 150
+MAX_BARS = 12
+CACHE_SIZE = 256
+SECONDS_PER_DAY = 86400
+
+
+# ─── Downsampling ───
+
+def lttb(x, y, n):
+    """Indices of n points of (x, y) chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; each bucket in between
+    contributes the point forming the largest triangle with the previous
+    pick and the next bucket's average. x must be sorted.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+    # n - 2 buckets over the interior points; every bucket is non-empty since n < size
+    edges = np.linspace(1, size - 1, n - 1).astype(np.intp)
+    counts = np.diff(edges)
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    avg_x = (cx[edges[1:]] - cx[edges[:-1]]) / counts
+    avg_y = (cy[edges[1:]] - cy[edges[:-1]]) / counts
+    # Bucket i looks ahead to bucket i + 1; the last one to the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    picks = np.empty(n, dtype=np.intp)
+    picks[0], picks[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        picks[i + 1] = a
+    return picks
+
+
+def minmax(x, y, n):
+    """Indices of the lowest and highest point of each of n // 2 equal-count buckets, in order."""
+    y = np.asarray(y, dtype=np.float64)
+    size = len(y)
+    buckets = n // 2
+    if n >= size or buckets < 1:
+        return np.arange(size)
+    edges = np.linspace(0, size, buckets + 1).astype(np.intp)
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+    picks = []
+    for extreme in (np.minimum, np.maximum):
+        # First point of each bucket equal to that bucket's extreme
+        hits = np.flatnonzero(y == extreme.reduceat(y, edges[:-1])[bucket])
+        _, first = np.unique(bucket[hits], return_index=True)
+        picks.append(hits[first])
+    return np.unique(np.concatenate(picks))
+
+
+METHODS = {"lttb": lttb, "minmax": minmax}
+
+
+def downsample(x, y, n=CHART_POINTS, method="lttb"):
+    """(x, y) reduced to at most about n points with METHODS[method]."""
+    picks = METHODS[method](x, y, n)
+    return np.asarray(x)[picks], np.asarray(y)[picks]
+
+
+# ─── Caches ───
+
+class LRUCache:
+    """A small least-recently-used dict with hit and miss counts."""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, make):
+        """The value for key, calling make() to build it on a miss."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            value = self._data[key] = make()
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+
+series_cache = LRUCache()
+drawing_cache = LRUCache()
+
+
+# ─── Series ───
+
+class TipSeries:
+    """Running total of succeeded tips over a period, downsampled for plotting.
+
+    x is days since the start of the period, y the running total in cents;
+    key identifies the venue, period and tip totals it was built from.
+    """
+
+    def __init__(self, key, start, days, x, y):
+        self.key = key
+        self.start = start
+        self.days = days
+        self.x = x
+        self.y = y
+
+
+def _utc(day):
+    return datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+
+
+def tip_series(source, venue_id, start_day, end_day, points=CHART_POINTS):
+    """The TipSeries for venue_id over [start_day, end_day], or None without tips.
+
+    The cache key includes the period's daily rollup totals, so a late
+    tip or a refund makes a new series instead of serving a stale one.
+    """
+    totals = sum_days(source.iter_daily(venue_id, start_day, end_day))
+    if not totals["succeeded"]:
+        return None
+    key = (venue_id, start_day, end_day, points, tuple(sorted(totals.items())))
+
+    def make():
+        end = f"{end_day}T23:59:59.999Z"
+        data = np.array(
+            list(source.iter_tip_points(venue_id, start_day, end)), dtype=np.int64,
+        ).reshape(-1, 2)
+        return points_series(key, start_day, end_day, data[:, 0], data[:, 1], points)
+
+    return series_cache.get(key, make)
+
+
+def points_series(key, start_day, end_day, seconds, amounts, points=CHART_POINTS):
+    """The TipSeries of tips already in hand: epoch seconds and cents, in created_at order."""
+    start = _utc(start_day)
+    x = (np.asarray(seconds, dtype=np.int64) - start.timestamp()) / SECONDS_PER_DAY
+    y = np.cumsum(np.asarray(amounts, dtype=np.int64))
+    x, y = downsample(x, y, points)
+    days = (_utc(end_day) - start).days + 1
+    return TipSeries(key, start_day, days, x.tolist(), y.tolist())
+
+
+def statement_series(source, job, points=CHART_POINTS):
+    payout = job["payout"]
+    return tip_series(
+        source, payout["venue_id"], payout["period_start"][:10], payout["period_end"][:10], points,
+    )
+
+
+# ─── Drawings ───
+
+def tips_chart(series, width, theme=DEFAULT_THEME, height=CHART_HEIGHT):
+    """A line chart of series' running total, shared between statements of the same period."""
+    from reportlab.graphics.charts.lineplots import LinePlot
+    from reportlab.graphics.shapes import Drawing
+
+    from reports.theme import get_theme
+
+    t = get_theme(theme)
+
+    def make():
+        start = _utc(series.start)
+        drawing = Drawing(width, height)
+        plot = LinePlot()
+        plot.x, plot.y = 48, 18
+        plot.width, plot.height = width - 56, height - 26
+        plot.data = [list(zip(series.x, series.y))]
+        plot.lines[0].strokeColor = t.primary
+        plot.lines[0].strokeWidth = 1.5
+        step = max(1, series.days // 7)
+        plot.xValueAxis.valueMin = 0
+        plot.xValueAxis.valueMax = series.days
+        plot.xValueAxis.valueSteps = list(range(0, series.days + 1, step))
+        plot.xValueAxis.labelTextFormat = (
+            lambda v: (start + timedelta(days=v)).strftime("%d %b")
+        )
+        plot.yValueAxis.valueMin = 0
+        plot.yValueAxis.labelTextFormat = lambda v: f"${v / 100:,.0f}"
+        for axis in (plot.xValueAxis, plot.yValueAxis):
+            axis.strokeColor = t.border
+            axis.labels.fontName = t.fonts.face("Helvetica")
+            axis.labels.fontSize = 7
+            axis.labels.fillColor = t.text_light
+        plot.yValueAxis.visibleGrid = 1
+        plot.yValueAxis.gridStrokeColor = t.border
+        drawing.add(plot)
+        return drawing
+
+    return copy.copy(drawing_cache.get(("tips", series.key, width, height, t), make))
+
+
+def share_bars(distributions):
+    """(label, cents) per employee, largest first, with the tail beyond MAX_BARS folded together."""
+    shares = sorted(
+        ((d.get("employee_name") or d["employee_id"], d["amount"]) for d in distributions),
+        key=lambda s: (-s[1], s[0]),
+    )
+    if len(shares) > MAX_BARS:
+        rest = shares[MAX_BARS - 1:]
+        shares = shares[:MAX_BARS - 1] + [(f"{len(rest)} others", sum(a for _n, a in rest))]
+    return shares
+
+
+def shares_chart(payout_id, distributions, width, theme=DEFAULT_THEME):
+    """A horizontal bar chart of each employee's share of the payout."""
+    from reportlab.graphics.charts.barcharts import HorizontalBarChart
+    from reportlab.graphics.shapes import Drawing
+
+    from reports.theme import get_theme
+
+    t = get_theme(theme)
+    bars = [(t.fonts.plain(name), amount) for name, amount in share_bars(distributions)]
+
+    def make():
+        height = 16 * len(bars) + 24
+        drawing = Drawing(width, height)
+        chart = HorizontalBarChart()
+        chart.x, chart.y = 110, 14
+        chart.width, chart.height = width - 118, height - 20
+        # Bar charts draw categories bottom-up; reverse so the largest share is on top
+        chart.data = [[amount for _name, amount in reversed(bars)]]
+        chart.categoryAxis.categoryNames = [name[:22] for name, _amount in reversed(bars)]
+        chart.bars[0].fillColor = t.primary
+        chart.bars[0].strokeColor = None
+        chart.barSpacing = 2
+        chart.valueAxis.valueMin = 0
+        # Whole dollars hide the ticks of small payouts
+        decimals = 2 if max(amount for _name, amount in bars) < 10000 else 0
+        chart.valueAxis.labelTextFormat = lambda v: f"${v / 100:,.{decimals}f}"
+        for axis in (chart.categoryAxis, chart.valueAxis):
+            axis.strokeColor = t.border
+            axis.labels.fontName = t.fonts.face("Helvetica")
+            axis.labels.fontSize = 7
+            axis.labels.fillColor = t.text_light
+        drawing.add(chart)
+        return drawing
+
+    return copy.copy(drawing_cache.get(("shares", payout_id, tuple(bars), width, t), make))
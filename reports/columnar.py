@@ -0,0 +1,324 @@
+"""Statement data as columnar record batches, written out as CSV, Parquet or Arrow.
+
+One pass over the source fills a RunData: a RecordBatch each of payouts,
+distributions and tips for a set of statement jobs. Each batch is a dict
+of equal-length NumPy arrays, with amounts as int64 cents and text as
+object arrays. Rows are grouped by venue and payout in job order, so one
+venue's or one payout's rows are a contiguous range. slice() hands that
+range out as array views, without copying.
+
+The same slices feed the CSV and Parquet writers and the statement PDF,
+whose ledger and tips chart are both read from the tips slice instead of
+querying the source again. Every file goes out through a DirectorySink,
+so readers never see half of one. Parquet and Arrow IPC output need
+pyarrow; CSV uses only the standard library.
+"""
+
+import csv
+import io
+
+import numpy as np
+
+from reports.batch import build_jobs, statement_filename
+from reports.charts import CHART_POINTS, points_series
+from reports.palettes import DEFAULT_THEME
+from reports.sinks import DirectorySink
+from reports.sources import epoch_seconds, open_source, period_bounds
+
+# (column, dtype) of each table; object columns hold str or None
+PAYOUT_SCHEMA = (
+    ("payout_id", object), ("venue_id", object), ("venue_name", object),
+    ("period_start", object), ("period_end", object), ("status", object),
+    ("total_amount", np.int64), ("platform_fee", np.int64), ("net_amount", np.int64),
+    ("tip_count", np.int64), ("tip_amount", np.int64),
+)
+DISTRIBUTION_SCHEMA = (
+    ("payout_id", object), ("venue_id", object), ("employee_id", object),
+    ("employee_name", object), ("days_active", np.int64), ("total_period_days", np.int64),
+    ("is_prorated", np.bool_), ("status", object), ("amount", np.int64),
+)
+TIP_SCHEMA = (
+    ("tip_id", object), ("payout_id", object), ("venue_id", object), ("created_at", object),
+    ("employee_id", object), ("employee_name", object), ("tipper_name", object),
+    ("amount", np.int64),
+)
+FORMATS = ("csv", "parquet", "arrow")
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+# ─── Record batches ───
+
+class RecordBatch:
+    """Named, equal-length NumPy columns; schema is a tuple of (name, dtype)."""
+
+    def __init__(self, schema, columns):
+        self.schema = schema
+        self.columns = columns
+
+    @classmethod
+    def from_lists(cls, schema, lists):
+        """A batch from one Python list per column, in schema order."""
+        return cls(schema, {
+            name: np.array(values, dtype=dtype) for (name, dtype), values in zip(schema, lists)
+        })
+
+    @property
+    def names(self):
+        return [name for name, _dtype in self.schema]
+
+    @property
+    def num_rows(self):
+        return len(self.columns[self.schema[0][0]]) if self.schema else 0
+
+    def __len__(self):
+        return self.num_rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def slice(self, start, stop):
+        """Rows [start, stop) as views of this batch's arrays."""
+        return RecordBatch(self.schema, {
+            name: column[start:stop] for name, column in self.columns.items()
+        })
+
+    def rows(self):
+        """Tuples of Python values in schema order."""
+        return zip(*(self.columns[name].tolist() for name in self.names))
+
+    def dicts(self):
+        names = self.names
+        return (dict(zip(names, row)) for row in self.rows())
+
+
+class _Builder:
+    """Column lists being filled row by row for one schema."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.lists = [[] for _ in schema]
+
+    def __len__(self):
+        return len(self.lists[0])
+
+    def append(self, *values):
+        for column, value in zip(self.lists, values):
+            column.append(value)
+
+    def finish(self):
+        return RecordBatch.from_lists(self.schema, self.lists)
+
+
+# ─── Run data ───
+
+class RunData:
+    """Payout, distribution and tip batches for a list of jobs, indexed by payout and venue."""
+
+    def __init__(self, jobs, payouts, distributions, tips, payout_ranges, venue_ranges):
+        self.jobs = jobs
+        self.payouts = payouts
+        self.distributions = distributions
+        self.tips = tips
+        # id -> ((payouts start, stop), (distributions start, stop), (tips start, stop))
+        self._payouts = payout_ranges
+        self._venues = venue_ranges
+
+    def venue_ids(self):
+        """Venue ids in job order."""
+        return list(self._venues)
+
+    def _slices(self, ranges):
+        payouts, distributions, tips = ranges
+        return {
+            "payouts": self.payouts.slice(*payouts),
+            "distributions": self.distributions.slice(*distributions),
+            "tips": self.tips.slice(*tips),
+        }
+
+    def payout(self, payout_id):
+        """{"payouts", "distributions", "tips"} slices of one payout."""
+        return self._slices(self._payouts[payout_id])
+
+    def venue(self, venue_id):
+        """{"payouts", "distributions", "tips"} slices of every payout of one venue."""
+        return self._slices(self._venues[venue_id])
+
+    def tip_rows(self, payout_id):
+        """A payout's tips as row dicts, in the order Source.iter_tips() yields them."""
+        return self.payout(payout_id)["tips"].dicts()
+
+    def series(self, job, points=CHART_POINTS):
+        """The job's TipSeries from its tips slice, as statement_series() would chart it; or None."""
+        payout = job["payout"]
+        tips = self.payout(payout["id"])["tips"]
+        if not len(tips):
+            return None
+        seconds = [epoch_seconds(created_at) for created_at in tips["created_at"].tolist()]
+        amounts = tips["amount"]
+        start_day, end_day = payout["period_start"][:10], payout["period_end"][:10]
+        # Count, total and last tip stand in for the rollup totals tip_series() keys on
+        key = (payout["venue_id"], start_day, end_day, points,
+               ("tips", len(tips), int(amounts.sum()), tips["tip_id"][-1]))
+        return points_series(key, start_day, end_day, seconds, amounts, points)
+
+
+def collect(source, jobs):
+    """The RunData for jobs, in one pass over the tips.
+
+    A venue's jobs must be adjacent, as build_jobs() orders them, so that
+    each venue's rows form one range.
+    """
+    payouts = _Builder(PAYOUT_SCHEMA)
+    distributions = _Builder(DISTRIBUTION_SCHEMA)
+    tips = _Builder(TIP_SCHEMA)
+    payout_ranges = {}
+    venue_ranges = {}
+    for job in jobs:
+        payout = job["payout"]
+        venue_id = payout["venue_id"]
+        if venue_id in venue_ranges and venue_id != next(reversed(venue_ranges)):
+            raise ValueError(f"jobs of venue {venue_id} are not adjacent")
+        starts = (len(payouts), len(distributions), len(tips))
+        names = job.get("employee_names", {})
+        for dist in job["distributions"]:
+            distributions.append(
+                payout["id"], venue_id, dist["employee_id"], dist.get("employee_name"),
+                dist["days_active"], dist["total_period_days"], bool(dist.get("is_prorated")),
+                dist.get("status") or "pending", dist["amount"],
+            )
+        amount = 0
+        for tip in source.iter_tips(venue_id, *period_bounds(payout)):
+            tips.append(
+                tip["id"], payout["id"], venue_id, tip["created_at"], tip.get("employee_id"),
+                names.get(tip.get("employee_id")), tip.get("tipper_name"), tip["amount"],
+            )
+            amount += tip["amount"]
+        payouts.append(
+            payout["id"], venue_id, job["venue"].get("name"), payout["period_start"],
+            payout["period_end"], payout.get("status") or "pending", payout["total_amount"],
+            payout["platform_fee"], payout["net_amount"], len(tips) - starts[2], amount,
+        )
+        stops = (len(payouts), len(distributions), len(tips))
+        payout_ranges[payout["id"]] = tuple(zip(starts, stops))
+        first = venue_ranges.get(venue_id, payout_ranges[payout["id"]])
+        venue_ranges[venue_id] = tuple((start, stop) for (start, _), stop in zip(first, stops))
+    return RunData(
+        jobs, payouts.finish(), distributions.finish(), tips.finish(), payout_ranges, venue_ranges,
+    )
+
+
+# ─── Writers ───
+
+def write_csv(batch, f):
+    """batch as UTF-8 CSV with a header row to binary file f; amounts stay integer cents."""
+    text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(batch.names)
+    writer.writerows(batch.rows())
+    # Flush into f but leave it open for the sink to close and publish
+    text.detach()
+
+
+def to_arrow(batch):
+    """batch as a pyarrow.RecordBatch; numeric columns are handed over without copying."""
+    pa = _pyarrow()
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(batch[name].tolist(), type=pa.string()) if dtype is object
+            else pa.array(batch[name])
+            for name, dtype in batch.schema
+        ],
+        names=batch.names,
+    )
+
+
+def write_parquet(batch, f):
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+
+    pq.write_table(pa.Table.from_batches([to_arrow(batch)]), f)
+
+
+def write_arrow(batch, f):
+    """batch as an Arrow IPC file."""
+    pa = _pyarrow()
+    record_batch = to_arrow(batch)
+    with pa.ipc.new_file(pa.PythonFile(f, mode="w"), record_batch.schema) as writer:
+        writer.write_batch(record_batch)
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "arrow": write_arrow}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("Parquet and Arrow output need pyarrow (pip install pyarrow)") from exc
+    import pyarrow.ipc  # noqa: F401  (pa.ipc is not loaded by the bare import)
+
+    return pyarrow
+
+
+def write_tables(tables, sink, stem, formats=("csv",)):
+    """Write each {table name: batch} to sink as <stem>.<table>.<ext> per format; returns the paths."""
+    paths = []
+    for fmt in formats:
+        for table, batch in tables.items():
+            name = f"{stem}.{table}{EXTENSIONS[fmt]}"
+            with sink.open(name) as f:
+                WRITERS[fmt](batch, f)
+            paths.append(sink.location(name))
+    return paths
+
+
+# ─── Export ───
+
+def export_run(source_path, out_dir, formats=("csv",), run_date=None, pdf=True,
+               theme=DEFAULT_THEME):
+    """Write each venue's payouts, distributions and tips in formats, plus its statements.
+
+    One pass reads the run's tips into a RunData. Every output is then cut
+    from it: <slug>.<table>.<ext> per venue, and each payout's statement
+    PDF with its ledger and tips chart read from the tips slice; the
+    source is closed before anything is written. run_date limits the
+    export to payouts created by that day's auto-payout run. Returns the
+    paths written.
+    """
+    from reports.bundle import run_jobs
+
+    for fmt in formats:
+        if fmt not in WRITERS:
+            raise ValueError(f"unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        if fmt != "csv":
+            _pyarrow()
+
+    source = open_source(source_path)
+    try:
+        jobs = run_jobs(build_jobs(source), run_date)
+        data = collect(source, jobs)
+    finally:
+        source.close()
+    sink = DirectorySink(out_dir)
+    venues = {job["payout"]["venue_id"]: job["venue"] for job in jobs}
+    paths = []
+    for venue_id in data.venue_ids():
+        stem = venues[venue_id].get("slug") or venue_id
+        paths += write_tables(data.venue(venue_id), sink, stem, formats)
+    if pdf:
+        paths += _write_statements(data, sink, theme)
+    return paths
+
+
+def _write_statements(data, sink, theme):
+    from reports.statements import build_statement
+
+    paths = []
+    for job in data.jobs:
+        name = statement_filename(job)
+        with sink.open(name) as f:
+            build_statement(
+                job, f, data.tip_rows(job["payout"]["id"]), theme, series=data.series(job),
+            )
+        paths.append(sink.location(name))
+    return paths
@@ -0,0 +1,321 @@
+"""Per-employee earnings statements: every payout share a person received, across venues.
+
+employees rows are per venue, so someone who works at two venues has two
+rows. A statement is for the person: the rows are grouped by user_id,
+else by email (joining a linked row with the same email), else each row
+stands alone (person_key()).
+
+Jobs come from one pass over payout_distributions into an index keyed by
+person, joined against in-memory payouts, venues and employees tables,
+so a tax-time run over every employee reads each table once instead of
+querying per employee. A payout belongs to a period when its period_end
+falls inside it. Runs are journalled like venue statement runs
+(reports.batch.run_journalled()): a failing statement is retried and
+reported without stopping the others. As in reports.batch, reportlab is
+only imported by the functions that render.
+"""
+
+import os
+import re
+from urllib.parse import quote
+
+from reports.batch import load_manifest, run_journalled, save_manifest
+from reports.cache import BuildCache, content_key
+from reports.journal import DEFAULT_MAX_ATTEMPTS
+from reports.palettes import DEFAULT_THEME
+from reports.sinks import DirectorySink
+from reports.sources import open_source
+
+# Bump whenever the earnings layout changes (see statements.TEMPLATE_VERSION)
+TEMPLATE_VERSION = "2"
+MANIFEST_NAME = ".earnings.json"
+JOURNAL_NAME = ".earnings.journal"
+# Earnings jobs are tiny; big chunks keep a tax-time run of hundreds of
+# thousands of them from drowning in IPC
+MAX_CHUNK = 256
+
+PAYOUT_COLUMNS = [
+    ("Period", 0.28), ("Venue", 0.32), ("Days", 0.12), ("Status", 0.13), ("Amount", 0.15),
+]
+PAID_STATUSES = {"completed"}
+FAILED_STATUSES = {"failed"}
+
+
+def person_key(emp, user_by_email=None):
+    """Who an employees row belongs to: its user_id, else its email, else the row id.
+
+    user_by_email maps the emails of linked rows to their user_id, so an
+    unlinked row with the same email joins that person.
+    """
+    if emp.get("user_id"):
+        return emp["user_id"]
+    email = (emp.get("email") or "").strip().lower()
+    if email:
+        return (user_by_email or {}).get(email, email)
+    return emp["id"]
+
+
+def build_employee_jobs(source, start, end, employee_ids=None):
+    """One earnings job per person with a payout share ending in [start, end] (YYYY-MM-DD).
+
+    employee_ids limits the run to the people with those employees.id or
+    user_id values; each statement still covers all of their venues.
+    """
+    venues = {v["id"]: v for v in source.iter_table("venues")}
+    payouts = {
+        p["id"]: p for p in source.iter_table("payouts")
+        if start <= p["period_end"][:10] <= end
+    }
+    employees = {e["id"]: e for e in source.iter_table("employees")}
+    user_by_email = {}
+    for emp in employees.values():
+        if emp.get("user_id") and emp.get("email"):
+            user_by_email.setdefault(emp["email"].strip().lower(), emp["user_id"])
+    people = {emp_id: person_key(emp, user_by_email) for emp_id, emp in employees.items()}
+    if employee_ids:
+        wanted = set(employee_ids)
+        chosen = {
+            people[emp_id] for emp_id, emp in employees.items()
+            if emp_id in wanted or emp.get("user_id") in wanted
+        }
+        people = {emp_id: person for emp_id, person in people.items() if person in chosen}
+
+    index = {}
+    for dist in source.iter_table("payout_distributions"):
+        payout = payouts.get(dist["payout_id"])
+        person = people.get(dist["employee_id"])
+        if payout is None or person is None:
+            continue
+        venue = venues.get(payout["venue_id"], {})
+        index.setdefault(person, []).append({
+            "payout_id": payout["id"],
+            "employee_id": dist["employee_id"],
+            "venue_id": payout["venue_id"],
+            "venue_name": venue.get("name") or payout["venue_id"],
+            "period_start": payout["period_start"][:10],
+            "period_end": payout["period_end"][:10],
+            "amount": dist["amount"],
+            "days_active": dist["days_active"],
+            "total_period_days": dist["total_period_days"],
+            "is_prorated": bool(dist.get("is_prorated")),
+            "status": dist.get("status") or "pending",
+        })
+
+    jobs = []
+    for person, rows in index.items():
+        rows.sort(key=lambda r: (r["period_start"], r["venue_name"], r["payout_id"]))
+        # Named as on their latest payout, should venues spell it differently
+        latest = employees[rows[-1]["employee_id"]]
+        jobs.append({
+            "employee": {
+                "id": person,
+                "name": latest.get("name") or person,
+                "employee_ids": sorted({row["employee_id"] for row in rows}),
+            },
+            "start": start,
+            "end": end,
+            "rows": rows,
+        })
+    jobs.sort(key=lambda j: (j["employee"]["name"], j["employee"]["id"]))
+    return jobs
+
+
+def earnings_filename(job):
+    emp = job["employee"]
+    slug = re.sub(r"[^a-z0-9]+", "-", emp["name"].lower()).strip("-") or "employee"
+    # The whole id, escaped rather than cut short, so no two people share a file
+    return f"{slug}_{quote(emp['id'], safe='')}_{job['start']}_{job['end']}.pdf"
+
+
+def earnings_totals(rows):
+    totals = {"earned": 0, "paid": 0, "pending": 0, "failed": 0}
+    for row in rows:
+        totals["earned"] += row["amount"]
+        if row["status"] in PAID_STATUSES:
+            totals["paid"] += row["amount"]
+        elif row["status"] in FAILED_STATUSES:
+            totals["failed"] += row["amount"]
+        else:
+            totals["pending"] += row["amount"]
+    return totals
+
+
+def payout_rows(rows):
+    from reports.statements import format_cents
+
+    for row in rows:
+        days = f"{row['days_active']}/{row['total_period_days']}"
+        yield (
+            f"{row['period_start']} to {row['period_end']}",
+            row["venue_name"],
+            days + (" *" if row["is_prorated"] else ""),
+            row["status"].replace("_", " ").title(),
+            format_cents(row["amount"]),
+        )
+
+
+def iter_earnings_story(job, width, theme=DEFAULT_THEME):
+    """Yield the earnings statement flowables in order."""
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, Spacer, Table, HRFlowable
+
+    from reports.ledger import LedgerTable
+    from reports.sections import section
+    from reports.statements import format_cents
+    from reports.theme import get_theme
+
+    t = get_theme(theme)
+    styles = t.styles("statement")
+    emp = job["employee"]
+    emp_name = t.fonts.markup(emp["name"])
+    rows = job["rows"]
+    totals = earnings_totals(rows)
+
+    # ─── HEADER ───
+    yield section("Header", Paragraph(emp_name, styles["title"]))
+    yield Paragraph(
+        f"Earnings Statement  |  {job['start']} to {job['end']}", styles["subtitle"],
+    )
+    yield HRFlowable(width=width, thickness=2, color=t.primary, spaceAfter=4 * mm)
+
+    # ─── SUMMARY ───
+    yield section("Summary", Paragraph("Summary", styles["heading"]))
+    by_venue = {}
+    for row in rows:
+        venue = by_venue.setdefault(row["venue_id"], [row["venue_name"], 0, 0, 0])
+        venue[1] += 1
+        venue[2] += row["days_active"]
+        venue[3] += row["amount"]
+    summary_table = Table([
+        ["Employee ID", emp["id"]],
+        ["Venues", f"{len(by_venue):,}"],
+        ["Payouts", f"{len(rows):,}"],
+        ["Total Earned", format_cents(totals["earned"])],
+        ["Paid Out", format_cents(totals["paid"])],
+        ["Pending", format_cents(totals["pending"])],
+        ["Failed Transfers", format_cents(totals["failed"])],
+    ], colWidths=[width * 0.35, width * 0.65])
+    summary_table.setStyle(t.table_style("statement.summary"))
+    yield summary_table
+
+    # ─── BY VENUE ───
+    yield section("By Venue", Paragraph("Earnings by Venue", styles["heading"]))
+    venue_data = [["Venue", "Payouts", "Days Active", "Amount"]]
+    for name, count, days, amount in sorted(by_venue.values()):
+        venue_data.append(
+            [t.fonts.cell(name, styles["cell"]), f"{count:,}", f"{days:,}", format_cents(amount)]
+        )
+    venue_data.append(["", "", "Total", format_cents(totals["earned"])])
+    venue_table = Table(
+        venue_data,
+        colWidths=[width * 0.45, width * 0.15, width * 0.20, width * 0.20],
+        repeatRows=1,
+    )
+    venue_table.setStyle(t.table_style("statement.distributions"))
+    yield venue_table
+
+    # ─── PAYOUTS ───
+    yield section("Payouts", Paragraph("Payouts", styles["heading"]))
+    yield LedgerTable(
+        payout_rows(rows), PAYOUT_COLUMNS, width, t.table_style("statement.ledger"),
+        fonts=t.fonts,
+    )
+    yield Paragraph("* prorated for days active in the period", styles["body"])
+
+    # ─── FOOTER ───
+    yield section("Footer", Spacer(1, 10 * mm))
+    yield HRFlowable(width=width, thickness=0.5, color=t.border, spaceAfter=3 * mm)
+    yield Paragraph(
+        f"TipUs  |  {emp_name}  |  Earnings Statement  |  Confidential", styles["footer"],
+    )
+
+
+def build_earnings(job, output, theme=DEFAULT_THEME):
+    """Render one earnings statement into output, a path or a binary file."""
+    from reportlab.platypus import SimpleDocTemplate
+
+    from reports.statements import PAGE_SETUP
+    from reports.story import StreamingStory
+
+    doc = SimpleDocTemplate(
+        output, **PAGE_SETUP,
+        title=f"Earnings Statement {job['employee']['id']}", author="TipUs", invariant=1,
+    )
+    doc.build(StreamingStory(iter_earnings_story(job, doc.width, theme)))
+    return output
+
+
+def earnings_key(job, theme=DEFAULT_THEME):
+    from reports.statements import style_digest
+
+    return content_key(job, style_digest(theme), TEMPLATE_VERSION)
+
+
+def _render(job, out_dir, cache_dir=None, previous_key=None, theme=DEFAULT_THEME):
+    """Render one earnings statement; returns (path, key, status, None).
+
+    status is "skipped", "cached" or "rendered", as for venue statements.
+    """
+    sink = DirectorySink(out_dir)
+    name = earnings_filename(job)
+    path = sink.path(name)
+    key = earnings_key(job, theme)
+    if key == previous_key and os.path.exists(path):
+        return path, key, "skipped", None
+    cache = BuildCache(cache_dir) if cache_dir else None
+    if cache and cache.restore(key, path):
+        return path, key, "cached", None
+    with sink.open(name) as f:
+        build_earnings(job, f, theme)
+    if cache:
+        cache.store(key, path)
+    return path, key, "rendered", None
+
+
+def _render_chunk(jobs, previous, out_dir, cache_dir=None, theme=DEFAULT_THEME):
+    """_render() each job; one that raises comes back as a "failed: <error>" result."""
+    results = []
+    for job, prev in zip(jobs, previous):
+        try:
+            results.append(_render(job, out_dir, cache_dir, prev, theme))
+        except Exception as exc:
+            results.append((os.path.join(out_dir, earnings_filename(job)), None, f"failed: {exc}", None))
+    return results
+
+
+def render_earnings(source_path, out_dir, start, end, employee_ids=None, workers=None,
+                    cache_dir=None, theme=DEFAULT_THEME, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                    retry_failed=False):
+    """Render an earnings statement per person paid in [start, end]; (path, status) pairs.
+
+    One statement failing does not stop the run: it comes back as
+    "failed: <error>", and is retried and given up on across runs as
+    reports.batch.render_statements() does.
+    """
+    source = open_source(source_path)
+    try:
+        jobs = build_employee_jobs(source, start, end, employee_ids)
+    finally:
+        source.close()
+
+    os.makedirs(out_dir, exist_ok=True)
+    DirectorySink(out_dir).remove_stale()
+    manifest = load_manifest(out_dir, MANIFEST_NAME)
+    names = [earnings_filename(job) for job in jobs]
+    results = run_journalled(
+        jobs, names, _render_chunk, (out_dir, cache_dir, theme), manifest, workers, theme,
+        max_attempts=max_attempts, retry_failed=retry_failed, journal_name=JOURNAL_NAME,
+        max_chunk=MAX_CHUNK,
+    )
+
+    # A statement that failed keeps the key of the file it left in place
+    keys = {
+        name: key if key is not None else manifest.get(name)
+        for name, (_path, key, _status, _m) in zip(names, results)
+    }
+    keys = {name: key for name, key in keys.items() if key is not None}
+    # A run over some employees keeps everyone else's keys for the next full run
+    save_manifest(out_dir, {**manifest, **keys} if employee_ids else keys, MANIFEST_NAME)
+    if cache_dir:
+        BuildCache(cache_dir).evict()
+    return [(path, status) for path, _key, status, _metrics in results]
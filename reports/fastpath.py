@@ -0,0 +1,622 @@
+"""Payout statements drawn straight onto a reportlab canvas, for the common simple case.
+
+A payout statement has a fixed layout:
+- a header, a summary table and a distribution table
+- the charts, the tip ledger and the footer
+Every row has a known height. platypus still does a lot of work for it:
+- it measures every flowable and parses Paragraph markup
+- it builds a Table per ledger page and runs the cell style machinery for every cell
+draw_statement() skips all of that. It walks the same layout with a
+cursor that spaces blocks the way a platypus Frame does. Each ledger
+page is one text object in which a row is a single run of cells joined
+by relative moves, with the font and colour set once per page. Text
+widths, used to right-align amounts and to check that one-line text
+fits, are cached per (text, font, size).
+
+simple() decides which statements qualify:
+- every name and reconciliation note is covered by the body face
+- the title, the footer and each note fit on one line
+Anything else still goes through platypus (reports.statements.iter_story),
+as do free-form documents such as the status report and the overview.
+
+Geometry follows what platypus produces for the statement.* styles:
+- the page frame sits inside PAGE_SETUP's margins with 6pt padding
+- tables and rules are centred on the frame
+- paragraphs start at the frame's left edge
+- the space after one block overlaps the space before the next
+- each block is drawn from its own origin, so coordinates round the same
+- table lines have round caps and are stroked one by one, as platypus
+  strokes them, and striped rows paint their white rows too
+Antialiased edges are sensitive to all of these: a rule stroked once
+instead of twice, or a coordinate 0.0001pt off, changes edge pixels.
+Everything above the ledger rasterises to the same pixels as platypus.
+The ledger trades that for speed: its stripes are painted in one path
+and its text is placed by relative moves, so its edge pixels differ,
+while every word stays within 0.1pt of where platypus puts it.
+"""
+
+import re
+from contextlib import nullcontext
+from functools import lru_cache
+
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import getFont, stringWidth
+from reportlab.pdfgen.canvas import Canvas
+
+from reports import assets
+from reports.charts import shares_chart, tips_chart
+from reports.ledger import CELL_PADDING, ROW_HEIGHT, TextClipper, rows_per_page
+from reports.payouts import PLATFORM_FEE_RATE
+from reports.sections import WRITE_SECTION
+from reports.theme import DEFAULT_THEME, get_theme
+
+# SimpleDocTemplate's frame padding, on every side
+FRAME_PADDING = 6
+# reportlab's table cell defaults where the statement table styles leave them alone
+CELL_LEADING = 12
+CELL_PAD = 6
+# Frame tolerance before a block counts as overflowing
+FUZZ = 1e-6
+# Marks each reconciliation note, in the warning colour
+BULLET = "\u25cf"
+# Printable ASCII but the characters a PDF string escapes: ( ) and backslash
+_PLAIN_TEXT = re.compile(r"[ -'*-\[\]-~]*\Z")
+
+
+@lru_cache(maxsize=65536)
+def text_width(text, font_name, font_size):
+    return stringWidth(text, font_name, font_size)
+
+
+def _collapse(text):
+    # Paragraphs collapse runs of whitespace
+    return " ".join(text.split())
+
+
+# ─── Layout ───
+
+class Flow:
+    """A top-down cursor over each page's frame that spaces blocks like a platypus Frame.
+
+    A block's space before overlaps the previous block's space after and
+    is dropped at the top of a page. A block too tall for what is left of
+    the page starts a new one.
+    """
+
+    def __init__(self, canv, setup):
+        self.canv = canv
+        page_width, page_height = setup["pagesize"]
+        self.x = setup["leftMargin"] + FRAME_PADDING
+        self.width = page_width - setup["leftMargin"] - setup["rightMargin"] - 2 * FRAME_PADDING
+        self.top = page_height - setup["topMargin"] - FRAME_PADDING
+        self.bottom = setup["bottomMargin"] + FRAME_PADDING
+        self.pages = 1
+        self._reset()
+
+    def _reset(self):
+        self.y = self.top
+        self.at_top = True
+        self._after = 0
+
+    def new_page(self):
+        self.canv.showPage()
+        self.pages += 1
+        self._reset()
+
+    def space(self, before):
+        return 0 if self.at_top else max(before - self._after, 0)
+
+    def available(self, before=0):
+        """Height left on this page below a block's space before."""
+        return self.y - self.bottom - self.space(before)
+
+    def fits(self, height, before=0):
+        available = self.available(before)
+        return available > 0 and height <= available + FUZZ
+
+    def place(self, height, before=0, after=0):
+        """Reserve height for a block and return its top y, on a new page if needed."""
+        if not self.fits(height, before) and not self.at_top:
+            self.new_page()
+        top = self.y - self.space(before)
+        y = top - height - after
+        if y != self.y:
+            self.at_top = False
+        self.y = y
+        self._after = after
+        return top
+
+
+class Text:
+    """One-line paragraphs in a ParagraphStyle, drawn at the flow's left edge or centred."""
+
+    def __init__(self, style, font_name):
+        self.font_name = font_name
+        self.font_size = style.fontSize
+        self.leading = style.leading
+        self.before = style.spaceBefore
+        self.after = style.spaceAfter
+        self.color = style.textColor
+        self.centred = style.alignment == 1  # TA_CENTER
+
+    def width(self, text):
+        return text_width(_collapse(text), self.font_name, self.font_size)
+
+    def draw(self, flow, text):
+        top = flow.place(self.leading, self.before, self.after)
+        canv = flow.canv
+        _origin(canv, flow.x, top - self.leading)
+        canv.setFillColor(self.color)
+        canv.setFont(self.font_name, self.font_size)
+        y = self.leading - self.font_size
+        if self.centred:
+            canv.drawCentredString(flow.width / 2, y, _collapse(text))
+        else:
+            canv.drawString(0, y, _collapse(text))
+        canv.restoreState()
+        return top
+
+
+@lru_cache(maxsize=None)
+def _texts(theme, fonts_key):
+    t = get_theme(theme)
+    styles = t.styles("statement")
+    texts = {name: Text(style, t.fonts.face(style.fontName)) for name, style in styles.items()}
+    texts["body_bold"] = Text(styles["body"], t.fonts.face("Helvetica-Bold"))
+    return texts
+
+
+def _origin(canv, x, y):
+    """Save the state and move the origin to a block's bottom left corner, as drawOn() does.
+
+    The PDF then holds the origin and the offsets from it as separate
+    numbers, rounded separately, just as platypus writes them; absolute
+    coordinates would round differently and shift edges by a fraction of
+    a pixel. The caller restores the state.
+    """
+    canv.saveState()
+    canv.translate(x, y)
+
+
+def _rule(flow, thickness, color, after, before=1):
+    # An HRFlowable, its line along the bottom of its box
+    y = flow.place(thickness, before, after) - thickness
+    canv = flow.canv
+    _origin(canv, flow.x, y)
+    canv.setLineWidth(thickness)
+    canv.setLineCap(1)
+    canv.setStrokeColor(color)
+    canv.line(0, 0, flow.width, 0)
+    canv.restoreState()
+
+
+# ─── Eligibility ───
+
+def _frame_width():
+    from reports.statements import PAGE_SETUP
+
+    page_width = PAGE_SETUP["pagesize"][0]
+    return page_width - PAGE_SETUP["leftMargin"] - PAGE_SETUP["rightMargin"] - 2 * FRAME_PADDING
+
+
+def simple(job, theme=DEFAULT_THEME):
+    """Whether draw_statement() can draw job's statement just as platypus lays it out."""
+    from reports.statements import format_period
+
+    t = get_theme(theme)
+    texts = _texts(theme, t.fonts.key)
+    width = _frame_width()
+    venue_name = job["venue"].get("name") or "Venue"
+    lines = (
+        (texts["title"], venue_name),
+        (texts["subtitle"], f"Payout Statement  |  {format_period(job['payout'])}"),
+        (texts["footer"], f"TipUs  |  {venue_name}  |  Payout Statement  |  Confidential"),
+    )
+    notes = [(texts["body"], f"{BULLET} {issue}") for issue in job.get("reconciliation") or ()]
+    for text, line in (*lines, *notes):
+        if not t.fonts.covers(line) or text.width(line) > width:
+            return False
+    names = [d.get("employee_name") or d["employee_id"] for d in job["distributions"]]
+    return all(t.fonts.covers(name) and "\n" not in name for name in names)
+
+
+# ─── Tables ───
+
+class _Grid:
+    """Column positions of a table width wide, centred on the frame as platypus centres a Table.
+
+    left=True places it at the frame's left edge instead, where a plain
+    Flowable such as LedgerTable goes. x is the table's left edge on the
+    page; col_x are measured from it, as a table draws under _origin().
+    """
+
+    def __init__(self, flow, width, fractions, left=False):
+        self.x = flow.x if left else flow.x + (flow.width - width) / 2
+        self.width = width
+        self.col_widths = [width * f for f in fractions]
+        self.col_x = [0]
+        for w in self.col_widths[:-1]:
+            self.col_x.append(self.col_x[-1] + w)
+
+
+def _table_lines(canv, color, thickness):
+    # platypus strokes table lines with round caps and joins, inside their own state
+    canv.saveState()
+    canv.setLineCap(1)
+    canv.setLineJoin(1)
+    canv.setStrokeColor(color)
+    canv.setLineWidth(thickness)
+
+
+def _baseline(row_bottom, bottom_padding, font_size):
+    # VALIGN BOTTOM for a one-line string cell
+    return row_bottom + bottom_padding + CELL_LEADING - font_size
+
+
+def _draw_summary(flow, t, rows, width):
+    """The statement.summary table: a shaded label column beside the values, gridded."""
+    pad, font_size = 5, 9.5
+    row_height = CELL_LEADING + 2 * pad
+    grid = _Grid(flow, width, (0.35, 0.65))
+    height = row_height * len(rows)
+    top = flow.place(height)
+    canv = flow.canv
+    _origin(canv, grid.x, top - height)
+    x0, x1 = grid.col_x
+    canv.setFillColor(t.primary_light)
+    canv.rect(x0, 0, grid.col_widths[0], height, stroke=0, fill=1)
+    canv.setFillColor(t.surface)
+    canv.rect(x1, 0, grid.col_widths[1], height, stroke=0, fill=1)
+    canv.setFillColor(t.text)
+    bold, regular = t.fonts.face("Helvetica-Bold"), t.fonts.face("Helvetica")
+    for i, (label, value) in enumerate(rows, 1):
+        y = _baseline(height - i * row_height, pad, font_size)
+        canv.setFont(bold, font_size)
+        canv.drawString(x0 + 8, y, label)
+        canv.setFont(regular, font_size)
+        canv.drawString(x1 + 8, y, value)
+    # GRID strokes the box and then each inner line on its own, so crossings blend twice
+    ys = [height - i * row_height for i in range(len(rows) + 1)]
+    lines = [
+        (0, height, width, height), (0, 0, width, 0), (0, 0, 0, height), (width, 0, width, height),
+        *((0, y, width, y) for y in ys[1:-1]), (x1, 0, x1, height),
+    ]
+    _table_lines(canv, t.border, 0.5)
+    for line in lines:
+        canv.line(*line)
+    canv.restoreState()
+    canv.restoreState()
+
+
+def _draw_distributions(flow, t, rows, total, width):
+    """The statement.distributions table, split across pages under a repeated header."""
+    pad, font_size = 4, 9
+    row_height = CELL_LEADING + 2 * pad
+    grid = _Grid(flow, width, (0.40, 0.25, 0.15, 0.20))
+    header = ("Employee", "Days Active", "Status", "Amount")
+    bold, regular = t.fonts.face("Helvetica-Bold"), t.fonts.face("Helvetica")
+    canv = flow.canv
+    body = list(rows) + [("", "", "Total", total)]
+    last = len(body) - 1
+
+    def draw_row(row_bottom, row, font):
+        y = _baseline(row_bottom, pad, font_size)
+        canv.setFont(font, font_size)
+        for x, cell in zip(grid.col_x, row[:3]):
+            canv.drawString(x + CELL_PAD, y, cell)
+        canv.drawRightString(width - CELL_PAD, y, row[3])
+
+    start = 0
+    while start < len(body):
+        # platypus splits a table between rows, never leaving the header on its own
+        count = min(int((flow.available() + FUZZ) // row_height) - 1, len(body) - start)
+        if count < 1 and not flow.at_top:
+            flow.new_page()
+            continue
+        count = max(count, 1)
+        height = row_height * (count + 1)
+        top = flow.place(height)
+        _origin(canv, grid.x, top - height)
+        canv.setFillColor(t.primary)
+        canv.rect(0, height - row_height, width, row_height, stroke=0, fill=1)
+        canv.setFillColor(t.white)
+        draw_row(height - row_height, header, bold)
+        canv.setFillColor(t.text)
+        for i in range(count):
+            index = start + i
+            draw_row(height - (i + 2) * row_height, body[index], bold if index == last else regular)
+        # LINEBELOW every row above the total, LINEABOVE the total in the brand colour
+        _table_lines(canv, t.border, 0.5)
+        if start:
+            # A part split off a Table carries the header row's style twice, once for
+            # the repeated row, so the line under the header is stroked twice
+            canv.line(0, height - row_height, width, height - row_height)
+        below = [height - (i + 1) * row_height for i in range(count + 1) if start + i - 1 < last]
+        canv.lines([(0, y, width, y) for y in below])
+        if start + count - 1 == last:
+            canv.setStrokeColor(t.primary)
+            canv.setLineWidth(1)
+            canv.line(0, row_height, width, row_height)
+        canv.restoreState()
+        canv.restoreState()
+        start += count
+
+
+class _RowText:
+    """Ledger rows as PDF text operators, appended to a page's text object.
+
+    Each cell is shown with a relative move from the one before it, so a
+    row is a single string rather than a text origin and a line per cell.
+    The viewer sums the moves, which rounds a little differently from
+    absolute origins: edge pixels of the text may differ from platypus's
+    ledger, the layout does not.
+    """
+
+    def __init__(self, lefts, right, font_size):
+        self.lefts = lefts
+        self.right = right
+        self.font_size = font_size
+        self.steps = [f" {b - a:.3f} 0 Td " for a, b in zip(lefts, lefts[1:])]
+
+    def add(self, text, font, lines):
+        """Append rows to text, a text object whose origin is the first row's first cell."""
+        # A standard font shows printable ASCII as it is; anything else, and every
+        # TrueType face (encoded into subsets as glyphs appear), goes through reportlab
+        dynamic = getFont(font)._dynamicFont
+        encode = text._formatText
+
+        def cell(value):
+            if dynamic or not _PLAIN_TEXT.match(value):
+                return encode(value)
+            return f"({value}) Tj"
+
+        first, last, right, size = self.lefts[0], self.lefts[-1], self.right, self.font_size
+        code = text._code
+        for line in lines:
+            parts = [cell(line[0])]
+            for step, value in zip(self.steps, line[1:-1]):
+                parts.append(step)
+                parts.append(cell(value))
+            amount = line[-1]
+            x = right - text_width(amount, font, size)
+            parts += (f" {x - last:.3f} 0 Td ", cell(amount), f" {first - x:.3f} {-ROW_HEIGHT} Td")
+            code.append("".join(parts))
+
+
+def _draw_ledger(flow, t, rows, width, columns):
+    """The statement.ledger table, paginated as LedgerTable does, one text object per page.
+
+    Each page holds rows_per_page() rows under a repeated header. Cells are
+    clipped to their column, and rows are striped white and row_bg. A page
+    the ledger splits off is a centred Table in platypus, while its last
+    page is LedgerTable itself, which sits at the frame's left edge.
+    """
+    font_size = 8.5
+    fractions = [fraction for _title, fraction in columns]
+    grids = (_Grid(flow, width, fractions), _Grid(flow, width, fractions, left=True))
+    bold, regular = t.fonts.face("Helvetica-Bold"), t.fonts.face("Helvetica")
+    clippers = [
+        TextClipper(w - CELL_PADDING, regular, clean=t.fonts.plain) for w in grids[0].col_widths
+    ]
+    header = [title for title, _fraction in columns]
+    pad = CELL_PADDING / 2
+    lefts = [x + pad for x in grids[0].col_x[:-1]]
+    right = width - pad
+    # VALIGN MIDDLE with no top or bottom padding
+    offset = (ROW_HEIGHT + CELL_LEADING) / 2 - font_size
+    canv = flow.canv
+    rows_text = _RowText(lefts, right, font_size)
+    # Stripe paths by rows on the page: every full page has the same one
+    striped = {}
+    rows = iter(rows)
+    pending = []
+
+    while True:
+        fits = max(0, rows_per_page(flow.available(), ROW_HEIGHT))
+        while len(pending) <= fits:
+            row = next(rows, None)
+            if row is None:
+                break
+            pending.append([clip(cell) for clip, cell in zip(clippers, row)])
+        if not pending:
+            return
+        if fits < 1:
+            flow.new_page()
+            continue
+        page, pending = pending[:fits], pending[fits:]
+        grid = grids[not pending]
+        height = ROW_HEIGHT * (len(page) + 1)
+        top = flow.place(height)
+        _origin(canv, grid.x, top - height)
+
+        canv.setFillColor(t.primary_light)
+        canv.rect(0, height - ROW_HEIGHT, width, ROW_HEIGHT, stroke=0, fill=1)
+        # The body in white, then every other row striped in one path
+        canv.setFillColor(t.white)
+        canv.rect(0, 0, width, height - ROW_HEIGHT, stroke=0, fill=1)
+        stripes = striped.get(len(page))
+        if stripes is None:
+            stripes = striped[len(page)] = canv.beginPath()
+            for i in range(2, len(page) + 1, 2):
+                stripes.rect(0, height - (i + 1) * ROW_HEIGHT, width, ROW_HEIGHT)
+        canv.setFillColor(t.row_bg)
+        canv.drawPath(stripes, stroke=0, fill=1)
+        _table_lines(canv, t.border, 0.5)
+        canv.line(0, height - ROW_HEIGHT, width, height - ROW_HEIGHT)
+        canv.restoreState()
+
+        text = canv.beginText(lefts[0], height - ROW_HEIGHT + offset)
+        text.setFillColor(t.text)
+        for font, lines in ((bold, [header]), (regular, page)):
+            text.setFont(font, font_size)
+            rows_text.add(text, font, lines)
+        canv.drawText(text)
+        canv.restoreState()
+        if pending:
+            flow.new_page()
+
+
+def _draw_runs(flow, text_style, runs):
+    """(Text, colour, string) runs on one line, in one text object as a Paragraph sets them.
+
+    The viewer advances from run to run by the font's own widths, which for
+    a TrueType face differ slightly from stringWidth().
+    """
+    top = flow.place(text_style.leading, text_style.before, text_style.after)
+    canv = flow.canv
+    _origin(canv, flow.x, top - text_style.leading)
+    text = canv.beginText(0, text_style.leading - text_style.font_size)
+    for style, color, part in runs:
+        text.setFillColor(color)
+        text.setFont(style.font_name, style.font_size)
+        text.textOut(part)
+    canv.drawText(text)
+    canv.restoreState()
+
+
+def _draw_drawing(flow, drawing):
+    top = flow.place(drawing.height)
+    drawing.drawOn(flow.canv, flow.x, top - drawing.height)
+
+
+def _draw_captioned(flow, text_style, caption, drawing):
+    """A caption and its chart, moved to a new page together as a KeepTogether is."""
+    height = text_style.leading + max(text_style.after, drawing.getSpaceBefore()) + drawing.height
+    if height > flow.available(text_style.before) and not flow.at_top:
+        flow.new_page()
+    text_style.draw(flow, caption)
+    _draw_drawing(flow, drawing)
+
+
+# ─── Statement ───
+
+def draw_statement(job, output, tips=(), theme=DEFAULT_THEME, series=None, metrics=None):
+    """Draw job's statement into output, a path or a binary file; returns output.
+
+    Only for statements simple() accepts. It takes the same arguments as
+    reports.statements.build_statement(). metrics, a
+    reports.sections.BuildMetrics, is charged per section as platypus
+    builds charge it.
+    """
+    if metrics is None:
+        _draw(job, output, tips, theme, series)
+    else:
+        metrics.draw(_draw, job, output, tips, theme, series, output=output)
+    return output
+
+
+def _section(metrics, name, flow):
+    if metrics is None:
+        return nullcontext()
+    return metrics.section(name, lambda: flow.pages)
+
+
+def _draw(job, output, tips, theme, series, metrics=None):
+    """draw_statement()'s drawing; returns the number of pages."""
+    from reports.statements import (
+        LEDGER_COLUMNS, PAGE_SETUP, format_cents, format_period, ledger_rows,
+    )
+
+    t = get_theme(theme)
+    texts = _texts(theme, t.fonts.key)
+    heading, body = texts["heading"], texts["body"]
+    payout = job["payout"]
+    venue_name = job["venue"].get("name") or "Venue"
+    distributions = job["distributions"]
+
+    canv = Canvas(output, pagesize=PAGE_SETUP["pagesize"], invariant=1)
+    canv.setTitle(f"Payout Statement {payout['id']}")
+    canv.setAuthor("TipUs")
+    flow = Flow(canv, PAGE_SETUP)
+    # Tables, rules and charts are sized to the doc width, which overhangs the frame padding
+    width = flow.width + 2 * FRAME_PADDING
+
+    # ─── HEADER ───
+    with _section(metrics, "Header", flow):
+        logo = assets.logo_path(job["venue"])
+        if logo:
+            assets.draw_logo(canv, logo, PAGE_SETUP)
+        texts["title"].draw(flow, venue_name)
+        texts["subtitle"].draw(flow, f"Payout Statement  |  {format_period(payout)}")
+        _rule(flow, 2, t.primary, 4 * mm)
+
+    # ─── SUMMARY ───
+    with _section(metrics, "Summary", flow):
+        heading.draw(flow, "Summary")
+        summary = [
+            ("Payout ID", payout["id"]),
+            ("Status", (payout.get("status") or "pending").replace("_", " ").title()),
+            ("Total Tips", format_cents(payout["total_amount"])),
+            (f"Platform Fee ({PLATFORM_FEE_RATE:.0%})", format_cents(payout["platform_fee"])),
+            ("Net Distributed", format_cents(payout["net_amount"])),
+        ]
+        issues = job.get("reconciliation")
+        if issues is not None:
+            summary.append(
+                ("Reconciliation", "Discrepancies found" if issues else "Fee and shares verified")
+            )
+        _draw_summary(flow, t, summary, width)
+        for issue in issues or ():
+            _draw_runs(flow, body, [
+                (texts["body_bold"], t.warning, BULLET), (body, body.color, " " + _collapse(issue)),
+            ])
+
+    # ─── DISTRIBUTIONS ───
+    with _section(metrics, "Employee Distributions", flow):
+        heading.draw(flow, "Employee Distributions")
+        if not distributions:
+            body.draw(flow, "No distributions recorded for this payout.")
+        else:
+            rows = []
+            for dist in distributions:
+                days = f"{dist['days_active']} / {dist['total_period_days']}"
+                if dist.get("is_prorated"):
+                    days += " (prorated)"
+                rows.append((
+                    dist.get("employee_name") or dist["employee_id"], days,
+                    (dist.get("status") or "pending").title(), format_cents(dist["amount"]),
+                ))
+            total = format_cents(sum(d["amount"] for d in distributions))
+            _draw_distributions(flow, t, rows, total, width)
+
+    # ─── CHARTS ───
+    if series is not None or distributions:
+        with _section(metrics, "Charts", flow):
+            heading.draw(flow, "Charts")
+            if series is not None:
+                _draw_captioned(
+                    flow, body, "Tips over the period", tips_chart(series, width, theme),
+                )
+            if distributions:
+                flow.place(4 * mm)
+                _draw_captioned(
+                    flow, body, "Share of net distributed",
+                    shares_chart(payout["id"], distributions, width, theme),
+                )
+
+    # ─── TIP LEDGER ───
+    with _section(metrics, "Tip Ledger", flow):
+        heading.draw(flow, "Tip Ledger")
+        totals = {"count": 0, "amount": 0}
+        rows = ledger_rows(tips, job.get("employee_names", {}), totals)
+        _draw_ledger(flow, t, rows, width, LEDGER_COLUMNS)
+        if not totals["count"]:
+            body.draw(flow, "No succeeded tips recorded in this period.")
+        else:
+            bold = texts["body_bold"]
+            parts = (
+                (bold, f"{totals['count']:,}"), (body, " tips totalling "),
+                (bold, format_cents(totals["amount"])),
+            )
+            _draw_runs(flow, body, [(text, body.color, part) for text, part in parts])
+
+    # ─── FOOTER ───
+    with _section(metrics, "Footer", flow):
+        flow.place(10 * mm)
+        _rule(flow, 0.5, t.border, 3 * mm)
+        texts["footer"].draw(flow, f"TipUs  |  {venue_name}  |  Payout Statement  |  Confidential")
+
+    with _section(metrics, WRITE_SECTION, flow):
+        canv.showPage()
+        canv.save()
+    return flow.pages
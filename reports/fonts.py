@@ -0,0 +1,350 @@
+"""Brand TrueType fonts with per-glyph fallback, and the PDF compression level.
+
+The styles in reports.theme name the standard Helvetica faces. configure()
+picks a TrueType family to use instead (e.g. "noto", or "TipUsSans" for
+TipUsSans-Regular.ttf, TipUsSans-Bold.ttf, ...) and a zlib level for the
+PDF streams. current() registers the family and the fallback fonts with
+reportlab the first time it is called in a process, so a pool worker
+parses each TTF once and every document after that reuses it. reportlab
+embeds only the glyphs a document actually uses, so a statement carries a
+subset of a few KB per face rather than the whole font.
+
+Venue, employee and tipper names come from users and may hold characters
+the brand font lacks: non-Latin scripts, symbols and emoji. markup()
+switches each such run to the first FALLBACKS font that has it, fallback()
+does the same inside existing paragraph markup, and text no font can draw
+is dropped (emoji, joiners, variation selectors) or shown as "?" (letters)
+rather than as empty boxes.
+
+Fonts are looked up in $TIPUS_FONT_PATH, ./fonts, reportlab's own font
+directory and the system font directories. With no family configured,
+text Helvetica can draw comes out exactly as before; only characters it
+would have drawn as a placeholder glyph go to a fallback font.
+"""
+
+import hashlib
+import os
+import re
+import unicodedata
+import zlib
+from functools import lru_cache
+from html import unescape
+from xml.sax.saxutils import escape
+
+FONT_PATH = [
+    *filter(None, os.environ.get("TIPUS_FONT_PATH", "").split(os.pathsep)),
+    "fonts",
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+]
+
+# Helvetica face -> suffix of the matching face of a TrueType family
+FACES = {
+    "Helvetica": "",
+    "Helvetica-Bold": "-Bold",
+    "Helvetica-Oblique": "-Oblique",
+    "Helvetica-BoldOblique": "-BoldOblique",
+}
+
+# Family name -> (regular, bold, italic, bold italic) files. Any other name
+# is looked up as <name>-Regular.ttf, <name>-Bold.ttf, ...
+FAMILIES = {
+    "vera": ("Vera.ttf", "VeraBd.ttf", "VeraIt.ttf", "VeraBI.ttf"),  # ships with reportlab
+    "dejavu": (
+        "DejaVuSans.ttf", "DejaVuSans-Bold.ttf",
+        "DejaVuSans-Oblique.ttf", "DejaVuSans-BoldOblique.ttf",
+    ),
+    "noto": (
+        "NotoSans-Regular.ttf", "NotoSans-Bold.ttf",
+        "NotoSans-Italic.ttf", "NotoSans-BoldItalic.ttf",
+    ),
+}
+
+# Tried in order for characters the family lacks; missing files are skipped
+FALLBACKS = (
+    "DejaVuSans.ttf",
+    "NotoSans-Regular.ttf",
+    "NotoSansSymbols2-Regular.ttf",
+    "NotoEmoji-Regular.ttf",
+    "DroidSansFallbackFull.ttf",
+)
+
+MISSING = "?"
+_TAG = re.compile(r"(<[^>]*>)")
+# Unicode categories left out when no font has the character: symbols and
+# emoji, modifiers, joiners and variation selectors, private use, unassigned
+DROPPED = frozenset(("So", "Sk", "Cf", "Mn", "Co", "Cn"))
+MAX_CACHED = 4096
+
+_settings = {
+    "family": os.environ.get("TIPUS_FONT") or None,
+    "compression": int(os.environ["TIPUS_PDF_COMPRESSION"])
+    if os.environ.get("TIPUS_PDF_COMPRESSION") else None,
+}
+
+
+# ─── Configuration ───
+
+def configure(family=None, compression=None):
+    """Set the font family and zlib level (0 = uncompressed, 1-9) for this process.
+
+    None keeps the current setting ($TIPUS_FONT / $TIPUS_PDF_COMPRESSION
+    unless changed). Call it before rendering: themes and compiled
+    templates are built for the fonts in effect when they are first used.
+    """
+    if family is not None:
+        _settings["family"] = family
+    if compression is not None:
+        if not 0 <= compression <= 9:
+            raise ValueError(f"compression level must be 0-9, not {compression}")
+        _settings["compression"] = compression
+
+
+def settings():
+    """(family, compression) in effect, e.g. to hand on to pool workers."""
+    return _settings["family"], _settings["compression"]
+
+
+def current():
+    """The FontSet for the configured family, registered on first use in this process."""
+    return _font_set(*settings())
+
+
+@lru_cache(maxsize=None)
+def _font_files():
+    """File name -> path of every TrueType font on FONT_PATH; the first one found wins."""
+    import reportlab
+
+    files = {}
+    for root in (*FONT_PATH, os.path.join(os.path.dirname(reportlab.__file__), "fonts")):
+        for dirpath, _dirs, names in os.walk(root):
+            for name in names:
+                if name.lower().endswith(".ttf"):
+                    files.setdefault(name, os.path.join(dirpath, name))
+    return files
+
+
+def find_font(filename):
+    """Path of a font file on FONT_PATH, or None."""
+    if os.path.isfile(filename):
+        return filename
+    return _font_files().get(filename)
+
+
+def _load(name, path):
+    """Register the TTF at path as name; None if reportlab cannot use it (e.g. CFF outlines)."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFError, TTFont
+
+    try:
+        font = TTFont(name, path)
+    except TTFError:
+        return None
+    pdfmetrics.registerFont(font)
+    return font
+
+
+# ─── Compression ───
+
+def _set_compression(level):
+    """Deflate PDF streams at level (0 turns compression off); None keeps reportlab's default."""
+    from reportlab import rl_config
+    from reportlab.pdfbase import pdfdoc
+
+    if level is None:
+        return
+
+    class Deflate(pdfdoc.PDFStreamFilterZCompress):
+        def encode(self, text):
+            if isinstance(text, str):
+                text = text.encode("utf8")
+            return zlib.compress(text, level)
+
+    rl_config.pageCompression = 1 if level else 0
+    # Page content, font files and their cmaps all look this filter up at write time
+    pdfdoc.PDFZCompress = Deflate()
+
+
+# ─── Font sets ───
+
+class FontSet:
+    """The faces documents are drawn in plus the fallbacks for characters they lack.
+
+    face("Helvetica-Bold") is the registered name to use for that face;
+    key identifies the fonts and compression for build cache keys.
+    """
+
+    def __init__(self, family, faces, fallbacks, compression, key):
+        self.family = family
+        self.faces = faces
+        self.compression = compression
+        self.key = key
+        # (font name, covered code points), primary face first
+        primary = faces.get("Helvetica", "Helvetica")
+        self._fonts = [(primary, _coverage(primary))] + [
+            (font.fontName, _coverage(font.fontName)) for font in fallbacks
+        ]
+        self._ascii = all(ord(c) in self._fonts[0][1] for c in map(chr, range(32, 127)))
+        self._markup = {}
+        self._plain = {}
+
+    def __repr__(self):
+        return f"FontSet({self.family or 'Helvetica'!r})"
+
+    def face(self, name):
+        return self.faces.get(name, name)
+
+    def covers(self, text):
+        """Whether the primary face has a glyph for every character of text."""
+        return (self._ascii and text.isascii()) or all(ord(c) in self._fonts[0][1] for c in text)
+
+    def _runs(self, text):
+        """(font name or None for the primary face, text) runs of text."""
+        runs = []
+        for c in text:
+            font = next((name for name, chars in self._fonts if ord(c) in chars), False)
+            if font is False:
+                if unicodedata.category(c) in DROPPED:
+                    continue
+                font, c = self._fonts[0][0], MISSING
+            if font == self._fonts[0][0]:
+                font = None
+            if runs and runs[-1][0] == font:
+                runs[-1][1].append(c)
+            else:
+                runs.append((font, [c]))
+        return [(font, "".join(chars)) for font, chars in runs]
+
+    def markup(self, text):
+        """text escaped for a Paragraph, with runs the face lacks set in a fallback font."""
+        if self.covers(text):
+            return escape(text)
+        result = self._markup.get(text)
+        if result is None:
+            result = "".join(
+                escape(run) if font is None else f'<font name="{font}">{escape(run)}</font>'
+                for font, run in self._runs(text)
+            )
+            if len(self._markup) < MAX_CACHED:
+                self._markup[text] = result
+        return result
+
+    def fallback(self, markup):
+        """Paragraph markup with the text between its tags passed through markup(),
+        where the face lacks any of it."""
+        if self.covers(unescape(markup)):
+            return markup
+        parts = _TAG.split(markup)
+        for i in range(0, len(parts), 2):
+            text = unescape(parts[i])
+            if not self.covers(text):
+                parts[i] = self.markup(text)
+        return "".join(parts)
+
+    def cell(self, text, style):
+        """text for a table cell: the string itself when the face covers it, or else a
+        Paragraph in style with fallback runs."""
+        if self.covers(text):
+            return text
+        from reportlab.platypus import Paragraph
+
+        return Paragraph(self.markup(text), style)
+
+    def plain(self, text):
+        """text for a plain table cell drawn in the primary face: characters it lacks are
+        dropped or replaced, since a single string cannot switch fonts."""
+        if self.covers(text):
+            return text
+        result = self._plain.get(text)
+        if result is None:
+            primary = self._fonts[0][1]
+            result = " ".join("".join(
+                c if ord(c) in primary else "" if unicodedata.category(c) in DROPPED else MISSING
+                for c in text
+            ).split())
+            if len(self._plain) < MAX_CACHED:
+                self._plain[text] = result
+        return result
+
+
+def _coverage(name):
+    """Code points the registered font name can draw (with its substitution fonts)."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    font = pdfmetrics.getFont(name)
+    if isinstance(font, TTFont):
+        return frozenset(font.face.charToGlyph)
+    return _Encodable([f.encName for f in [font, *font.substitutionFonts]])
+
+
+class _Encodable:
+    """Code points a standard Type 1 font can draw: those its encoding or one of its
+    substitution fonts' encodes (several code points may share a glyph)."""
+
+    def __init__(self, encodings):
+        self.encodings = encodings
+        self._known = {}
+
+    def __contains__(self, code):
+        known = self._known.get(code)
+        if known is None:
+            known = self._known[code] = any(_encodes(chr(code), e) for e in self.encodings)
+        return known
+
+
+def _encodes(c, encoding):
+    try:
+        c.encode(encoding)
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _family_files(family):
+    files = FAMILIES.get(family.lower())
+    if files is None:
+        files = [f"{family}-{face}.ttf" for face in ("Regular", "Bold", "Italic", "BoldItalic")]
+    return [find_font(f) for f in files]
+
+
+@lru_cache(maxsize=None)
+def _font_set(family, compression):
+    from reportlab.pdfbase.pdfmetrics import registerFontFamily
+
+    _set_compression(compression)
+    h = hashlib.sha256(repr((family, compression)).encode())
+    faces = {}
+    if family:
+        regular, bold, italic, bold_italic = _family_files(family)
+        if regular is None:
+            raise ValueError(
+                f"No regular face of font family {family!r} on {os.pathsep.join(FONT_PATH)}"
+            )
+        # A missing face falls back to the nearest one the family has
+        bold = bold or regular
+        paths = [regular, bold, italic or regular, bold_italic or bold]
+        for (helvetica, suffix), path in zip(FACES.items(), paths):
+            font = _load(family + suffix, path)
+            if font is None:
+                raise ValueError(f"{path} is not a TrueType font reportlab can embed")
+            faces[helvetica] = font.fontName
+            h.update(f"{suffix}={os.path.basename(path)}:{os.path.getsize(path)}".encode())
+        names = [faces[name] for name in FACES]
+        # <b> and <i> in paragraph markup pick the family's faces
+        registerFontFamily(
+            family, normal=names[0], bold=names[1], italic=names[2], boldItalic=names[3],
+        )
+
+    fallbacks = []
+    for filename in FALLBACKS:
+        path = find_font(filename)
+        font = path and _load(f"Fallback-{os.path.splitext(filename)[0]}", path)
+        if font:
+            # A fallback only has the one face; <b> inside a fallback run stays regular
+            registerFontFamily(font.fontName, normal=font.fontName, bold=font.fontName,
+                               italic=font.fontName, boldItalic=font.fontName)
+            fallbacks.append(font)
+            h.update(f"{filename}:{os.path.getsize(path)}".encode())
+    return FontSet(family, faces, fallbacks, compression, h.hexdigest())
@@ -0,0 +1,136 @@
+"""Crash-safe journal of statement batch runs, so a restarted run resumes where it died.
+
+render_statements() keeps one journal per output directory (JOURNAL_NAME,
+SQLite in WAL mode). It commits a row as each statement finishes: the file
+name, its content key and the SHA-256 of the PDF written. A statement that
+failed gets its error and attempt count instead. The JSON manifest is only
+written once a run ends. After a crash (an OOM kill, a dead worker), the
+journal is what tells the next run which statements are already done.
+
+The next run hands a journalled key back to the renderer as the previous
+key, but only while the PDF on disk still hashes to the journalled digest.
+The renderer then skips that statement once the key is confirmed, so a
+re-run costs only the statements that were not finished.
+
+A failed statement is retried until it has failed max_attempts times,
+counted across runs. After that it is held back as failed until
+retry_failed() clears its count. This mirrors how "Retry Failed" re-sends
+only to the employees whose transfers failed.
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+from reports.cache import file_digest
+
+JOURNAL_NAME = ".statements.journal"
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statements (
+    name TEXT PRIMARY KEY,
+    key TEXT,
+    digest TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at TEXT NOT NULL
+)
+"""
+
+
+class Journal:
+    """The statements journal of out_dir; use as a context manager or close()."""
+
+    def __init__(self, out_dir, name=JOURNAL_NAME):
+        self.path = os.path.join(out_dir, name)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        # WAL commits survive the process dying mid-run without an fsync per row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+        self._entries = {row["name"]: dict(row) for row in self.conn.execute("SELECT * FROM statements")}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def entry(self, name):
+        """The journal row of a statement file as a dict, or None."""
+        return self._entries.get(name)
+
+    def resume_key(self, path):
+        """The journalled key of the statement at path if it finished and the file is unchanged.
+
+        None when it never finished, failed last time, or the PDF on disk
+        is missing or no longer hashes to the journalled digest.
+        """
+        entry = self._entries.get(os.path.basename(path))
+        if entry is None or entry["error"] is not None or entry["digest"] is None:
+            return None
+        try:
+            digest = file_digest(path)
+        except FileNotFoundError:
+            return None
+        return entry["key"] if digest == entry["digest"] else None
+
+    def attempts(self, name):
+        """Failed attempts since the statement last rendered."""
+        entry = self._entries.get(name)
+        return entry["attempts"] if entry else 0
+
+    def exhausted(self, name, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        return self.attempts(name) >= max_attempts
+
+    def record(self, results):
+        """Journal finished statements, (path, key, status, metrics) as from _render(), in one commit.
+
+        A "failed: <error>" status adds an attempt. Any other status marks
+        the statement done with its key and the PDF's digest.
+        """
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        for path, key, status, _metrics in results:
+            name = os.path.basename(path)
+            entry = self._entries.get(name) or {"name": name, "key": None, "digest": None}
+            if status.startswith("failed"):
+                entry = {
+                    **entry, "attempts": self.attempts(name) + 1,
+                    "error": status.partition(": ")[2] or status, "updated_at": now,
+                }
+            else:
+                entry = {
+                    **entry, "key": key, "digest": file_digest(path), "attempts": 0, "error": None,
+                    "updated_at": now,
+                }
+            self.conn.execute(
+                "INSERT OR REPLACE INTO statements (name, key, digest, attempts, error, updated_at) "
+                "VALUES (:name, :key, :digest, :attempts, :error, :updated_at)",
+                entry,
+            )
+            self._entries[name] = entry
+        self.conn.commit()
+
+    def failed(self):
+        """Journal rows of statements whose last attempt failed, by name."""
+        return sorted(
+            (e for e in self._entries.values() if e["error"] is not None), key=lambda e: e["name"],
+        )
+
+    def retry_failed(self):
+        """Clear the attempt counts of failed statements so the next run tries them again.
+
+        Returns how many there were.
+        """
+        cursor = self.conn.execute("UPDATE statements SET attempts = 0 WHERE error IS NOT NULL")
+        self.conn.commit()
+        for entry in self._entries.values():
+            if entry["error"] is not None:
+                entry["attempts"] = 0
+        return cursor.rowcount
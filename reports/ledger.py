@@ -0,0 +1,142 @@
+"""Fast table mode for long ledgers (tips, distributions) of tens of thousands of rows.
+
+platypus Table measures every cell and re-lays out the remainder on every
+split, so one big table gets super-linear in its row count. LedgerTable
+avoids that:
+
+- cells are plain strings, clipped to the column width, never Paragraphs
+- column widths and row heights are fixed up front, so nothing is measured
+- striping is one ROWBACKGROUNDS command from the theme, not a command per row
+- rows are pulled from an iterator one page at a time and laid out as a
+  Table that exactly fills the space left on the page, so no Table is ever split
+"""
+
+from itertools import islice
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable, Table
+
+ROW_HEIGHT = 13
+CELL_PADDING = 6  # left + right padding from the ledger table style
+ELLIPSIS = "…"
+WIDE_GLYPHS = "@MW"
+
+
+class TextClipper:
+    """Clips strings to a column width, measuring only when a string could overflow."""
+
+    def __init__(self, width, font_name="Helvetica", font_size=8.5, clean=None):
+        self.width = width
+        self.font_name = font_name
+        self.font_size = font_size
+        self.clean = clean
+        # Any string this short fits even if every glyph is as wide as the
+        # widest of these ("@" in Helvetica) in the statement character set
+        self.safe_len = int(width // max(stringWidth(c, font_name, font_size) for c in WIDE_GLYPHS))
+        self._cache = {}
+
+    def __call__(self, text):
+        if self.clean is not None:
+            text = self.clean(text)
+        if len(text) <= self.safe_len:
+            return text
+        clipped = self._cache.get(text)
+        if clipped is None:
+            clipped = text
+            if stringWidth(text, self.font_name, self.font_size) > self.width:
+                limit = self.width - stringWidth(ELLIPSIS, self.font_name, self.font_size)
+                while clipped and stringWidth(clipped, self.font_name, self.font_size) > limit:
+                    clipped = clipped[:-1]
+                clipped = clipped.rstrip() + ELLIPSIS
+            if len(self._cache) < 4096:
+                self._cache[text] = clipped
+        return clipped
+
+
+def rows_per_page(height, row_height=ROW_HEIGHT):
+    """Body rows that fit in a frame of the given height under one header row."""
+    return int(height // row_height) - 1
+
+
+class LedgerTable(Flowable):
+    """A table over an iterable of row tuples of strings, materialised a page at a time.
+
+    columns is a list of (header, fraction of width) pairs. style is the
+    TableStyle to apply, e.g. theme.table_style("statement.ledger"); column
+    alignment lives there too. fonts is the theme's reports.fonts.FontSet:
+    cells are measured in its body face and stripped of characters it lacks.
+    Every page repeats the header row.
+    """
+
+    def __init__(self, rows, columns, width, style, row_height=ROW_HEIGHT, fonts=None,
+                 _state=None):
+        super().__init__()
+        if _state is None:
+            col_widths = [width * fraction for _title, fraction in columns]
+            font_name = fonts.face("Helvetica") if fonts is not None else "Helvetica"
+            clean = fonts.plain if fonts is not None else None
+            _state = {
+                "rows": iter(rows),
+                "pending": [],
+                "header": [title for title, _fraction in columns],
+                "col_widths": col_widths,
+                "clippers": [
+                    TextClipper(w - CELL_PADDING, font_name, clean=clean) for w in col_widths
+                ],
+                "style": style,
+                "row_height": row_height,
+            }
+        self._state = _state
+
+    def _peek(self, n):
+        """Make sure up to n rows are pending; returns how many there are."""
+        st = self._state
+        pending = st["pending"]
+        if len(pending) < n and st["rows"] is not None:
+            clippers = st["clippers"]
+            for row in islice(st["rows"], n - len(pending)):
+                pending.append([clip(cell) for clip, cell in zip(clippers, row)])
+            if len(pending) < n:
+                st["rows"] = None
+        return len(pending)
+
+    def _table(self, rows):
+        st = self._state
+        table = Table(
+            [st["header"]] + rows,
+            colWidths=st["col_widths"],
+            rowHeights=[st["row_height"]] * (len(rows) + 1),
+        )
+        table.setStyle(st["style"])
+        return table
+
+    def wrap(self, availWidth, availHeight):
+        st = self._state
+        fits = max(0, rows_per_page(availHeight, st["row_height"]))
+        n = self._peek(fits + 1)
+        self.width = sum(st["col_widths"])
+        if n == 0:
+            self.height = 0
+        elif n <= fits:
+            self.height = (n + 1) * st["row_height"]
+        else:
+            # Too tall for this frame: claim more than is available so that
+            # the frame asks us to split
+            self.height = availHeight + st["row_height"]
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        st = self._state
+        fits = rows_per_page(availHeight, st["row_height"])
+        if fits < 1:
+            return []
+        self._peek(fits)
+        page, st["pending"] = st["pending"][:fits], st["pending"][fits:]
+        return [self._table(page), LedgerTable(None, None, None, None, _state=st)]
+
+    def draw(self):
+        st = self._state
+        if st["pending"]:
+            table = self._table(st["pending"])
+            table.wrapOn(self.canv, self.width, self.height)
+            table.drawOn(self.canv, 0, 0)
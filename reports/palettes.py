@@ -0,0 +1,47 @@
+"""Colour palettes by theme name.
+
+Plain data with no reportlab imports, so the CLI can list the themes in
+--help without paying for reportlab; reports.theme turns these into
+colours and styles.
+"""
+
+DEFAULT_THEME = "tipus"
+
+# ── Palettes ──
+# Every palette defines the same roles so any document can use any theme.
+PALETTES = {
+    # Coral brand palette (status report, statements)
+    "tipus": {
+        "primary": "#d4856a",
+        "primary_light": "#f5e0d7",
+        "primary_dark": "#b06b52",
+        "text": "#1e293b",
+        "text_muted": "#475569",
+        "text_light": "#64748b",
+        "success": "#16a34a",
+        "success_bg": "#dcfce7",
+        "warning": "#d97706",
+        "surface": "#f1f5f9",
+        "border": "#e2e8f0",
+        "header_bg": "#f5e0d7",
+        "row_bg": "#f8fafc",
+        "highlight_bg": "#fef9f0",
+    },
+    # Copper palette (system overview, matching the reference PDF)
+    "copper": {
+        "primary": "#C07A50",
+        "primary_light": "#E8D5B7",
+        "primary_dark": "#9A5F3C",
+        "text": "#1A1A2E",
+        "text_muted": "#6B7280",
+        "text_light": "#9CA3AF",
+        "success": "#059669",
+        "success_bg": "#D1FAE5",
+        "warning": "#D97706",
+        "surface": "#FAFAFA",
+        "border": "#E5E7EB",
+        "header_bg": "#E8D5B7",
+        "row_bg": "#FAFAFA",
+        "highlight_bg": "#FEF9F0",
+    },
+}
@@ -0,0 +1,156 @@
+"""Payout math from supabase/functions/process-payout, vectorised with NumPy.
+
+Every function works on flat arrays covering any number of payouts at once:
+per-employee rows carry a payout_index into the per-payout arrays, so a whole
+quarter of payouts across every venue is a handful of array operations
+instead of a loop per employee.
+
+The results match the edge function exactly: JavaScript's Math.round, the
+5% fee, days-active proration, and the rounding remainder going to the first
+employee of each payout, so shares always sum to net_amount.
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+PLATFORM_FEE_RATE = 0.05
+MS_PER_DAY = 1000 * 60 * 60 * 24
+
+
+def js_round(values):
+    """Math.round: halves round towards +infinity (np.round rounds them to even)."""
+    return np.floor(np.asarray(values, dtype=np.float64) + 0.5).astype(np.int64)
+
+
+def split_fee(total_amounts):
+    """(platform_fee, net_amount) arrays for total tip amounts in cents."""
+    total = np.asarray(total_amounts, dtype=np.int64)
+    fee = js_round(total * PLATFORM_FEE_RATE)
+    return fee, total - fee
+
+
+def to_epoch_ms(timestamps):
+    """ISO-8601 strings to an int64 array of epoch milliseconds; None/"" -> -1.
+
+    Naive timestamps are taken as UTC, like the edge functions' Date parsing
+    of date-only strings.
+    """
+    ms = np.full(len(timestamps), -1, dtype=np.int64)
+    for i, ts in enumerate(timestamps):
+        if ts:
+            dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            ms[i] = round(dt.timestamp() * 1000)
+    return ms
+
+
+def days_active(period_start, period_end, activated_at, deactivated_at, payout_index):
+    """(days_active, total_period_days) per employee row, as process-payout computes them.
+
+    period_* are per-payout epoch ms; activated_at/deactivated_at are
+    per-employee epoch ms with -1 for never deactivated. Both counts are
+    inclusive of the end day and at least 1.
+    """
+    p_start = np.asarray(period_start, dtype=np.int64)
+    p_end = np.asarray(period_end, dtype=np.int64)
+    idx = np.asarray(payout_index, dtype=np.intp)
+    activated = np.asarray(activated_at, dtype=np.int64)
+    deactivated = np.asarray(deactivated_at, dtype=np.int64)
+
+    total_days = np.maximum(1, np.ceil((p_end - p_start) / MS_PER_DAY).astype(np.int64) + 1)
+
+    start = np.maximum(activated, p_start[idx])
+    end = np.where((deactivated >= 0) & (deactivated < p_end[idx]), deactivated, p_end[idx])
+    days = np.maximum(1, np.ceil((end - start) / MS_PER_DAY).astype(np.int64) + 1)
+    return days, total_days[idx]
+
+
+def first_rows(payout_index, n_payouts):
+    """Row number of the first employee row of every payout (-1 where it has none)."""
+    idx = np.asarray(payout_index, dtype=np.intp)
+    first = np.full(n_payouts, -1, dtype=np.intp)
+    payouts, rows = np.unique(idx, return_index=True)
+    first[payouts] = rows
+    return first
+
+
+def prorate(net_amounts, days, payout_index):
+    """Each employee's share of their payout's net_amount, weighted by days active.
+
+    Shares are Math.round(net * days / sum(days)); whatever rounding leaves
+    over goes to the first row of each payout, so every payout's shares sum
+    exactly to its net_amount.
+    """
+    net = np.asarray(net_amounts, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    idx = np.asarray(payout_index, dtype=np.intp)
+    n = len(net)
+
+    day_sums = np.bincount(idx, weights=days, minlength=n)
+    shares = js_round(net[idx] * (days / day_sums[idx]))
+
+    remainder = net - np.bincount(idx, weights=shares, minlength=n).astype(np.int64)
+    first = first_rows(idx, n)
+    has_rows = first >= 0
+    shares[first[has_rows]] += remainder[has_rows]
+    return shares
+
+
+def reconcile(payouts, distributions):
+    """Check stored payouts and distributions against a recomputation.
+
+    payouts is a list of payouts rows; distributions a list of
+    payout_distributions rows. Returns {payout_id: [issue, ...]} with an entry
+    (possibly empty) for every payout.
+
+    The edge function gives the rounding remainder to whichever employee it
+    happened to list first, and that order isn't stored, so a distribution
+    may differ from its rounded share only if it is the single row absorbing
+    the remainder.
+    """
+    ids = [p["id"] for p in payouts]
+    position = {pid: i for i, pid in enumerate(ids)}
+    total = np.array([p["total_amount"] for p in payouts], dtype=np.int64)
+    fee = np.array([p["platform_fee"] for p in payouts], dtype=np.int64)
+    net = np.array([p["net_amount"] for p in payouts], dtype=np.int64)
+    n = len(ids)
+
+    dists = [d for d in distributions if d["payout_id"] in position]
+    idx = np.array([position[d["payout_id"]] for d in dists], dtype=np.intp)
+    amounts = np.array([d["amount"] for d in dists], dtype=np.int64)
+    days = np.array([d["days_active"] for d in dists], dtype=np.int64)
+
+    expected_fee, expected_net = split_fee(total)
+    fee_ok = fee == expected_fee
+    net_ok = net == expected_net
+
+    counts = np.bincount(idx, minlength=n)
+    sums = np.bincount(idx, weights=amounts, minlength=n).astype(np.int64)
+    sum_ok = (counts == 0) | (sums == net)
+
+    if len(dists):
+        day_sums = np.bincount(idx, weights=days, minlength=n)
+        rounded = js_round(net[idx] * (days / day_sums[idx]))
+        leftover = net - np.bincount(idx, weights=rounded, minlength=n).astype(np.int64)
+        off = amounts != rounded
+        off_count = np.bincount(idx, weights=off, minlength=n).astype(np.int64)
+        off_amount = np.bincount(idx, weights=amounts - rounded, minlength=n).astype(np.int64)
+        # Either nothing is off, or exactly one row carries exactly the leftover
+        split_ok = (off_count == 0) | ((off_count == 1) & (off_amount == leftover))
+    else:
+        split_ok = np.ones(n, dtype=bool)
+
+    issues = {pid: [] for pid in ids}
+    for i in np.flatnonzero(~(fee_ok & net_ok & sum_ok & split_ok)):
+        found = issues[ids[i]]
+        if not fee_ok[i]:
+            found.append(f"platform_fee {fee[i]} != {expected_fee[i]} (5% of {total[i]})")
+        if not net_ok[i]:
+            found.append(f"net_amount {net[i]} != {expected_net[i]}")
+        if not sum_ok[i]:
+            found.append(f"distributions sum to {sums[i]}, net_amount is {net[i]}")
+        if not split_ok[i]:
+            found.append("distribution amounts don't match the days-active split")
+    return issues
@@ -0,0 +1,200 @@
+"""Per-venue, per-day tip aggregates, so reports don't rescan the tips table.
+
+tip_daily holds one row per venue per closed day: tip counts by status
+plus the succeeded and refunded amounts. update_rollups() folds every day
+that has closed since the last call into it with one indexed range scan,
+so running it from cron costs a day of tips, not the whole table. Tips
+that change after their day closed (a webhook marking one succeeded, a
+refund, a late insert) are applied to the stored row by triggers, which
+only fire for closed days and leave the hot insert path alone.
+
+Readers get closed days from tip_daily and aggregate raw rows only for the
+days after it, normally just today: a year of one venue is 365 rows at
+most, whatever the tip volume.
+"""
+
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+
+COLUMNS = (
+    "tips", "succeeded", "succeeded_amount", "pending", "failed", "refunded", "refunded_amount",
+)
+CLOSED_THROUGH = "tip_daily.closed_through"
+
+# What one tips row r contributes to each column
+CONTRIBUTION = {
+    "tips": "1",
+    "succeeded": "({r}.status = 'succeeded')",
+    "succeeded_amount": "(CASE WHEN {r}.status = 'succeeded' THEN {r}.amount ELSE 0 END)",
+    "pending": "({r}.status = 'pending')",
+    "failed": "({r}.status = 'failed')",
+    "refunded": "({r}.status = 'refunded')",
+    "refunded_amount": "(CASE WHEN {r}.status = 'refunded' THEN {r}.amount ELSE 0 END)",
+}
+
+_CLOSED = f"(SELECT value FROM rollup_state WHERE name = '{CLOSED_THROUGH}')"
+_UPSERT = (
+    f"INSERT INTO tip_daily (venue_id, day, {', '.join(COLUMNS)}) {{select}} "
+    "ON CONFLICT (venue_id, day) DO UPDATE SET "
+    + ", ".join(f"{c} = {c} + excluded.{c}" for c in COLUMNS)
+)
+
+
+def _apply(row, sign):
+    """Trigger statement adding (sign 1) or removing (-1) row's tip from its day, if closed."""
+    values = ", ".join(f"{sign} * {CONTRIBUTION[c].format(r=row)}" for c in COLUMNS)
+    select = (
+        f"SELECT {row}.venue_id, substr({row}.created_at, 1, 10), {values} "
+        f"WHERE substr({row}.created_at, 1, 10) <= {_CLOSED}"
+    )
+    return _UPSERT.format(select=select) + ";"
+
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS tip_daily (
+  venue_id TEXT NOT NULL,
+  day TEXT NOT NULL,
+  {", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in COLUMNS)},
+  PRIMARY KEY (venue_id, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_state (
+  name TEXT PRIMARY KEY,
+  value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tips_created ON tips(created_at);
+CREATE TRIGGER IF NOT EXISTS tip_daily_insert AFTER INSERT ON tips BEGIN
+  {_apply("NEW", 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS tip_daily_delete AFTER DELETE ON tips BEGIN
+  {_apply("OLD", -1)}
+END;
+CREATE TRIGGER IF NOT EXISTS tip_daily_update
+AFTER UPDATE OF venue_id, amount, status, created_at ON tips BEGIN
+  {_apply("OLD", -1)}
+  {_apply("NEW", 1)}
+END;
+"""
+
+_AGGREGATE = (
+    "SELECT venue_id, substr(created_at, 1, 10) AS day, "
+    + ", ".join(f"SUM({CONTRIBUTION[c].format(r='tips')}) AS {c}" for c in COLUMNS)
+    + " FROM tips WHERE {where} GROUP BY venue_id, day ORDER BY venue_id, day"
+)
+
+
+def utc_today():
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _next_day(day):
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+def create_rollups(conn):
+    conn.executescript(SCHEMA)
+
+
+def closed_through(conn):
+    """Last day folded into tip_daily, or None if rollups were never built."""
+    try:
+        row = conn.execute(
+            "SELECT value FROM rollup_state WHERE name = ?", (CLOSED_THROUGH,),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # No rollup_state table: update_rollups() has never run on this database
+        return None
+    return row[0] if row else None
+
+
+def update_rollups(conn, today=None):
+    """Fold every day before today (YYYY-MM-DD, default the UTC date) into tip_daily.
+
+    Only days after the last one folded are read. Returns the number of
+    (venue, day) rows written.
+    """
+    create_rollups(conn)
+    today = today or utc_today()
+    last = closed_through(conn)
+    start = _next_day(last) if last else ""
+    if start >= today:
+        return 0
+    select = _AGGREGATE.format(where="created_at >= ? AND created_at < ?")
+    with conn:
+        # A newly closed day has never been in tip_daily, so its rows are inserted whole
+        cursor = conn.execute(
+            _UPSERT.format(select=f"SELECT * FROM ({select}) WHERE true"),
+            (start, today),
+        )
+        conn.execute(
+            "INSERT INTO rollup_state (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+            (CLOSED_THROUGH, (date.fromisoformat(today) - timedelta(days=1)).isoformat()),
+        )
+    return cursor.rowcount
+
+
+def rebuild_rollups(conn, today=None):
+    """Drop tip_daily and fold every closed day again from the tips table."""
+    create_rollups(conn)
+    with conn:
+        conn.execute("DELETE FROM tip_daily")
+        conn.execute("DELETE FROM rollup_state WHERE name = ?", (CLOSED_THROUGH,))
+    return update_rollups(conn, today)
+
+
+def iter_daily(conn, venue_id, start_day, end_day):
+    """Daily aggregates for venue_id over [start_day, end_day], one dict per day with tips.
+
+    Days up to closed_through() come from tip_daily; later ones (the open
+    day) are aggregated from the tips rows.
+    """
+    last = closed_through(conn)
+    if last and start_day <= last:
+        cursor = conn.execute(
+            f"SELECT venue_id, day, {', '.join(COLUMNS)} FROM tip_daily "
+            "WHERE venue_id = ? AND day >= ? AND day <= ? ORDER BY day",
+            (venue_id, start_day, min(end_day, last)),
+        )
+        yield from _dicts(cursor)
+        start_day = _next_day(last)
+    if start_day <= end_day:
+        cursor = conn.execute(
+            _AGGREGATE.format(where="venue_id = ? AND created_at >= ? AND created_at < ?"),
+            (venue_id, start_day, _next_day(end_day)),
+        )
+        yield from _dicts(cursor)
+
+
+def _dicts(cursor):
+    names = [d[0] for d in cursor.description]
+    try:
+        for row in cursor:
+            yield dict(zip(names, row))
+    finally:
+        cursor.close()
+
+
+def daily_from_tips(tips):
+    """The same daily aggregates computed in Python from tips rows, ordered by day."""
+    days = {}
+    for tip in tips:
+        day = tip["created_at"][:10]
+        row = days.get(day)
+        if row is None:
+            row = days[day] = {"venue_id": tip["venue_id"], "day": day, **dict.fromkeys(COLUMNS, 0)}
+        status = tip.get("status") or "pending"
+        row["tips"] += 1
+        if status in ("succeeded", "pending", "failed", "refunded"):
+            row[status] += 1
+        if status in ("succeeded", "refunded"):
+            row[f"{status}_amount"] += tip["amount"]
+    return [days[day] for day in sorted(days)]
+
+
+def sum_days(days):
+    """Column totals over daily aggregate rows."""
+    totals = dict.fromkeys(COLUMNS, 0)
+    for row in days:
+        for c in COLUMNS:
+            totals[c] += row[c]
+    return totals
@@ -0,0 +1,234 @@
+"""Statement runs planned from the payout schedule and spread over a window.
+
+auto-payout runs once a day from cron (RUN_TIME, the 02:00 UTC schedule in
+supabase/migrations/20260216100001_setup_cron.sql) and pays every venue
+with auto payouts enabled whose payout_frequency and payout_day fall due
+that day. payout_day defaults to 1, so most weekly venues are paid on
+Monday, and their payouts are all created within the same few minutes.
+Rendering every statement as soon as the payouts land turns that into a
+burst of renders that also competes with on-demand downloads.
+
+forecast() applies auto-payout's due rules to the venues table, to show
+how many payouts each coming run will create. plan_run() turns the
+payouts a run created into a Plan:
+
+- Venues with more employees go first, since more people are waiting for
+  their statements.
+- Each statement is given a start time in [start, start + window].
+  Heavier statements (more tips to lay out) get a proportionally longer
+  share of the window.
+
+execute() submits the plan to a reports.service.StatementService at
+BATCH priority, no faster than a RateLimiter allows. Each statement goes
+with its planned job, so workers do not look the jobs up again. On-demand requests
+to the same service stay ahead of it (see the service's docstring).
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, time as clock_time, timedelta, timezone
+
+from reports.batch import build_jobs, statement_filename
+from reports.bundle import run_jobs
+from reports.palettes import DEFAULT_THEME
+from reports.rollups import sum_days
+from reports.service import BATCH, DEFAULT_RESERVED, StatementService
+from reports.sinks import DirectorySink
+from reports.sources import open_source
+
+# When cron calls auto-payout each day, UTC
+RUN_TIME = clock_time(2, 0)
+# Time for auto-payout and complete-payout to finish before statements start
+DEFAULT_SETTLE = timedelta(minutes=15)
+DEFAULT_WINDOW = timedelta(hours=2)
+# Batch statements started per second, and how many may start back to back
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 4
+
+FORTNIGHT_DAYS = 14
+
+
+# ─── Payout schedule ───
+
+def _js_weekday(day):
+    # auto-payout compares payout_day to getUTCDay(): 0 = Sunday .. 6 = Saturday
+    return (day.weekday() + 1) % 7
+
+
+def is_due(venue, day):
+    """Whether auto-payout's run on day (a date) pays venue, by the same rules it uses."""
+    if not venue.get("auto_payout_enabled"):
+        return False
+    frequency = venue.get("payout_frequency") or "weekly"
+    payout_day = venue.get("payout_day")
+    payout_day = 1 if payout_day is None else int(payout_day)
+    if frequency == "monthly":
+        return day.day == payout_day
+    if _js_weekday(day) != payout_day:
+        return False
+    if frequency == "weekly":
+        return True
+    if frequency != "fortnightly":
+        return False
+    last = venue.get("last_auto_payout_at")
+    if not last:
+        return True
+    run_at = datetime.combine(day, RUN_TIME, timezone.utc)
+    last_at = datetime.fromisoformat(last.replace("Z", "+00:00"))
+    if last_at.tzinfo is None:
+        last_at = last_at.replace(tzinfo=timezone.utc)
+    return (run_at - last_at).days >= FORTNIGHT_DAYS
+
+
+def forecast(source, start_day, days):
+    """(day, venues paid) for days runs from start_day, as auto-payout would pick them.
+
+    Fortnightly venues are assumed to be paid whenever they fall due, so
+    their next run is two weeks after the one before.
+    """
+    venues = [dict(v) for v in source.iter_table("venues") if v.get("auto_payout_enabled")]
+    runs = []
+    for offset in range(days):
+        day = start_day + timedelta(days=offset)
+        due = [v for v in venues if is_due(v, day)]
+        for venue in due:
+            venue["last_auto_payout_at"] = datetime.combine(
+                day, RUN_TIME, timezone.utc,
+            ).isoformat()
+        runs.append((day, due))
+    return runs
+
+
+# ─── Planning ───
+
+def run_start(day, settle=DEFAULT_SETTLE):
+    """When a run's statements start by default: cron time on day plus settle."""
+    return datetime.combine(day, RUN_TIME, timezone.utc) + settle
+
+
+def statement_cost(source, job):
+    """Relative render cost of a statement: its ledger rows plus one per distribution."""
+    payout = job["payout"]
+    totals = sum_days(source.iter_daily(
+        payout["venue_id"], payout["period_start"][:10], payout["period_end"][:10],
+    ))
+    return 1 + totals["succeeded"] + len(job["distributions"])
+
+
+class Plan:
+    """A run's statements as (start time, job, cost), in start order."""
+
+    def __init__(self, day, entries):
+        self.day = day
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+
+def spread(jobs, costs, start, window):
+    """(start time, job, cost) for jobs in order, each starting after the previous
+    ones' share of window, shares proportional to cost."""
+    total = sum(costs) or 1
+    entries = []
+    elapsed = 0
+    for job, cost in zip(jobs, costs):
+        entries.append((start + window * (elapsed / total), job, cost))
+        elapsed += cost
+    return entries
+
+
+def plan_run(source, day, start=None, window=DEFAULT_WINDOW, settle=DEFAULT_SETTLE):
+    """The Plan for the statements of the payouts auto-payout created on day.
+
+    start defaults to run_start(day, settle).
+    """
+    jobs = run_jobs(build_jobs(source), day.isoformat())
+    # Most employees first; ties by venue and period so the order is stable
+    jobs.sort(key=lambda j: (
+        -len(j["distributions"]), j["payout"]["venue_id"], j["payout"]["period_start"],
+    ))
+    costs = [statement_cost(source, job) for job in jobs]
+    return Plan(day, spread(jobs, costs, start or run_start(day, settle), window))
+
+
+# ─── Execution ───
+
+class RateLimiter:
+    """A token bucket: rate starts a second on average, burst of them back to back."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = burst
+        self._updated = clock()
+
+    def delay(self):
+        """Take a token; the seconds to wait before using it (0 if one was free)."""
+        now = self.clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+async def execute(plan, service, out_dir, rate=DEFAULT_RATE, burst=DEFAULT_BURST, now=None):
+    """Render plan's statements through service into out_dir at their planned times.
+
+    Returns (path, status) pairs in plan order. status is "written", or
+    "failed: <error>" for a statement that could not be rendered; one
+    failure does not stop the run. now() is the current UTC datetime;
+    planned times already passed start as soon as the rate allows.
+    """
+    now = now or (lambda: datetime.now(timezone.utc))
+    sink = DirectorySink(out_dir)
+    limiter = RateLimiter(rate, burst)
+
+    async def one(job):
+        payout = job["payout"]
+        name = statement_filename(job)
+        try:
+            data = await service.statement(payout["venue_id"], payout["period_start"], BATCH, job)
+        except Exception as exc:
+            return sink.path(name), f"failed: {exc}"
+        sink.write(name, data)
+        return sink.path(name), "written"
+
+    tasks = []
+    for at, job, _cost in plan:
+        wait = (at - now()).total_seconds()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        wait = limiter.delay()
+        if wait:
+            await asyncio.sleep(wait)
+        tasks.append(asyncio.create_task(one(job)))
+    return list(await asyncio.gather(*tasks))
+
+
+async def run_schedule(source_path, out_dir, day=None, start=None, window=DEFAULT_WINDOW,
+                       rate=DEFAULT_RATE, burst=DEFAULT_BURST, workers=None, cache_dir=None,
+                       theme=DEFAULT_THEME, reserved=DEFAULT_RESERVED):
+    """Plan day's run (default: today, UTC) and render it in a StatementService of its own.
+
+    A web front end that already runs a service should call plan_run()
+    and execute() with that service instead, so its downloads share the
+    workers and get priority over the run.
+    """
+    day = day or datetime.now(timezone.utc).date()
+    source = open_source(source_path)
+    try:
+        plan = plan_run(source, day, start, window)
+    finally:
+        source.close()
+    os.makedirs(out_dir, exist_ok=True)
+    service = StatementService(
+        source_path, workers=workers, cache_dir=cache_dir, theme=theme, reserved=reserved,
+    )
+    async with service:
+        return plan, await execute(plan, service, out_dir, rate, burst)
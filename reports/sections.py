@@ -0,0 +1,262 @@
+"""Named story sections and per-section build instrumentation.
+
+A section is tagged on its first flowable; everything after it belongs to
+that section until the next tagged flowable. Tagging leaves the flowables
+themselves alone, so an instrumented build produces the same PDF bytes.
+
+    story = Story()
+    story.section("1. Executive Summary")
+    story.append(Paragraph(...))
+
+    metrics = BuildMetrics(profile={"Tip Ledger"}, trace_memory=True)
+    metrics.build(doc, story.flowables(), output)
+    print(metrics.report())
+
+BuildMetrics hooks doc.handle_flowable, which the doc template calls once
+per flowable (and once per split part), to charge wall time, pages and
+drawn flowables to the section being laid out. Sections named in profile
+run under their own cProfile.Profile; trace_memory records how far traced
+memory peaked above where it stood when each section started.
+
+A renderer that draws on the canvas itself (reports.fastpath) has no
+flowables to hook. It runs under draw() instead and wraps each of its
+sections in section(), which charges the same wall time, pages,
+profiles and memory peaks.
+"""
+
+import cProfile
+import os
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+SECTION_ATTR = "_tipus_section"
+# Time spent in doc._endBuild(), i.e. serialising the PDF, is charged here
+WRITE_SECTION = "(write)"
+
+
+def section(name, flowable):
+    """Tag flowable as the first of section name and return it."""
+    setattr(flowable, SECTION_ATTR, name)
+    return flowable
+
+
+class Story:
+    """A story kept as named sections instead of one flat list."""
+
+    def __init__(self):
+        self.sections = []
+
+    def section(self, name):
+        """Start a new section; later appends go into it."""
+        self.sections.append((name, []))
+
+    def append(self, flowable):
+        if not self.sections:
+            self.section("Untitled")
+        self.sections[-1][1].append(flowable)
+
+    def flowables(self):
+        """The flat story for doc.build(), with each section's first flowable tagged."""
+        story = []
+        for name, flowables in self.sections:
+            if flowables:
+                story.append(section(name, flowables[0]))
+                story.extend(flowables[1:])
+        return story
+
+
+def profile_filename(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") + ".prof"
+
+
+class BuildMetrics:
+    """Per-section timings, pages and flowable counts for one doc.build().
+
+    profile is a set of section names to run under cProfile, or True for
+    all of them; the stats are kept in self.profiles and written out by
+    dump_profiles().
+    """
+
+    def __init__(self, profile=(), trace_memory=False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.sections = {}
+        self.profiles = {}
+        self.pages = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        # "platypus" or "fastpath", whichever drew the document
+        self.renderer = None
+        self._current = None
+        self._profiler = None
+        self._memory_start = 0
+
+    def _entry(self, name):
+        entry = self.sections.get(name)
+        if entry is None:
+            entry = self.sections[name] = {
+                "flowables": 0, "seconds": 0.0, "first_page": None, "last_page": None,
+            }
+            if self.trace_memory:
+                entry["peak_memory"] = 0
+        return entry
+
+    def _enter(self, name):
+        if name == self._current:
+            return
+        self._leave()
+        self._current = name
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+        if self.profile is True or name in self.profile:
+            self._profiler = self.profiles.get(name) or cProfile.Profile()
+            self.profiles[name] = self._profiler
+            self._profiler.enable()
+
+    def _leave(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler = None
+        if self.trace_memory and self._current is not None:
+            entry = self._entry(self._current)
+            peak = tracemalloc.get_traced_memory()[1] - self._memory_start
+            entry["peak_memory"] = max(entry["peak_memory"], peak)
+
+    def _charge(self, name, seconds, page, drawn):
+        entry = self._entry(name)
+        entry["seconds"] += seconds
+        entry["flowables"] += drawn
+        if drawn:
+            if entry["first_page"] is None:
+                entry["first_page"] = page
+            entry["last_page"] = page
+
+    def build(self, doc, flowables, output=None):
+        """doc.build(flowables) with instrumentation; output is what doc writes to.
+
+        output (a path or a file object) is only used to measure bytes written.
+        """
+        handle_flowable = doc.handle_flowable
+        after_flowable = doc.afterFlowable
+        drawn = [0]
+
+        def after(flowable):
+            drawn[0] += 1
+            after_flowable(flowable)
+
+        def handle(queue):
+            name = getattr(queue[0], SECTION_ATTR, None)
+            if name is not None:
+                self._enter(name)
+            elif self._current is None:
+                if queue is doc._hanging:
+                    # The first page's PageBegin, before any story flowable
+                    return handle_flowable(queue)
+                self._enter("Untitled")
+            drawn[0] = 0
+            t0 = time.perf_counter()
+            handle_flowable(queue)
+            self._charge(self._current, time.perf_counter() - t0, doc.page, drawn[0])
+
+        end_build = doc._endBuild
+
+        def end():
+            self._enter(WRITE_SECTION)
+            t0 = time.perf_counter()
+            end_build()
+            self._charge(WRITE_SECTION, time.perf_counter() - t0, doc.page, 0)
+
+        doc.handle_flowable = handle
+        doc.afterFlowable = after
+        doc._endBuild = end
+        try:
+            self._run(doc.build, flowables)
+        finally:
+            del doc.handle_flowable, doc.afterFlowable, doc._endBuild
+        self.renderer = "platypus"
+        return self._finish(doc.page, output)
+
+    def draw(self, render, *args, output=None):
+        """render(*args, metrics=self) with instrumentation, for a renderer without flowables.
+
+        render charges its sections with section() and returns the number
+        of pages it drew. output is as for build().
+        """
+        pages = self._run(render, *args, metrics=self)
+        self.renderer = "fastpath"
+        return self._finish(pages, output)
+
+    @contextmanager
+    def section(self, name, page):
+        """Charge the with block to section name; page() is the page being drawn."""
+        self._enter(name)
+        entry = self._entry(name)
+        if entry["first_page"] is None:
+            entry["first_page"] = page()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry["seconds"] += time.perf_counter() - t0
+            entry["last_page"] = page()
+
+    def _run(self, build, *args, **kwargs):
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            return build(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - t0
+            self._leave()
+            self._current = None
+            if started_tracing:
+                tracemalloc.stop()
+
+    def _finish(self, pages, output):
+        self.pages = pages
+        if isinstance(output, (str, os.PathLike)):
+            self.bytes = os.path.getsize(output)
+        elif output is not None and hasattr(output, "tell"):
+            self.bytes = output.tell()
+        return self
+
+    def as_dict(self):
+        sections = []
+        for name, entry in self.sections.items():
+            item = {"name": name, **entry, "seconds": round(entry["seconds"], 6)}
+            item["pages"] = (
+                entry["last_page"] - entry["first_page"] + 1 if entry["first_page"] else 0
+            )
+            sections.append(item)
+        return {
+            "renderer": self.renderer,
+            "pages": self.pages,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 6),
+            "sections": sections,
+        }
+
+    def report(self):
+        lines = [f"{'section':<40} {'flowables':>9} {'pages':>5} {'seconds':>8}"]
+        for item in self.as_dict()["sections"]:
+            lines.append(
+                f"{item['name'][:40]:<40} {item['flowables']:>9} {item['pages']:>5} "
+                f"{item['seconds']:>8.3f}"
+                + (f" {item['peak_memory'] / 1e6:>8.1f} MB" if "peak_memory" in item else "")
+            )
+        lines.append(f"{self.pages} pages, {self.bytes:,} bytes in {self.seconds:.3f}s")
+        return "\n".join(lines)
+
+    def dump_profiles(self, directory="."):
+        """Write each profiled section's stats to <directory>/<section-slug>.prof."""
+        paths = []
+        for name, profiler in self.profiles.items():
+            path = os.path.join(directory, profile_filename(name))
+            profiler.dump_stats(path)
+            paths.append(path)
+        return paths
@@ -0,0 +1,253 @@
+"""Asyncio front end for on-demand statement downloads.
+
+    async with StatementService("tipus.db", workers=4) as service:
+        pdf = await service.statement(venue_id, "2026-02-09")
+        service.metrics()
+
+Identical requests (same venue and period) that arrive while one is being
+rendered share its result instead of rendering again, which is what the
+burst of clicks after a payout notification looks like. Distinct requests
+go through a bounded queue to a process pool sized to the CPU; when the
+queue is full a request waits up to enqueue_timeout for space and then
+fails with ServiceBusy, which a web handler can turn into a 503.
+
+Scheduled batch work (reports.scheduler) goes through the same service at
+BATCH priority. The queue serves INTERACTIVE requests first, and a click
+on a statement still queued as batch work moves it up. Batch renders
+never occupy more than workers - reserved workers, so a download during a
+payout-run surge waits for a free worker, not for the whole run. The
+scheduler hands over the jobs it planned with, so workers render them
+as they are instead of looking each one up again.
+"""
+
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+
+from reports.batch import find_job, statement_filename, statement_key
+from reports.cache import BuildCache
+from reports.charts import statement_series
+from reports.palettes import DEFAULT_THEME
+from reports.sinks import MemorySink
+from reports.sources import period_bounds, shared_source
+from reports.statements import build_statement
+from reports.workers import warm_pool
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_RESERVED = 1
+LATENCY_WINDOW = 1024
+# Queue priorities; lower is served first
+INTERACTIVE, BATCH = 0, 1
+
+
+class ServiceBusy(Exception):
+    """The render queue stayed full for longer than enqueue_timeout."""
+
+
+def render_statement(source_path, venue_id, period_start, theme=DEFAULT_THEME, cache_dir=None,
+                     job=None):
+    """PDF bytes of one statement; runs in a pool worker.
+
+    job is the statement's job when the caller already built it; else it
+    is looked up.
+    """
+    source = shared_source(source_path)
+    if job is None:
+        job = find_job(source, venue_id, period_start)
+    return statement_pdf(source, job, theme, cache_dir)
+
+
+def statement_pdf(source, job, theme=DEFAULT_THEME, cache_dir=None):
+    """PDF bytes of job's statement, from the build cache under cache_dir when it has them."""
+    cache = BuildCache(cache_dir) if cache_dir else None
+    if cache:
+        key = statement_key(job, source, theme)
+        data = cache.load(key)
+        if data is not None:
+            return data
+
+    start, end = period_bounds(job["payout"])
+    sink = MemorySink()
+    with sink.open(statement_filename(job)) as f:
+        build_statement(
+            job, f, source.iter_tips(job["payout"]["venue_id"], start, end), theme,
+            series=statement_series(source, job),
+        )
+    data = sink.getvalue()
+    if cache:
+        cache.store(key, data)
+    return data
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StatementService:
+    """Coalescing, backpressured statement renderer; use as an async context manager.
+
+    workers defaults to the number of cores. cache_dir enables the build
+    cache, so a statement requested again after its render finished is
+    served from disk instead of being laid out again. reserved workers are
+    kept free of BATCH renders when there are more workers than that.
+    """
+
+    def __init__(self, source_path, workers=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 enqueue_timeout=0.0, cache_dir=None, theme=DEFAULT_THEME,
+                 reserved=DEFAULT_RESERVED):
+        self.source_path = source_path
+        self.workers = workers
+        self.queue_size = queue_size
+        self.enqueue_timeout = enqueue_timeout
+        self.cache_dir = cache_dir
+        self.theme = theme
+        self.reserved = reserved
+        self._pool = None
+        self._queue = None
+        self._batch_slots = None
+        self._consumers = []
+        self._inflight = {}
+        # key -> (priority, queued_at) of requests queued and not yet started
+        self._waiting = {}
+        # key -> job handed in by the caller, for requests not yet started
+        self._jobs = {}
+        self._order = itertools.count()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._counts = {
+            "requests": 0, "batch": 0, "coalesced": 0, "promoted": 0, "rendered": 0,
+            "failed": 0, "rejected": 0,
+        }
+
+    async def __aenter__(self):
+        workers = self.workers or os.cpu_count() or 1
+        # Started and warmed before the first request, so no click pays the cold start
+        self._pool = await asyncio.get_running_loop().run_in_executor(
+            None, warm_pool, workers, (self.theme,),
+        )
+        self._queue = asyncio.PriorityQueue(maxsize=self.queue_size)
+        self._batch_slots = asyncio.Semaphore(max(1, workers - self.reserved))
+        # One consumer per worker process keeps exactly that many renders running
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(workers)]
+        return self
+
+    async def __aexit__(self, *exc):
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        for future in self._inflight.values():
+            future.cancel()
+        self._inflight.clear()
+        self._pool.shutdown(cancel_futures=True)
+
+    async def statement(self, venue_id, period_start, priority=INTERACTIVE, job=None):
+        """PDF bytes for venue_id's payout starting period_start (YYYY-MM-DD).
+
+        Pass the statement's job (reports.batch) if it is already built, as
+        a planned run's are, to spare the worker the lookup.
+        """
+        self._counts["requests"] += 1
+        key = (venue_id, period_start[:10])
+        if priority == BATCH:
+            self._counts["batch"] += 1
+            async with self._batch_slots:
+                return await self._request(key, priority, job)
+        return await self._request(key, priority, job)
+
+    async def _request(self, key, priority, job=None):
+        future = self._inflight.get(key)
+        if future is not None:
+            self._counts["coalesced"] += 1
+            waiting = self._waiting.get(key)
+            if waiting is not None and priority < waiting[0]:
+                # Queue it again at the higher priority; the consumer skips the stale entry
+                try:
+                    self._queue.put_nowait((priority, next(self._order), key))
+                except asyncio.QueueFull:
+                    pass
+                else:
+                    self._waiting[key] = (priority, waiting[1])
+                    self._counts["promoted"] += 1
+            # shield: one caller giving up must not cancel the others' render
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._waiting[key] = (priority, time.perf_counter())
+        if job is not None:
+            self._jobs[key] = job
+        item = (priority, next(self._order), key)
+        try:
+            if self.enqueue_timeout:
+                await asyncio.wait_for(self._queue.put(item), self.enqueue_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self._forget(key, future)
+            self._counts["rejected"] += 1
+            raise ServiceBusy(f"render queue full ({self.queue_size} waiting)") from None
+        except asyncio.CancelledError:
+            # Cancelled while waiting for space: never queued, so nothing would resolve it
+            self._forget(key, future)
+            raise
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        """Drop a request that never reached the queue, failing any callers coalesced onto it."""
+        del self._inflight[key]
+        del self._waiting[key]
+        self._jobs.pop(key, None)
+        future.cancel()
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            _priority, _order, key = await self._queue.get()
+            waiting = self._waiting.pop(key, None)
+            future = self._inflight.get(key)
+            if waiting is None or future is None:
+                # A promoted request's earlier entry, or one whose render already ran
+                self._queue.task_done()
+                continue
+            queued_at = waiting[1]
+            try:
+                data = await loop.run_in_executor(
+                    self._pool, render_statement, self.source_path, *key,
+                    self.theme, self.cache_dir, self._jobs.pop(key, None),
+                )
+            except Exception as exc:
+                self._counts["failed"] += 1
+                if not future.done():
+                    future.set_exception(exc)
+                    # Retrieve it here so an error nobody waited for isn't logged as unhandled
+                    future.exception()
+            else:
+                self._counts["rendered"] += 1
+                if not future.done():
+                    future.set_result(data)
+            finally:
+                self._inflight.pop(key, None)
+                self._latencies.append(time.perf_counter() - queued_at)
+                self._queue.task_done()
+
+    def metrics(self):
+        """Queue depth, requests queued or rendering, counters and latency percentiles.
+
+        Latency is from enqueue to result, in seconds, over the last
+        LATENCY_WINDOW renders.
+        """
+        latencies = list(self._latencies)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "in_flight": len(self._inflight),
+            "waiting_batch": sum(1 for p, _t in self._waiting.values() if p == BATCH),
+            **self._counts,
+            "latency_p50": _percentile(latencies, 0.50),
+            "latency_p95": _percentile(latencies, 0.95),
+            "latency_max": max(latencies) if latencies else None,
+        }
@@ -0,0 +1,165 @@
+"""Where finished PDFs go: memory, an open stream, or a directory.
+
+Every sink has open(name), a context manager yielding a binary file object
+that doc.build() can write into directly, and write(name, data) for bytes
+already in hand (e.g. from the build cache). Output is only published if
+the block finishes without raising.
+
+    sink = MemorySink()                  # serve over HTTP, no temp file
+    with sink.open(statement_filename(job)) as f:
+        build_statement(job, f, tips)
+    body = sink.getvalue()
+
+    sink = StreamSink(handler.wfile)     # write straight into a response
+
+    sink = DirectorySink("statements")   # <dir>/<name>, atomic rename
+"""
+
+import io
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+# A temp file untouched this long is from a killed build, not one in progress
+STALE_TEMP_AGE = 3600
+
+
+def _file_mode():
+    # The umask can only be read by setting it, so read it once, at import
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# What open(path, "wb") would have created; mkstemp() makes its files 0600
+FILE_MODE = _file_mode()
+
+
+class Sink:
+    def open(self, name):
+        raise NotImplementedError
+
+    def write(self, name, data):
+        with self.open(name) as f:
+            f.write(data)
+
+    def location(self, name):
+        return name
+
+
+class MemorySink(Sink):
+    """Keeps each finished PDF in self.files as bytes."""
+
+    def __init__(self):
+        self.files = {}
+
+    @contextmanager
+    def open(self, name):
+        buf = io.BytesIO()
+        yield buf
+        self.files[name] = buf.getvalue()
+
+    def getvalue(self, name=None):
+        """The bytes written under name, or of the only file written."""
+        if name is None:
+            (data,) = self.files.values()
+            return data
+        return self.files[name]
+
+    def location(self, name):
+        return f"<memory:{name}>"
+
+
+class StreamSink(Sink):
+    """Writes every PDF into one caller-owned binary stream, e.g. an HTTP response body.
+
+    The stream is never closed, and a failed build may leave partial output
+    in it; buffer through a MemorySink if the response status depends on it.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_written = 0
+
+    @contextmanager
+    def open(self, name):
+        counter = _Counter(self.stream)
+        yield counter
+        self.bytes_written += counter.count
+        if hasattr(self.stream, "flush"):
+            self.stream.flush()
+
+    def location(self, name):
+        return getattr(self.stream, "name", None) or f"<stream:{name}>"
+
+
+class _Counter:
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, data):
+        self.count += len(data)
+        return self.stream.write(data)
+
+    def tell(self):
+        return self.count
+
+
+class DirectorySink(Sink):
+    """Writes <directory>/<name> through a temp file and os.replace().
+
+    Readers never see a half-written PDF, and a failed build leaves any
+    previous file in place.
+    """
+
+    def __init__(self, directory="."):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def open(self, name):
+        path = self.path(name)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{name}.", suffix=".tmp")
+        try:
+            os.fchmod(fd, FILE_MODE)
+            with os.fdopen(fd, "wb") as f:
+                yield f
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def location(self, name):
+        return self.path(name)
+
+    def remove_stale(self, max_age=STALE_TEMP_AGE):
+        """Delete temp files older than max_age seconds, left by builds that were killed.
+
+        Younger ones may belong to a build still running in another process.
+        Returns how many were removed.
+        """
+        cutoff = time.time() - max_age
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(".") and entry.name.endswith(".tmp") and entry.is_file():
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+def sink_for(path):
+    """(DirectorySink, name) for an output file path."""
+    directory, name = os.path.split(path)
+    return DirectorySink(directory or "."), name
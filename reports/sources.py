@@ -0,0 +1,309 @@
+"""Row sources for report data: a JSON table export or a SQLite stand-in for Supabase.
+
+Both sources hand rows out through generators so callers never need the whole
+table in memory. The SQLite source reads from its cursor with fetchmany().
+"""
+
+import json
+import sqlite3
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from reports import rollups
+
+CHUNK_SIZE = 1000
+
+# Local stand-in for the Supabase tables the reports read. Column names match
+# supabase/migrations; timestamps are ISO-8601 text so they sort lexically.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS venues (
+  id TEXT PRIMARY KEY,
+  owner_id TEXT,
+  name TEXT NOT NULL,
+  slug TEXT,
+  logo_url TEXT,
+  auto_payout_enabled INTEGER DEFAULT 0,
+  payout_frequency TEXT DEFAULT 'weekly',
+  payout_day INTEGER DEFAULT 1,
+  last_auto_payout_at TEXT,
+  created_at TEXT,
+  updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS employees (
+  id TEXT PRIMARY KEY,
+  venue_id TEXT NOT NULL,
+  user_id TEXT,
+  name TEXT NOT NULL,
+  email TEXT,
+  status TEXT DEFAULT 'invited',
+  is_active INTEGER DEFAULT 0,
+  activated_at TEXT,
+  deactivated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_employees_venue_id ON employees(venue_id);
+CREATE TABLE IF NOT EXISTS tips (
+  id TEXT PRIMARY KEY,
+  venue_id TEXT NOT NULL,
+  employee_id TEXT,
+  amount INTEGER NOT NULL,
+  currency TEXT DEFAULT 'aud',
+  tipper_name TEXT,
+  status TEXT DEFAULT 'pending',
+  created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tips_venue_created ON tips(venue_id, created_at);
+CREATE TABLE IF NOT EXISTS payouts (
+  id TEXT PRIMARY KEY,
+  venue_id TEXT NOT NULL,
+  period_start TEXT NOT NULL,
+  period_end TEXT NOT NULL,
+  total_amount INTEGER NOT NULL DEFAULT 0,
+  platform_fee INTEGER NOT NULL DEFAULT 0,
+  net_amount INTEGER NOT NULL DEFAULT 0,
+  status TEXT DEFAULT 'pending',
+  processed_at TEXT,
+  created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_payouts_venue_id ON payouts(venue_id);
+CREATE TABLE IF NOT EXISTS payout_distributions (
+  id TEXT PRIMARY KEY,
+  payout_id TEXT NOT NULL,
+  employee_id TEXT NOT NULL,
+  amount INTEGER NOT NULL DEFAULT 0,
+  days_active INTEGER NOT NULL,
+  total_period_days INTEGER NOT NULL,
+  is_prorated INTEGER DEFAULT 0,
+  status TEXT NOT NULL DEFAULT 'pending',
+  stripe_transfer_id TEXT,
+  error_message TEXT,
+  created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_payout_dist_payout ON payout_distributions(payout_id);
+CREATE TABLE IF NOT EXISTS notifications (
+  id TEXT PRIMARY KEY,
+  user_id TEXT,
+  type TEXT NOT NULL,
+  title TEXT,
+  body TEXT,
+  metadata TEXT NOT NULL DEFAULT '{}',
+  is_read INTEGER DEFAULT 0,
+  created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_created_at ON notifications(created_at);
+"""
+
+TABLES = ("venues", "employees", "tips", "payouts", "payout_distributions", "notifications")
+
+
+def epoch_seconds(ts):
+    dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def period_bounds(payout):
+    # Same window process-payout uses: period_end is inclusive to the last ms
+    return payout["period_start"], f"{payout['period_end'][:10]}T23:59:59.999Z"
+
+
+class JsonSource:
+    """Rows from a JSON export: {"venues": [...], "payouts": [...], ...}."""
+
+    def __init__(self, path):
+        with open(path, encoding="utf-8") as f:
+            self._tables = json.load(f)
+
+    def iter_table(self, name):
+        yield from self._tables.get(name, [])
+
+    def iter_rows(self, name, column, value):
+        return (row for row in self._tables.get(name, []) if row.get(column) == value)
+
+    def iter_tips(self, venue_id, start, end, status="succeeded"):
+        tips = [
+            t for t in self._tables.get("tips", [])
+            if t["venue_id"] == venue_id and t.get("status") == status
+            and start <= t["created_at"] <= end
+        ]
+        tips.sort(key=lambda t: (t["created_at"], t["id"]))
+        yield from tips
+
+    def iter_tip_points(self, venue_id, start, end, status="succeeded"):
+        for tip in self.iter_tips(venue_id, start, end, status):
+            yield epoch_seconds(tip["created_at"]), tip["amount"]
+
+    def iter_tip_amounts(self, start, end, status="succeeded"):
+        for t in self._tables.get("tips", []):
+            if t.get("status") == status and start <= t["created_at"] <= end:
+                yield t["venue_id"], t["created_at"], t["amount"]
+
+    def iter_tips_by_id(self, ids):
+        ids = set(ids)
+        return (t for t in self._tables.get("tips", []) if t["id"] in ids)
+
+    def iter_open_payout_ids(self, since):
+        for p in self._tables.get("payouts", []):
+            if p.get("status") != "completed" or p["period_end"][:10] >= since:
+                yield p["id"]
+
+    def iter_notifications(self, since="", types=None):
+        rows = [
+            n for n in self._tables.get("notifications", [])
+            if n["created_at"] >= since and (types is None or n["type"] in types)
+        ]
+        rows.sort(key=lambda n: (n["created_at"], n["id"]))
+        for n in rows:
+            metadata = n.get("metadata") or {}
+            yield {**n, "metadata": json.loads(metadata) if isinstance(metadata, str) else metadata}
+
+    def iter_daily(self, venue_id, start_day, end_day):
+        # An export is a snapshot with no rollup store; aggregate its tips directly
+        end = f"{end_day}T23:59:59.999Z"
+        yield from rollups.daily_from_tips(
+            t for t in self._tables.get("tips", [])
+            if t["venue_id"] == venue_id and start_day <= t["created_at"] <= end
+        )
+
+    def close(self):
+        pass
+
+
+class SQLiteSource:
+    """Rows streamed from a SQLite database laid out like SCHEMA."""
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+
+    def _stream(self, sql, params=()):
+        cursor = self.conn.execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(row)
+        finally:
+            cursor.close()
+
+    def iter_table(self, name):
+        if name not in TABLES:
+            raise ValueError(f"Unknown table: {name}")
+        return self._stream(f"SELECT * FROM {name}")
+
+    def iter_rows(self, name, column, value):
+        """Rows of table name whose column equals value, e.g. one venue's payouts."""
+        if name not in TABLES:
+            raise ValueError(f"Unknown table: {name}")
+        if not column.isidentifier():
+            raise ValueError(f"Bad column name: {column}")
+        return self._stream(f"SELECT * FROM {name} WHERE {column} = ?", (value,))
+
+    def iter_tips(self, venue_id, start, end, status="succeeded"):
+        return self._stream(
+            "SELECT * FROM tips WHERE venue_id = ? AND status = ? "
+            "AND created_at >= ? AND created_at <= ? ORDER BY created_at, id",
+            (venue_id, status, start, end),
+        )
+
+    def iter_tip_points(self, venue_id, start, end, status="succeeded"):
+        """(epoch seconds, amount) per tip in created_at order, as plain tuples for charting."""
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            "SELECT CAST(strftime('%s', created_at) AS INTEGER), amount FROM tips "
+            "WHERE venue_id = ? AND status = ? AND created_at >= ? AND created_at <= ? "
+            "ORDER BY created_at, id",
+            (venue_id, status, start, end),
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def iter_tip_amounts(self, start, end, status="succeeded"):
+        """(venue_id, created_at, amount) of every venue's tips in [start, end], unordered."""
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            "SELECT venue_id, created_at, amount FROM tips "
+            "WHERE status = ? AND created_at >= ? AND created_at <= ?",
+            (status, start, end),
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def iter_tips_by_id(self, ids):
+        ids = list(ids)
+        # Bounded IN lists stay under SQLite's host parameter limit
+        for i in range(0, len(ids), self.chunk_size):
+            chunk = ids[i:i + self.chunk_size]
+            yield from self._stream(
+                f"SELECT * FROM tips WHERE id IN ({', '.join('?' * len(chunk))})", chunk,
+            )
+
+    def iter_open_payout_ids(self, since):
+        """Ids of the payouts not completed or whose period ended on or after since, a date."""
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            "SELECT id FROM payouts WHERE status IS NOT 'completed' "
+            "OR substr(period_end, 1, 10) >= ?",
+            (since,),
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    return
+                for (payout_id,) in rows:
+                    yield payout_id
+        finally:
+            cursor.close()
+
+    def iter_notifications(self, since="", types=None):
+        """notifications rows created at or after since, oldest first, with metadata decoded."""
+        sql = "SELECT * FROM notifications WHERE created_at >= ?"
+        params = [since]
+        if types is not None:
+            sql += f" AND type IN ({', '.join('?' * len(types))})"
+            params.extend(types)
+        for row in self._stream(sql + " ORDER BY created_at, id", params):
+            row["metadata"] = json.loads(row["metadata"] or "{}")
+            yield row
+
+    def iter_daily(self, venue_id, start_day, end_day):
+        """Per-day tip aggregates from the rollup store (see reports.rollups)."""
+        return rollups.iter_daily(self.conn, venue_id, start_day, end_day)
+
+    def close(self):
+        self.conn.close()
+
+
+def open_source(path):
+    if path.endswith(".json"):
+        return JsonSource(path)
+    return SQLiteSource(path)
+
+
+@lru_cache(maxsize=None)
+def shared_source(path):
+    """One open source per process, so pool workers reuse their connection."""
+    return open_source(path)
+
+
+def create_schema(conn):
+    conn.executescript(SCHEMA)
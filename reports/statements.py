@@ -0,0 +1,229 @@
+"""Per-venue payout statement PDFs built from payouts + payout_distributions."""
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm, cm
+from reportlab.platypus import (
+    SimpleDocTemplate, Flowable, KeepTogether, Paragraph, Spacer, Table, HRFlowable,
+)
+
+from reports import assets, fastpath
+from reports.charts import shares_chart, tips_chart
+from reports.ledger import LedgerTable
+from reports.payouts import PLATFORM_FEE_RATE
+from reports.sections import section
+from reports.story import Deferred, StreamingStory
+from reports.theme import DEFAULT_THEME, get_theme
+
+# Bump whenever the statement layout or table styling changes, so cached
+# statements built from the old template are not reused.
+TEMPLATE_VERSION = "7"
+
+LEDGER_COLUMNS = [("Date", 0.20), ("Employee", 0.30), ("Tipper", 0.32), ("Amount", 0.18)]
+
+PAGE_SETUP = {
+    "pagesize": A4,
+    "topMargin": 2 * cm,
+    "bottomMargin": 2 * cm,
+    "leftMargin": 2.5 * cm,
+    "rightMargin": 2.5 * cm,
+}
+
+
+def format_cents(cents):
+    """Format an integer amount in cents as dollars, e.g. 12345 -> $123.45."""
+    sign = "-" if cents < 0 else ""
+    return f"{sign}${abs(cents) // 100:,}.{abs(cents) % 100:02d}"
+
+
+def format_period(payout):
+    return f"{payout['period_start'][:10]} to {payout['period_end'][:10]}"
+
+
+def style_digest(theme=DEFAULT_THEME):
+    return get_theme(theme).fingerprint("statement.")
+
+
+class Logo(Flowable):
+    """A venue logo drawn in the top margin of the page; it takes no room in the frame.
+
+    Yield it first on a page, ahead of the title.
+    """
+
+    _ZEROSIZE = 1
+
+    def __init__(self, path, page_setup=PAGE_SETUP):
+        super().__init__()
+        self.path = path
+        self.page_setup = page_setup
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        assets.draw_logo(canvas, self.path, self.page_setup)
+
+
+def ledger_rows(tips, employee_names, totals):
+    """Format tips rows as ledger tuples, filling in totals as they go past.
+
+    totals lets the caller print a closing line without a second pass over
+    the tips.
+    """
+    for tip in tips:
+        totals["count"] += 1
+        totals["amount"] += tip["amount"]
+        yield (
+            tip["created_at"][:16].replace("T", " "),
+            employee_names.get(tip.get("employee_id"), "Venue pool"),
+            tip.get("tipper_name") or "Anonymous",
+            format_cents(tip["amount"]),
+        )
+
+
+def iter_story(job, width, tips=(), theme=DEFAULT_THEME, series=None):
+    """Yield the statement flowables in order; tips may be a lazy row stream.
+
+    series is the period's reports.charts.TipSeries, charted above the ledger.
+    The venue's logo (reports.assets) heads the first page when it has one.
+    """
+    t = get_theme(theme)
+    styles = t.styles("statement")
+    title_style = styles["title"]
+    subtitle_style = styles["subtitle"]
+    heading_style = styles["heading"]
+    body_style = styles["body"]
+    footer_style = styles["footer"]
+    payout = job["payout"]
+    venue = job["venue"]
+    venue_name = t.fonts.markup(venue.get("name") or "Venue")
+    distributions = job["distributions"]
+    logo = assets.logo_path(venue)
+
+    # ─── HEADER ───
+    title = Paragraph(venue_name, title_style)
+    if logo:
+        yield section("Header", Logo(logo))
+        yield title
+    else:
+        yield section("Header", title)
+    yield Paragraph(f"Payout Statement  |  {format_period(payout)}", subtitle_style)
+    yield HRFlowable(width=width, thickness=2, color=t.primary, spaceAfter=4 * mm)
+
+    # ─── SUMMARY ───
+    yield section("Summary", Paragraph("Summary", heading_style))
+    summary_data = [
+        ["Payout ID", payout["id"]],
+        ["Status", (payout.get("status") or "pending").replace("_", " ").title()],
+        ["Total Tips", format_cents(payout["total_amount"])],
+        [f"Platform Fee ({PLATFORM_FEE_RATE:.0%})", format_cents(payout["platform_fee"])],
+        ["Net Distributed", format_cents(payout["net_amount"])],
+    ]
+    issues = job.get("reconciliation")
+    if issues is not None:
+        summary_data.append(
+            ["Reconciliation", "Discrepancies found" if issues else "Fee and shares verified"]
+        )
+    summary_table = Table(summary_data, colWidths=[width * 0.35, width * 0.65])
+    summary_table.setStyle(t.table_style("statement.summary"))
+    yield summary_table
+    for issue in issues or ():
+        yield Paragraph(t.fonts.fallback(
+            f'<font color="{t.warning.hexval()}"><b>&#9679;</b></font>  {issue}'
+        ), body_style)
+
+    # ─── DISTRIBUTIONS ───
+    yield section("Employee Distributions", Paragraph("Employee Distributions", heading_style))
+    if not distributions:
+        yield Paragraph("No distributions recorded for this payout.", body_style)
+    else:
+        dist_data = [["Employee", "Days Active", "Status", "Amount"]]
+        for dist in distributions:
+            days = f"{dist['days_active']} / {dist['total_period_days']}"
+            if dist.get("is_prorated"):
+                days += " (prorated)"
+            dist_data.append([
+                t.fonts.cell(dist.get("employee_name") or dist["employee_id"], styles["cell"]),
+                days,
+                (dist.get("status") or "pending").title(),
+                format_cents(dist["amount"]),
+            ])
+        dist_data.append(["", "", "Total", format_cents(sum(d["amount"] for d in distributions))])
+        dist_table = Table(
+            dist_data,
+            colWidths=[width * 0.40, width * 0.25, width * 0.15, width * 0.20],
+            repeatRows=1,
+        )
+        dist_table.setStyle(t.table_style("statement.distributions"))
+        yield dist_table
+
+    # ─── CHARTS ───
+    if series is not None or distributions:
+        # Tag the heading, not the drawings: those are cached and shared between documents
+        yield section("Charts", Paragraph("Charts", heading_style))
+        # Each caption moves to the next page with its chart rather than stay behind alone
+        if series is not None:
+            yield KeepTogether([
+                Paragraph("Tips over the period", body_style), tips_chart(series, width, theme),
+            ])
+        if distributions:
+            yield Spacer(1, 4 * mm)
+            yield KeepTogether([
+                Paragraph("Share of net distributed", body_style),
+                shares_chart(payout["id"], distributions, width, theme),
+            ])
+
+    # ─── TIP LEDGER ───
+    yield section("Tip Ledger", Paragraph("Tip Ledger", heading_style))
+    totals = {"count": 0, "amount": 0}
+    rows = ledger_rows(tips, job.get("employee_names", {}), totals)
+    yield LedgerTable(rows, LEDGER_COLUMNS, width, t.table_style("statement.ledger"), fonts=t.fonts)
+
+    def ledger_total():
+        if not totals["count"]:
+            return Paragraph("No succeeded tips recorded in this period.", body_style)
+        return Paragraph(
+            f"<b>{totals['count']:,}</b> tips totalling <b>{format_cents(totals['amount'])}</b>",
+            body_style,
+        )
+
+    yield Deferred(ledger_total)
+
+    # ─── FOOTER ───
+    yield section("Footer", Spacer(1, 10 * mm))
+    yield HRFlowable(width=width, thickness=0.5, color=t.border, spaceAfter=3 * mm)
+    yield Paragraph(
+        f"TipUs  |  {venue_name}  |  Payout Statement  |  Confidential",
+        footer_style,
+    )
+
+
+def statement_doc(job, output):
+    """The doc template for a statement; output is a path or a binary file object."""
+    # invariant=1 drops the timestamp and random document ID so that the same
+    # job always produces the same bytes, no matter which process renders it.
+    return SimpleDocTemplate(
+        output,
+        **PAGE_SETUP,
+        title=f"Payout Statement {job['payout']['id']}",
+        author="TipUs",
+        invariant=1,
+    )
+
+
+def build_statement(job, output, tips=(), theme=DEFAULT_THEME, metrics=None, series=None):
+    """Render one statement into output, a path or a binary file (e.g. from a sink's open()).
+
+    Pass a reports.sections.BuildMetrics to instrument the build, and the
+    period's TipSeries (reports.charts.statement_series) to chart its tips.
+    Statements reports.fastpath can lay out are drawn on the canvas
+    directly, instrumented or not; metrics.renderer says which drew it.
+    """
+    if fastpath.simple(job, theme):
+        return fastpath.draw_statement(job, output, tips, theme, series, metrics)
+    doc = statement_doc(job, output)
+    story = StreamingStory(iter_story(job, doc.width, tips, theme, series))
+    if metrics is None:
+        doc.build(story)
+    else:
+        metrics.build(doc, story, output)
+    return output
@@ -0,0 +1,66 @@
+"""Lazily-filled platypus stories for documents too large to hold in memory."""
+
+from reportlab.platypus import Flowable
+
+
+class StreamingStory(list):
+    """A story list that pulls flowables from an iterator as doc.build consumes them.
+
+    BaseDocTemplate.build() only ever looks at the front of the list, so keeping a
+    small lookahead buffer filled is enough; everything already laid out is
+    dropped by build() itself.
+    """
+
+    def __init__(self, flowables, lookahead=8):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __bool__(self):
+        return len(self) > 0
+
+
+class Deferred(Flowable):
+    """Builds its flowable only when layout reaches it.
+
+    Use it for content that depends on a stream earlier in the story, e.g. a
+    total printed after a ledger; StreamingStory's lookahead would otherwise
+    build it before the stream has been read.
+    """
+
+    def __init__(self, factory):
+        super().__init__()
+        self._factory = factory
+        self._flowable = None
+
+    def _resolve(self):
+        if self._flowable is None:
+            self._flowable = self._factory()
+        return self._flowable
+
+    def getSpaceBefore(self):
+        return self._resolve().getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self._resolve().getSpaceAfter()
+
+    def wrap(self, availWidth, availHeight):
+        self.width, self.height = self._resolve().wrap(availWidth, availHeight)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        return self._resolve().split(availWidth, availHeight)
+
+    def draw(self):
+        self._flowable.drawOn(self.canv, 0, 0)
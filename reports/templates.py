@@ -0,0 +1,342 @@
+"""Declarative document templates compiled once into cached render plans.
+
+A Template is plain data: page setup plus a list of nodes, each a tuple of
+a kind and its options. Text is paragraph markup in str.format syntax:
+{color.<role>} is a palette colour of the theme and any other {field}
+comes from the data the template is rendered with. Nodes that repeat
+(list, steps, table rows) take their items from a data field named by
+"items"; a tuple item's values are named by "fields" and the 1-based
+position is {n}.
+
+    ("section", "1. Executive Summary")
+    ("paragraph", "status.body", "Prepared {date}")
+    ("spacer", "8mm")                           # lengths: points or "12mm"/"2cm"/"1in"
+    ("rule", {"thickness": 2, "color": "primary", "space_after": "6mm"})
+    ("page_break",)
+    ("table", {"rows": "summary", "widths": (0.35, 0.65), "style": "status.summary"})
+    ("list", {"items": "features", "fields": ("title", "desc"),
+              "each": [("status.check", "<b>{title}</b> &mdash; {desc}")]})
+    ("steps", {"items": "flow", "fields": ("title", "desc"),
+               "number": ("status.step_num", "<b>{n}</b>"),
+               "body": ("status.body", "<b>{title}</b><br/>{desc}"),
+               "widths": ("12mm", "-14mm"), "style": "status.flow_step", "gap": "2mm"})
+
+Column widths are a fraction of the frame width (0.35), a length ("12mm")
+or the frame width less a length ("-14mm").
+
+compile_template() resolves every style, table style, colour and length
+and splits markup into constant text and format strings. The plan is
+cached per (template, theme, fonts, width), so rendering the next document
+only formats data fields and creates flowables. Flowables themselves are made
+fresh for every document, since layout leaves state on them, but parsed
+paragraph markup is shared: each distinct (text, style) is parsed once per
+process and later Paragraphs reuse its fragments.
+
+builder_digest() covers the code that turns a template into a PDF, for
+the build cache keys of documents rendered from templates.
+"""
+
+import os
+import string
+from collections import ChainMap
+from functools import lru_cache
+
+from reports.palettes import DEFAULT_THEME
+
+_FORMATTER = string.Formatter()
+# reports modules whose code shapes a rendered template
+BUILDER_MODULES = ("templates", "sections", "theme", "palettes", "fonts")
+# Parsed paragraph fragments by (text, style); cleared when it outgrows this
+MAX_PARSED = 4096
+_parsed = {}
+
+
+class Template:
+    """A named document layout: page setup and a list of nodes (see the module docstring).
+
+    page holds SimpleDocTemplate arguments; pagesize may be the name of a
+    reportlab.lib.pagesizes constant and margins may be lengths.
+    """
+
+    def __init__(self, name, nodes, page=None):
+        self.name = name
+        self.nodes = nodes
+        self.page = page or {}
+
+    def __repr__(self):
+        return f"Template({self.name!r})"
+
+    def page_setup(self):
+        """The page arguments with sizes and lengths converted to points."""
+        from reportlab.lib import pagesizes
+
+        setup = {}
+        for key, value in self.page.items():
+            if key == "pagesize" and isinstance(value, str):
+                value = getattr(pagesizes, value)
+            elif key.endswith("Margin"):
+                value = length(value)
+            setup[key] = value
+        return setup
+
+    def doc(self, output, **kw):
+        """A SimpleDocTemplate writing to output with this template's page setup."""
+        from reportlab.platypus import SimpleDocTemplate
+
+        return SimpleDocTemplate(output, **self.page_setup(), **kw)
+
+
+def length(value):
+    """Points for a number or a reportlab length string such as "12mm"."""
+    if isinstance(value, str):
+        from reportlab.lib.units import toLength
+
+        return toLength(value)
+    return value
+
+
+def column_width(spec, width):
+    if isinstance(spec, str):
+        if spec.startswith("-"):
+            return width - length(spec[1:])
+        return length(spec)
+    return width * spec
+
+
+def paragraph(text, style, fonts=None):
+    """A Paragraph of text, parsing its markup only the first time this process sees it.
+
+    fonts is the theme's reports.fonts.FontSet, to set characters its face
+    lacks in a fallback font.
+    """
+    from reportlab.platypus import Paragraph
+
+    key = (text, style)
+    parsed = _parsed.get(key)
+    if parsed is None:
+        if len(_parsed) >= MAX_PARSED:
+            _parsed.clear()
+        p = Paragraph(text if fonts is None else fonts.fallback(text), style)
+        _parsed[key] = (p.text, p.style, p.frags, p.bulletText)
+        return p
+    text, style, frags, bullet_text = parsed
+    return Paragraph(text, style, bulletText=bullet_text, frags=frags)
+
+
+class _Text:
+    """Markup with its colours filled in; constant when it has no data fields left."""
+
+    def __init__(self, markup, theme):
+        parts = []
+        self.dynamic = False
+        for literal, field, spec, conversion in _FORMATTER.parse(markup):
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if field.startswith("color."):
+                parts.append(getattr(theme, field[len("color."):]).hexval())
+                continue
+            self.dynamic = True
+            parts.append(
+                "{" + field + (f"!{conversion}" if conversion else "")
+                + (f":{spec}" if spec else "") + "}"
+            )
+        self.template = "".join(parts)
+        self.constant = None if self.dynamic else self.template.format()
+
+    def __call__(self, values):
+        if not self.dynamic:
+            return self.constant
+        return self.template.format_map(values)
+
+
+def _item_values(item, fields, n, data):
+    if isinstance(item, dict):
+        values = dict(item)
+    elif fields:
+        values = dict(zip(fields, item))
+    else:
+        values = {"item": item}
+    values["n"] = n
+    return ChainMap(values, data)
+
+
+class Plan:
+    """A compiled template: a list of operations that append flowables to a Story."""
+
+    def __init__(self, template, ops):
+        self.template = template
+        self.ops = ops
+
+    def render(self, data=None):
+        """The flowables for data, with each section's first flowable tagged."""
+        from reports.sections import Story
+
+        story = Story()
+        data = data or {}
+        for op in self.ops:
+            op(story, data)
+        return story.flowables()
+
+
+def _constant(make, *args, **kw):
+    def op(story, data):
+        story.append(make(*args, **kw))
+    return op
+
+
+def _compile_node(node, t, width):
+    """One node to a Plan operation."""
+    from reportlab.platypus import HRFlowable, PageBreak, Spacer, Table
+
+    kind, *args = node
+    opts = args[0] if args and isinstance(args[0], dict) else {}
+
+    if kind == "section":
+        name = args[0]
+
+        def op(story, data):
+            story.section(name)
+        return op
+
+    if kind == "spacer":
+        return _constant(Spacer, 1, length(args[0]))
+
+    if kind == "page_break":
+        return _constant(PageBreak)
+
+    if kind == "rule":
+        spec = opts.get("width")
+        return _constant(
+            HRFlowable,
+            width=width if spec is None else spec,
+            thickness=opts.get("thickness", 1),
+            color=getattr(t, opts.get("color", "border")),
+            spaceAfter=length(opts.get("space_after", 0)),
+        )
+
+    if kind == "paragraph":
+        style_name, markup = args
+        style = t.style(style_name)
+        text = _Text(markup, t)
+
+        def op(story, data):
+            story.append(paragraph(text(data), style, t.fonts))
+        return op
+
+    if kind == "list":
+        each = [(t.style(name), _Text(markup, t)) for name, markup in opts["each"]]
+        fields = opts.get("fields")
+
+        def op(story, data):
+            for n, item in enumerate(data[opts["items"]], 1):
+                values = _item_values(item, fields, n, data)
+                for style, text in each:
+                    story.append(paragraph(text(values), style, t.fonts))
+        return op
+
+    if kind == "steps":
+        fields = opts.get("fields")
+        num_style, num_markup = opts["number"]
+        num_style, num_text = t.style(num_style), _Text(num_markup, t)
+        body = opts["body"]
+        nested = isinstance(body, list)
+        rows = [(t.style(name), _Text(markup, t)) for name, markup in (body if nested else [body])]
+        widths = [column_width(w, width) for w in opts["widths"]]
+        table_style = t.table_style(opts["style"])
+        if nested:
+            body_widths = [column_width(w, width) for w in opts["body_widths"]]
+            body_style = t.table_style(opts["body_style"])
+        gap = length(opts["gap"]) if "gap" in opts else None
+
+        def op(story, data):
+            for n, item in enumerate(data[opts["items"]], 1):
+                values = _item_values(item, fields, n, data)
+                cells = [paragraph(text(values), style, t.fonts) for style, text in rows]
+                if nested:
+                    content = Table([[cell] for cell in cells], colWidths=body_widths)
+                    content.setStyle(body_style)
+                else:
+                    (content,) = cells
+                step = Table(
+                    [[paragraph(num_text(values), num_style, t.fonts), content]], colWidths=widths,
+                )
+                step.setStyle(table_style)
+                story.append(step)
+                if gap is not None:
+                    story.append(Spacer(1, gap))
+        return op
+
+    if kind == "table":
+        widths = [column_width(w, width) for w in opts["widths"]]
+        table_style = t.table_style(opts["style"])
+        # Per-column (style, markup) to wrap cells in Paragraphs; plain strings otherwise
+        cells = opts.get("cells")
+        cells = cells and [(t.style(name), _Text(markup, t)) for name, markup in cells]
+        header = opts.get("header")
+        header_cell = opts.get("header_cell")
+        if header_cell:
+            header_cell = (t.style(header_cell[0]), _Text(header_cell[1], t))
+
+        def make_row(row, formats):
+            if not formats:
+                return list(row)
+            return [
+                paragraph(text({"value": value}), style, t.fonts)
+                for (style, text), value in zip(formats, row)
+            ]
+
+        def make_table(rows):
+            data = []
+            if header:
+                data.append(make_row(header, header_cell and [header_cell] * len(header)))
+            data.extend(make_row(row, cells) for row in rows)
+            table = Table(data, colWidths=widths)
+            table.setStyle(table_style)
+            return table
+
+        rows = opts["rows"]
+        if not isinstance(rows, str):
+            return _constant(make_table, rows)
+
+        def op(story, data):
+            story.append(make_table(data[rows]))
+        return op
+
+    raise ValueError(f"Unknown template node: {kind!r}")
+
+
+def compile_template(template, theme=DEFAULT_THEME, width=None):
+    """The cached Plan for template in theme, laid out for a frame width in points."""
+    from reports.theme import get_theme
+
+    if width is None:
+        width = template.doc(None).width
+    return _compile(template, get_theme(theme), width)
+
+
+@lru_cache(maxsize=None)
+def _compile(template, t, width):
+    # Keyed on the Theme rather than its name, so a change of fonts compiles afresh
+    return Plan(template, [_compile_node(node, t, width) for node in template.nodes])
+
+
+def render(template, data=None, theme=DEFAULT_THEME, width=None):
+    """Flowables for one document from template and data, via the cached plan."""
+    return compile_template(template, theme, width).render(data)
+
+
+@lru_cache(maxsize=None)
+def builder_digest():
+    """Digest of BUILDER_MODULES' source and the reportlab version.
+
+    A key over a document's content and styles alone would keep serving
+    the old PDF after a change to how nodes become flowables.
+    """
+    import reportlab
+
+    from reports.cache import content_key, file_digest
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    digests = [file_digest(os.path.join(directory, f"{name}.py")) for name in BUILDER_MODULES]
+    return content_key(digests, reportlab.Version, "builder")
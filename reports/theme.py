@@ -0,0 +1,423 @@
+"""Shared paragraph and table styles for every TipUs report, coloured from reports.palettes.
+
+Styles are declared once here and built lazily, once per (theme, name) per
+process. Documents and pool workers all get the same interned objects back,
+so a batch run doesn't allocate fresh ParagraphStyles per document or per row.
+"""
+
+from functools import lru_cache
+
+from reportlab.lib.colors import HexColor, white
+from reportlab.lib.enums import TA_LEFT, TA_CENTER
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.platypus import TableStyle
+
+from reports import fonts
+from reports.cache import style_fingerprint
+from reports.palettes import DEFAULT_THEME, PALETTES
+
+# ── Paragraph styles ──
+# name: (parent, attributes). A parent of "sample:X" is X from reportlab's
+# sample sheet; any other parent is another entry here. String colour values
+# are palette roles.
+PARAGRAPH_STYLES = {
+    # Status report
+    "status.title": ("sample:Title", dict(
+        fontName="Helvetica-Bold", fontSize=28, textColor="primary",
+        spaceAfter=4 * mm, alignment=TA_LEFT,
+    )),
+    "status.subtitle": ("sample:Normal", dict(
+        fontName="Helvetica", fontSize=12, textColor="text_muted",
+        spaceAfter=6 * mm,
+    )),
+    "status.heading": ("sample:Heading2", dict(
+        fontName="Helvetica-Bold", fontSize=16, textColor="primary_dark",
+        spaceBefore=8 * mm, spaceAfter=4 * mm,
+    )),
+    "status.subheading": ("sample:Heading3", dict(
+        fontName="Helvetica-Bold", fontSize=12, textColor="text",
+        spaceBefore=4 * mm, spaceAfter=2 * mm,
+    )),
+    "status.body": ("sample:Normal", dict(
+        fontName="Helvetica", fontSize=10, textColor="text",
+        leading=15, spaceAfter=3 * mm,
+    )),
+    "status.body_light": ("status.body", dict(
+        textColor="text_muted", fontSize=9.5,
+    )),
+    "status.check": ("status.body", dict(
+        leftIndent=5 * mm, spaceAfter=2 * mm, fontSize=10, leading=14,
+    )),
+    "status.crit_item": ("status.body", dict(spaceAfter=1 * mm)),
+    "status.crit_desc": ("status.body_light", dict(leftIndent=7 * mm, spaceAfter=4 * mm)),
+    "status.step_num": (None, dict(alignment=TA_CENTER, fontName="Helvetica-Bold")),
+    "status.num": (None, dict(alignment=TA_CENTER, fontName="Helvetica-Bold", textColor="primary")),
+    "status.footer": ("sample:Normal", dict(
+        fontName="Helvetica", fontSize=8, textColor="text_light",
+        alignment=TA_CENTER,
+    )),
+
+    # System overview
+    "overview.title": (None, dict(
+        fontName="Helvetica-Bold", fontSize=26,
+        textColor="text", leading=30, spaceAfter=1,
+    )),
+    "overview.subtitle": (None, dict(
+        fontName="Helvetica", fontSize=11,
+        textColor="text_muted", leading=14, spaceAfter=0,
+    )),
+    "overview.date": (None, dict(
+        fontName="Helvetica", fontSize=8.5,
+        textColor="text_light", spaceBefore=12, spaceAfter=0,
+    )),
+    "overview.section_heading": (None, dict(
+        fontName="Helvetica-Bold", fontSize=14,
+        textColor="primary", leading=18, spaceBefore=14, spaceAfter=6,
+    )),
+    "overview.body": (None, dict(
+        fontName="Helvetica", fontSize=9.5,
+        textColor="text", leading=13.5, spaceAfter=4,
+    )),
+    "overview.bullet": (None, dict(
+        fontName="Helvetica", fontSize=9.5,
+        textColor="text", leading=13.5, leftIndent=16, spaceAfter=3,
+        bulletIndent=0,
+    )),
+    "overview.note": (None, dict(
+        fontName="Helvetica-Oblique", fontSize=8.5,
+        textColor="text_muted", leading=12, spaceAfter=4,
+    )),
+    "overview.footer": (None, dict(
+        fontName="Helvetica", fontSize=7.5,
+        textColor="text_light", alignment=TA_CENTER,
+    )),
+    "overview.cell_header": (None, dict(
+        fontName="Helvetica-Bold", fontSize=9.5,
+        textColor="text", leading=13,
+    )),
+    "overview.cell_body": (None, dict(
+        fontName="Helvetica", fontSize=9.5,
+        textColor="text", leading=13,
+    )),
+    "overview.cell_small": (None, dict(
+        fontName="Helvetica", fontSize=8.5,
+        textColor="text_muted", leading=12,
+    )),
+    "overview.url": (None, dict(
+        fontName="Helvetica", fontSize=8.5, textColor="primary", leading=12,
+    )),
+    "overview.tech": (None, dict(
+        fontName="Helvetica", fontSize=8.5, textColor="text_muted", leading=12,
+    )),
+    "overview.num": (None, dict(
+        fontName="Helvetica-Bold", fontSize=11,
+        textColor="white", alignment=TA_CENTER, leading=14,
+    )),
+
+    # Payout statements
+    "statement.title": (None, dict(
+        fontName="Helvetica-Bold", fontSize=22,
+        textColor="primary", leading=26, spaceAfter=2 * mm,
+    )),
+    "statement.subtitle": (None, dict(
+        fontName="Helvetica", fontSize=11,
+        textColor="text_muted", leading=14, spaceAfter=4 * mm,
+    )),
+    "statement.heading": (None, dict(
+        fontName="Helvetica-Bold", fontSize=13,
+        textColor="primary_dark", leading=16, spaceBefore=6 * mm, spaceAfter=3 * mm,
+    )),
+    "statement.body": (None, dict(
+        fontName="Helvetica", fontSize=9.5,
+        textColor="text", leading=13.5, spaceAfter=2 * mm,
+    )),
+    # Table cells that need fallback fonts, matching the distributions table body
+    "statement.cell": (None, dict(
+        fontName="Helvetica", fontSize=9,
+        textColor="text", leading=11,
+    )),
+    "statement.footer": (None, dict(
+        fontName="Helvetica", fontSize=7.5,
+        textColor="text_light", alignment=TA_CENTER,
+    )),
+}
+
+_COLOR_ATTRS = ("textColor", "backColor", "borderColor", "bulletColor")
+
+
+# ── Table styles ──
+# Each builder takes the theme and returns TableStyle commands; the result is
+# interned per theme like the paragraph styles.
+def _status_summary(t):
+    return [
+        ("BACKGROUND", (0, 0), (0, -1), t.primary_light),
+        ("BACKGROUND", (1, 0), (1, -1), t.surface),
+        ("TEXTCOLOR", (0, 0), (-1, -1), t.text),
+        ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
+        ("FONTNAME", (1, 0), (1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("TOPPADDING", (0, 0), (-1, -1), 6),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ("LEFTPADDING", (0, 0), (-1, -1), 10),
+        ("GRID", (0, 0), (-1, -1), 0.5, t.border),
+    ]
+
+
+def _status_flow_step(t):
+    return [
+        ("BACKGROUND", (0, 0), (0, 0), t.primary),
+        ("BACKGROUND", (1, 0), (1, 0), t.surface),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), 6),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ("LEFTPADDING", (0, 0), (0, 0), 4),
+        ("LEFTPADDING", (1, 0), (1, 0), 8),
+    ]
+
+
+def _status_next_step(t):
+    return [
+        ("BACKGROUND", (1, 0), (1, 0), t.surface),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("TOPPADDING", (0, 0), (-1, -1), 4),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+        ("LEFTPADDING", (1, 0), (1, 0), 8),
+    ]
+
+
+def _status_tech(t):
+    return [
+        ("BACKGROUND", (0, 0), (-1, 0), t.primary),
+        ("TEXTCOLOR", (0, 0), (-1, 0), t.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTNAME", (0, 1), (0, -1), "Helvetica-Bold"),
+        ("FONTNAME", (1, 1), (1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("BACKGROUND", (0, 1), (-1, -1), t.surface),
+        ("TOPPADDING", (0, 0), (-1, -1), 6),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ("LEFTPADDING", (0, 0), (-1, -1), 8),
+        ("GRID", (0, 0), (-1, -1), 0.5, t.border),
+        ("TEXTCOLOR", (0, 1), (-1, -1), t.text),
+    ]
+
+
+def _overview_summary(t):
+    return [
+        ("BACKGROUND", (0, 0), (-1, 0), t.header_bg),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [t.row_bg, None]),
+        ("LINEBELOW", (0, 0), (-1, -1), 0.5, t.border),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), 5),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+        ("LEFTPADDING", (0, 0), (-1, -1), 8),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+    ]
+
+
+def _overview_roles(t):
+    return [
+        ("BACKGROUND", (0, 0), (-1, 0), t.header_bg),
+        ("LINEBELOW", (0, 0), (-1, -1), 0.5, t.border),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("TOPPADDING", (0, 0), (-1, -1), 5),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+        ("LEFTPADDING", (0, 0), (-1, -1), 8),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+    ]
+
+
+def _overview_action_content(t):
+    return [
+        ("TOPPADDING", (0, 0), (-1, -1), 0),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
+        ("LEFTPADDING", (0, 0), (-1, -1), 0),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+    ]
+
+
+def _overview_action_step(t):
+    return [
+        ("BACKGROUND", (0, 0), (0, 0), t.primary),
+        ("VALIGN", (0, 0), (0, 0), "MIDDLE"),
+        ("VALIGN", (1, 0), (1, 0), "TOP"),
+        ("TOPPADDING", (0, 0), (-1, -1), 6),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ("LEFTPADDING", (0, 0), (0, 0), 0),
+        ("RIGHTPADDING", (0, 0), (0, 0), 0),
+        ("LEFTPADDING", (1, 0), (1, 0), 10),
+        ("LINEBELOW", (0, 0), (-1, -1), 0.5, t.border),
+    ]
+
+
+def _overview_credentials(t):
+    return [
+        ("BACKGROUND", (0, 0), (-1, -1), t.highlight_bg),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), 6),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ("LEFTPADDING", (0, 0), (-1, -1), 8),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+        ("LINEBELOW", (0, 0), (-1, -2), 0.5, t.border),
+    ]
+
+
+def _statement_summary(t):
+    return [
+        ("BACKGROUND", (0, 0), (0, -1), t.primary_light),
+        ("BACKGROUND", (1, 0), (1, -1), t.surface),
+        ("TEXTCOLOR", (0, 0), (-1, -1), t.text),
+        ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
+        ("FONTNAME", (1, 0), (1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9.5),
+        ("TOPPADDING", (0, 0), (-1, -1), 5),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+        ("LEFTPADDING", (0, 0), (-1, -1), 8),
+        ("GRID", (0, 0), (-1, -1), 0.5, t.border),
+    ]
+
+
+def _statement_distributions(t):
+    return [
+        ("BACKGROUND", (0, 0), (-1, 0), t.primary),
+        ("TEXTCOLOR", (0, 0), (-1, 0), t.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("TEXTCOLOR", (0, 1), (-1, -1), t.text),
+        ("ALIGN", (3, 0), (3, -1), "RIGHT"),
+        ("TOPPADDING", (0, 0), (-1, -1), 4),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+        ("LINEBELOW", (0, 0), (-1, -2), 0.5, t.border),
+        ("LINEABOVE", (0, -1), (-1, -1), 1, t.primary),
+    ]
+
+
+def _statement_ledger(t):
+    # Fixed row heights and one ROWBACKGROUNDS command keep this cheap on
+    # ledgers of tens of thousands of rows (see reports.ledger)
+    return [
+        ("BACKGROUND", (0, 0), (-1, 0), t.primary_light),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [t.white, t.row_bg]),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8.5),
+        ("TEXTCOLOR", (0, 0), (-1, -1), t.text),
+        ("ALIGN", (-1, 0), (-1, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), 0),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+        ("LEFTPADDING", (0, 0), (-1, -1), 3),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 3),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.5, t.border),
+    ]
+
+
+def _audit_discrepancies(t):
+    # The statement ledger with its two amount columns right-aligned
+    return _statement_ledger(t) + [("ALIGN", (-2, 0), (-1, -1), "RIGHT")]
+
+
+TABLE_STYLES = {
+    "status.summary": _status_summary,
+    "status.flow_step": _status_flow_step,
+    "status.next_step": _status_next_step,
+    "status.tech": _status_tech,
+    "overview.summary": _overview_summary,
+    "overview.roles": _overview_roles,
+    "overview.action_content": _overview_action_content,
+    "overview.action_step": _overview_action_step,
+    "overview.credentials": _overview_credentials,
+    "statement.summary": _statement_summary,
+    "statement.distributions": _statement_distributions,
+    "statement.ledger": _statement_ledger,
+    "audit.discrepancies": _audit_discrepancies,
+}
+
+
+@lru_cache(maxsize=None)
+def _sample_styles():
+    return getSampleStyleSheet()
+
+
+class Theme:
+    """A palette plus the interned styles built from it.
+
+    Palette roles are attributes (theme.primary, theme.text, ...). Styles
+    name the Helvetica faces; they are drawn in fonts (a reports.fonts.FontSet)
+    instead, so theme.fonts.face("Helvetica") is the body font.
+    """
+
+    def __init__(self, name, palette, fonts):
+        self.name = name
+        self.fonts = fonts
+        self.white = white
+        for role, value in palette.items():
+            setattr(self, role, HexColor(value))
+        self._styles = {}
+        self._table_styles = {}
+
+    def style(self, name):
+        style = self._styles.get(name)
+        if style is None:
+            parent_name, attrs = PARAGRAPH_STYLES[name]
+            if parent_name is None:
+                parent = None
+            elif parent_name.startswith("sample:"):
+                parent = _sample_styles()[parent_name[len("sample:"):]]
+            else:
+                parent = self.style(parent_name)
+            attrs = {
+                k: getattr(self, v) if k in _COLOR_ATTRS and isinstance(v, str) else v
+                for k, v in attrs.items()
+            }
+            # Keep reportlab's short style names ("Title", "CellBody"...) out of
+            # the way: the registry key is unique, so use it as the name.
+            style = self._styles[name] = ParagraphStyle(name, parent=parent, **attrs)
+            style.fontName = self.fonts.face(style.fontName)
+            style.bulletFontName = self.fonts.face(style.bulletFontName)
+        return style
+
+    def styles(self, prefix):
+        """All paragraph styles for one document, keyed by the name after the prefix."""
+        prefix += "."
+        return {
+            name[len(prefix):]: self.style(name)
+            for name in PARAGRAPH_STYLES if name.startswith(prefix)
+        }
+
+    def table_style(self, name):
+        style = self._table_styles.get(name)
+        if style is None:
+            commands = [
+                (cmd[0], cmd[1], cmd[2], self.fonts.face(cmd[3]), *cmd[4:])
+                if cmd[0] in ("FONT", "FONTNAME") else cmd
+                for cmd in TABLE_STYLES[name](self)
+            ]
+            style = self._table_styles[name] = TableStyle(commands)
+        return style
+
+    def fingerprint(self, prefix=""):
+        """Digest of every style under prefix and of the fonts, for build cache keys."""
+        names = sorted(n for n in PARAGRAPH_STYLES if n.startswith(prefix))
+        tables = sorted(n for n in TABLE_STYLES if n.startswith(prefix))
+        return style_fingerprint(
+            *(self.style(n) for n in names), *(self.table_style(n) for n in tables),
+            self.fonts.key,
+        )
+
+
+def get_theme(name=DEFAULT_THEME):
+    """The process-wide Theme for a palette name, in the configured fonts (see reports.fonts)."""
+    return _get_theme(name, fonts.current())
+
+
+@lru_cache(maxsize=None)
+def _get_theme(name, font_set):
+    try:
+        palette = PALETTES[name]
+    except KeyError:
+        raise ValueError(f"Unknown theme {name!r}; choose from {', '.join(sorted(PALETTES))}")
+    return Theme(name, palette, font_set)
@@ -0,0 +1,61 @@
+"""Pre-forked render workers that have paid reportlab's start-up cost up front.
+
+Importing reportlab, loading font metrics and building the style sheet
+costs more than laying out a small statement. warm_pool() forks its
+workers from a forkserver that has already imported the render modules,
+runs warm_up() in each one to build the styles and load the fonts, and
+only returns once every worker is up, so the first job is as fast as the
+hundredth. Workers use the parent's font family and compression level
+(reports.fonts.settings()), and parse the TrueType files once each. They
+share the parent's logo store and asset cache (reports.assets.settings()).
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from reports import assets, fonts
+from reports.palettes import DEFAULT_THEME
+
+# Imported once by the forkserver; every worker forked from it starts with them loaded
+PRELOAD = [
+    "reportlab.platypus", "reportlab.graphics.charts.lineplots", "reportlab.graphics.charts.barcharts",
+    "reports.statements", "reports.batch",
+]
+FONTS = ("Helvetica", "Helvetica-Bold")
+
+
+def warm_up(themes=(DEFAULT_THEME,), font_settings=(None, None), asset_settings=(None, None)):
+    """Build the statement styles and load the font metrics every render uses."""
+    from reportlab.pdfbase.pdfmetrics import getFont
+
+    from reports.statements import style_digest
+
+    fonts.configure(*font_settings)
+    assets.configure(*asset_settings)
+    for name in FONTS:
+        getFont(fonts.current().face(name))
+    for theme in themes:
+        # Builds every statement.* paragraph and table style of the theme
+        style_digest(theme)
+
+
+def _ready(_):
+    return os.getpid()
+
+
+def warm_pool(workers=None, themes=(DEFAULT_THEME,)):
+    """A ProcessPoolExecutor with all of its workers started and warmed."""
+    workers = workers or os.cpu_count() or 1
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(PRELOAD)
+    else:
+        context = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=warm_up,
+        initargs=(tuple(themes), fonts.settings(), assets.settings()),
+    )
+    # The executor starts workers as jobs arrive; one job per worker starts them all now
+    list(pool.map(_ready, range(workers)))
+    return pool
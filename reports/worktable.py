@@ -0,0 +1,414 @@
+"""Statement generation spread over many hosts through a shared, lease-based work table.
+
+    enqueue_statements(open_work_table("work.db"), source)    # once per run
+    run_worker("work.db", "tipus.db", "statements")            # on every host, any number
+
+Each work item is one document: a kind ("statement" or "activity"), a
+venue and a period. Items live in a work_items table with lease and
+heartbeat columns. The table is SQLite locally and Postgres (through
+psycopg) across hosts.
+
+A worker claims a few items at a time. Claiming is a single UPDATE ...
+RETURNING inside a write transaction; on Postgres it is FOR UPDATE SKIP
+LOCKED. So two workers never hold the same item, and the claim gives them
+lease_expires_at and a fresh lease_token. A heartbeat thread pushes the
+expiry forward while the item renders. A worker that dies stops
+heartbeating, and once its lease expires the next claim takes the item
+back.
+
+Every lease-guarded write (renewal, completion, failure report) names
+the lease_token, and a worker that lost its lease (it stalled and the
+item was reclaimed) finds its write refused. A PDF goes to a temp file
+first and is renamed into place only once its completion has gone
+through, so a worker that lost its lease publishes nothing. Each worker
+renders its items from the tables as they stand when it claims them.
+
+attempts counts claims, so an item whose render kills its worker fails
+for good after max_attempts like one that raises. retry_failed() puts
+failed items back. Lease expiry is compared with each worker's clock, so
+hosts need clocks within a small fraction of the lease of each other.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from reports.batch import build_jobs, find_job, statement_filename
+from reports.bundle import run_jobs
+from reports.palettes import DEFAULT_THEME
+from reports.sinks import DirectorySink, MemorySink
+from reports.sources import shared_source
+from reports.workers import warm_pool
+
+KINDS = ("statement", "activity")
+STATUSES = ("pending", "leased", "done", "failed")
+DEFAULT_LEASE = 60.0
+DEFAULT_CLAIM = 2
+DEFAULT_POLL = 2.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+  id {id},
+  kind TEXT NOT NULL,
+  venue_id TEXT NOT NULL,
+  period TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending',
+  worker TEXT,
+  lease_token INTEGER NOT NULL DEFAULT 0,
+  lease_expires_at {real},
+  heartbeat_at {real},
+  attempts INTEGER NOT NULL DEFAULT 0,
+  error TEXT,
+  output TEXT,
+  enqueued_at {real},
+  completed_at {real},
+  UNIQUE (kind, venue_id, period)
+);
+CREATE INDEX IF NOT EXISTS work_items_claim ON work_items (status, lease_expires_at);
+"""
+DIALECTS = {
+    "sqlite": {"id": "INTEGER PRIMARY KEY", "real": "REAL", "lock": ""},
+    "postgres": {"id": "BIGSERIAL PRIMARY KEY", "real": "DOUBLE PRECISION",
+                 "lock": " FOR UPDATE SKIP LOCKED"},
+}
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ─── Work table ───
+
+class WorkTable:
+    """The work_items table behind a DB-API connection; dialect is "sqlite" or "postgres"."""
+
+    def __init__(self, conn, dialect="sqlite"):
+        self.conn = conn
+        self.dialect = dialect
+        self._sql = DIALECTS[dialect]
+        for statement in SCHEMA.format(**self._sql).split(";"):
+            if statement.strip():
+                self._execute(statement)
+        self._commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _execute(self, sql, params=()):
+        if self.dialect == "postgres":
+            sql = sql.replace("?", "%s")
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    def _begin(self):
+        # SQLite: take the write lock up front, so two claims can't pick the same rows
+        if self.dialect == "sqlite":
+            self._execute("BEGIN IMMEDIATE")
+
+    def _commit(self):
+        if self.dialect == "sqlite" and not self.conn.in_transaction:
+            return
+        self.conn.commit()
+
+    def enqueue(self, items, now=None):
+        """Add (kind, venue_id, period) items; ones already in the table are left as they are.
+
+        Returns how many were new.
+        """
+        now = time.time() if now is None else now
+        items = list(items)
+        for kind, _venue_id, _period in items:
+            if kind not in KINDS:
+                raise ValueError(f"unknown work item kind {kind!r}; expected one of {', '.join(KINDS)}")
+        added = 0
+        self._begin()
+        for kind, venue_id, period in items:
+            cursor = self._execute(
+                "INSERT INTO work_items (kind, venue_id, period, enqueued_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, venue_id, period) DO NOTHING",
+                (kind, venue_id, period, now),
+            )
+            added += cursor.rowcount
+        self._commit()
+        return added
+
+    def claim(self, worker, limit=DEFAULT_CLAIM, lease=DEFAULT_LEASE,
+              max_attempts=DEFAULT_MAX_ATTEMPTS, now=None):
+        """Lease up to limit pending or expired items to worker, oldest first.
+
+        Returns them as dicts with id, kind, venue_id, period, lease_token
+        and attempts. Expired items that have used up their attempts are
+        marked failed instead.
+        """
+        now = time.time() if now is None else now
+        self._begin()
+        self._execute(
+            "UPDATE work_items SET status = 'failed', worker = NULL, lease_expires_at = NULL, "
+            "error = COALESCE(error, 'lease expired') "
+            "WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?",
+            (now, max_attempts),
+        )
+        cursor = self._execute(
+            "UPDATE work_items SET status = 'leased', worker = ?, lease_token = lease_token + 1, "
+            "lease_expires_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+            "WHERE id IN (SELECT id FROM work_items "
+            "WHERE status = 'pending' OR (status = 'leased' AND lease_expires_at < ?) "
+            f"ORDER BY id LIMIT ?{self._sql['lock']}) "
+            "RETURNING id, kind, venue_id, period, lease_token, attempts",
+            (worker, now + lease, now, now, limit),
+        )
+        names = [d[0] for d in cursor.description]
+        items = [dict(zip(names, row)) for row in cursor.fetchall()]
+        self._commit()
+        items.sort(key=lambda item: item["id"])
+        return items
+
+    def renew(self, item, lease=DEFAULT_LEASE, now=None):
+        """Extend item's lease; False if it was reclaimed by another worker meanwhile."""
+        now = time.time() if now is None else now
+        cursor = self._execute(
+            "UPDATE work_items SET lease_expires_at = ?, heartbeat_at = ? "
+            "WHERE id = ? AND lease_token = ? AND status = 'leased'",
+            (now + lease, now, item["id"], item["lease_token"]),
+        )
+        self._commit()
+        return cursor.rowcount == 1
+
+    def complete(self, item, output, now=None):
+        """Mark item done with its output path; False if its lease was lost."""
+        now = time.time() if now is None else now
+        cursor = self._execute(
+            "UPDATE work_items SET status = 'done', lease_expires_at = NULL, error = NULL, "
+            "output = ?, completed_at = ? WHERE id = ? AND lease_token = ? AND status = 'leased'",
+            (output, now, item["id"], item["lease_token"]),
+        )
+        self._commit()
+        return cursor.rowcount == 1
+
+    def fail(self, item, error, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Release item after a failed render: pending again, or failed once out of attempts.
+
+        False if its lease was lost.
+        """
+        cursor = self._execute(
+            "UPDATE work_items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_expires_at = NULL, error = ? "
+            "WHERE id = ? AND lease_token = ? AND status = 'leased'",
+            (max_attempts, error, item["id"], item["lease_token"]),
+        )
+        self._commit()
+        return cursor.rowcount == 1
+
+    def retry_failed(self):
+        """Put failed items back as pending with their attempts reset; returns how many."""
+        cursor = self._execute(
+            "UPDATE work_items SET status = 'pending', attempts = 0 WHERE status = 'failed'",
+        )
+        self._commit()
+        return cursor.rowcount
+
+    def counts(self):
+        """{status: items} over every status."""
+        counts = dict.fromkeys(STATUSES, 0)
+        for status, n in self._execute(
+            "SELECT status, COUNT(*) FROM work_items GROUP BY status",
+        ).fetchall():
+            counts[status] = n
+        self._commit()
+        return counts
+
+    def failures(self):
+        """(kind, venue_id, period, attempts, error) of failed items."""
+        rows = self._execute(
+            "SELECT kind, venue_id, period, attempts, error FROM work_items "
+            "WHERE status = 'failed' ORDER BY id",
+        ).fetchall()
+        self._commit()
+        return [tuple(row) for row in rows]
+
+    def completed_by(self):
+        """{worker: items done}, for seeing how the work spread."""
+        rows = self._execute(
+            "SELECT worker, COUNT(*) FROM work_items WHERE status = 'done' GROUP BY worker",
+        ).fetchall()
+        self._commit()
+        return dict(rows)
+
+
+def open_work_table(location):
+    """The WorkTable at a SQLite path or a postgresql:// URL (needs psycopg)."""
+    if location.startswith(("postgres://", "postgresql://")):
+        try:
+            import psycopg
+        except ImportError as exc:
+            raise ImportError("a Postgres work table needs psycopg (pip install psycopg)") from exc
+        return WorkTable(psycopg.connect(location), "postgres")
+    # Workers on one file queue for its write lock rather than failing at once
+    conn = sqlite3.connect(location, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return WorkTable(conn, "sqlite")
+
+
+# ─── Enqueueing ───
+
+def enqueue_statements(table, source, run_date=None):
+    """Queue a statement item per payout (those auto-payout created on run_date, if given)."""
+    jobs = run_jobs(build_jobs(source), run_date)
+    return table.enqueue(
+        ("statement", job["payout"]["venue_id"], job["payout"]["period_start"][:10]) for job in jobs
+    )
+
+
+def enqueue_activity(table, source, year):
+    """Queue an activity report item for year per venue."""
+    return table.enqueue(("activity", v["id"], str(year)) for v in source.iter_table("venues"))
+
+
+# ─── Workers ───
+
+class _LeaseLost(Exception):
+    """The item was reclaimed by another worker before this one completed it."""
+
+
+def render_item(item, source_path, theme=DEFAULT_THEME, cache_dir=None):
+    """(file name, PDF bytes) of a work item; LookupError if its data is gone."""
+    from reports.activity import render_activity
+    from reports.service import statement_pdf
+
+    if item["kind"] == "activity":
+        sink = MemorySink()
+        name, _days = render_activity(
+            source_path, item["venue_id"], int(item["period"]), sink, theme=theme,
+        )
+        return name, sink.getvalue()
+    # Looked up per item, through the indexes, so a long-running worker sees
+    # distributions and statuses as they are now
+    source = shared_source(source_path)
+    job = find_job(source, item["venue_id"], item["period"])
+    return statement_filename(job), statement_pdf(source, job, theme, cache_dir)
+
+
+class Heartbeat:
+    """A thread renewing the leases of the items a worker holds, on a connection of its own."""
+
+    def __init__(self, location, lease=DEFAULT_LEASE, interval=None):
+        self.location = location
+        self.lease = lease
+        self.interval = interval or lease / 3
+        self.lost = set()
+        self._held = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="work-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def hold(self, items):
+        with self._lock:
+            for item in items:
+                self._held[item["id"]] = item
+
+    def release(self, item):
+        with self._lock:
+            self._held.pop(item["id"], None)
+
+    def _run(self):
+        table = open_work_table(self.location)
+        try:
+            while not self._stop.wait(self.interval):
+                with self._lock:
+                    held = list(self._held.values())
+                for item in held:
+                    if not table.renew(item, self.lease):
+                        self.lost.add(item["id"])
+        finally:
+            table.close()
+
+
+def run_worker(location, source_path, out_dir, worker=None, lease=DEFAULT_LEASE,
+               claim=DEFAULT_CLAIM, max_attempts=DEFAULT_MAX_ATTEMPTS, theme=DEFAULT_THEME,
+               cache_dir=None, follow=False, poll=DEFAULT_POLL):
+    """Claim, render and complete work items from the table at location until none are left.
+
+    Items another worker holds count as left, so this waits for their
+    leases to complete or expire. With follow it never stops and picks up
+    items as they are enqueued. Returns {"done", "failed", "lost"} counts
+    for this worker.
+    """
+    worker = worker or worker_name()
+    sink = DirectorySink(out_dir)
+    counts = {"done": 0, "failed": 0, "lost": 0}
+    table = open_work_table(location)
+    try:
+        with Heartbeat(location, lease) as heartbeat:
+            while True:
+                items = table.claim(worker, claim, lease, max_attempts)
+                if not items:
+                    remaining = table.counts()
+                    if not follow and not remaining["pending"] and not remaining["leased"]:
+                        return counts
+                    time.sleep(poll)
+                    continue
+                heartbeat.hold(items)
+                for item in items:
+                    try:
+                        name, data = render_item(item, source_path, theme, cache_dir)
+                    except Exception as exc:
+                        heartbeat.release(item)
+                        if table.fail(item, f"{type(exc).__name__}: {exc}", max_attempts):
+                            counts["failed"] += 1
+                        else:
+                            counts["lost"] += 1
+                        continue
+                    heartbeat.release(item)
+                    try:
+                        if item["id"] in heartbeat.lost:
+                            raise _LeaseLost
+                        with sink.open(name) as f:
+                            f.write(data)
+                            # Still a temp file: a reclaimed item is someone else's to publish
+                            if not table.complete(item, name):
+                                raise _LeaseLost
+                    except _LeaseLost:
+                        counts["lost"] += 1
+                    else:
+                        counts["done"] += 1
+    finally:
+        table.close()
+
+
+def run_workers(location, source_path, out_dir, workers=None, **options):
+    """run_worker() in workers warm processes of this host; their counts, summed.
+
+    workers=1 runs in this process. options are run_worker()'s.
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    if workers == 1:
+        return run_worker(location, source_path, out_dir, **options)
+    totals = {"done": 0, "failed": 0, "lost": 0}
+    with warm_pool(workers, themes=(options.get("theme", DEFAULT_THEME),)) as pool:
+        futures = [
+            pool.submit(run_worker, location, source_path, out_dir, **options)
+            for _ in range(workers)
+        ]
+        for future in futures:
+            for status, n in future.result().items():
+                totals[status] += n
+    return totals
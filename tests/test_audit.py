@@ -0,0 +1,166 @@
+"""audit() on a small source with one discrepancy of each kind seeded into it."""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+from reports.audit import CHECKS, audit, render_audit
+from reports.sinks import MemorySink
+from reports.sources import TABLES, create_schema, open_source
+
+
+def _payout(pid, venue_id, start, end, total, fee=None, net=None, status="completed"):
+    fee = round(total * 0.05) if fee is None else fee
+    return {
+        "id": pid, "venue_id": venue_id, "period_start": f"{start}T00:00:00Z",
+        "period_end": f"{end}T00:00:00Z", "total_amount": total, "platform_fee": fee,
+        "net_amount": total - fee if net is None else net, "status": status,
+    }
+
+
+def _tips(venue_id, day, amounts, status="succeeded"):
+    return [
+        {"id": f"t-{venue_id}-{day}-{i}-{status}", "venue_id": venue_id, "amount": amount,
+         "status": status, "created_at": f"{day}T{10 + i:02d}:00:00Z"}
+        for i, amount in enumerate(amounts)
+    ]
+
+
+def _distribution(did, payout_id, employee_id, amount, status="completed"):
+    return {
+        "id": did, "payout_id": payout_id, "employee_id": employee_id, "amount": amount,
+        "days_active": 7, "total_period_days": 7, "status": status,
+    }
+
+
+def seeded_tables():
+    """Two venues, every check failing exactly where noted."""
+    return {
+        "venues": [{"id": "v1", "name": "Harbour Bar"}, {"id": "v2", "name": "Corner Cafe"}],
+        "employees": [
+            {"id": "e1", "venue_id": "v1", "name": "Ana"},
+            {"id": "e2", "venue_id": "v1", "name": "Ben"},
+            {"id": "e3", "venue_id": "v2", "name": "Cal"},
+        ],
+        "payouts": [
+            # Correct: 2000 in tips, fee 100, split between two employees
+            _payout("ok", "v1", "2024-01-01", "2024-01-07", 2000),
+            # fee: 4% taken, net still total less the recorded fee
+            _payout("fee", "v1", "2024-01-08", "2024-01-14", 1000, fee=40),
+            # distributions: paid out 10 cents short
+            _payout("short", "v1", "2024-01-15", "2024-01-21", 1000),
+            # tips: the period's tips add up to 1500, not 1000
+            _payout("tips", "v2", "2024-01-01", "2024-01-07", 1000),
+            # double_payment: overlaps "tips" and pays Cal again
+            _payout("again", "v2", "2024-01-05", "2024-01-11", 400),
+            # distributions: completed, but nobody was paid
+            _payout("unpaid", "v2", "2024-01-12", "2024-01-18", 200),
+            # Not split yet, so no distributions is fine
+            _payout("pending", "v2", "2024-01-19", "2024-01-25", 0, status="pending"),
+        ],
+        "payout_distributions": [
+            _distribution("d1", "ok", "e1", 950),
+            _distribution("d2", "ok", "e2", 950),
+            _distribution("d3", "fee", "e1", 960),
+            _distribution("d4", "short", "e1", 475),
+            _distribution("d5", "short", "e2", 465),
+            _distribution("d6", "tips", "e3", 950),
+            _distribution("d7", "again", "e3", 380),
+            # A failed transfer isn't a payment
+            _distribution("d8", "ok", "e3", 0, status="failed"),
+        ],
+        "tips": (
+            _tips("v1", "2024-01-03", [500, 1500])
+            + _tips("v1", "2024-01-10", [1000])
+            + _tips("v1", "2024-01-21", [1000])
+            + _tips("v2", "2024-01-02", [1000, 500])
+            + _tips("v2", "2024-01-09", [400])
+            + _tips("v2", "2024-01-12", [200])
+            # Neither counts towards a total
+            + _tips("v1", "2024-01-03", [999], status="failed")
+            + _tips("v2", "2024-02-01", [999])
+        ),
+    }
+
+
+def _write_json(tables, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(tables, f)
+
+
+def _write_sqlite(tables, path):
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    for name in TABLES:
+        for row in tables.get(name, []):
+            conn.execute(
+                f"INSERT INTO {name} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                list(row.values()),
+            )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def source_path(request, tmp_path):
+    path = os.path.join(tmp_path, f"source.{request.param}")
+    (_write_json if request.param == "json" else _write_sqlite)(seeded_tables(), path)
+    return path
+
+
+def _found(result):
+    return {
+        check: [(d["payout_id"], d["expected"], d["found"]) for d in found]
+        for check, found in result.discrepancies.items()
+    }
+
+
+def test_audit_flags_exactly_the_seeded_discrepancies(source_path):
+    source = open_source(source_path)
+    try:
+        result = audit(source)
+    finally:
+        source.close()
+    assert _found(result) == {
+        "tips": [("tips", 1500, 1000)],
+        "fee": [("fee", 50, 40), ("fee", 950, 960)],
+        "distributions": [("short", 950, 940), ("unpaid", 190, 0)],
+        "double_payment": [("again", None, 380)],
+    }
+    assert result.total == 6
+    assert result.discrepancies["double_payment"][0]["detail"] == (
+        "Cal, also paid by tips (2024-01-01..2024-01-07)"
+    )
+    assert result.counts == {"venues": 2, "payouts": 7, "distributions": 8, "tips": 8}
+
+
+def test_audit_date_range(source_path):
+    source = open_source(source_path)
+    try:
+        result = audit(source, start="2024-01-08", end="2024-01-14")
+    finally:
+        source.close()
+    # Payouts are picked by period_end: "fee" and "again" are in, so Cal is only paid once
+    assert _found(result) == {
+        "tips": [], "fee": [("fee", 50, 40), ("fee", 950, 960)], "distributions": [],
+        "double_payment": [],
+    }
+    assert result.counts["payouts"] == 2
+
+
+def test_clean_source_has_no_discrepancies(tmp_path):
+    tables = seeded_tables()
+    keep = {"ok", "pending"}
+    tables["payouts"] = [p for p in tables["payouts"] if p["id"] in keep]
+    tables["payout_distributions"] = [
+        d for d in tables["payout_distributions"] if d["payout_id"] in keep
+    ]
+    path = os.path.join(tmp_path, "clean.json")
+    _write_json(tables, path)
+    sink = MemorySink()
+    result = render_audit(path, sink, "audit.pdf")
+    assert result.total == 0
+    assert set(result.discrepancies) == set(CHECKS)
+    assert sink.getvalue("audit.pdf").startswith(b"%PDF")
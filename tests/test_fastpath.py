@@ -0,0 +1,78 @@
+"""The canvas fast path: same text and pages as platypus, and instrumented like it."""
+
+import io
+import os
+
+import pytest
+
+from reports.batch import build_jobs
+from reports.bench import generate_dataset
+from reports.fastpath import draw_statement, simple
+from reports.sections import WRITE_SECTION, BuildMetrics
+from reports.sources import SQLiteSource, period_bounds
+from reports.statements import build_statement, iter_story, statement_doc
+from reports.story import StreamingStory
+
+fitz = pytest.importorskip("pymupdf")
+
+
+@pytest.fixture(scope="module")
+def statement(tmp_path_factory):
+    """(job, tips) of a one-venue statement with a ledger over several pages."""
+    path = os.path.join(tmp_path_factory.mktemp("fastpath"), "tips.db")
+    generate_dataset(path, 300, 1)
+    source = SQLiteSource(path)
+    [job] = build_jobs(source)
+    start, end = period_bounds(job["payout"])
+    tips = list(source.iter_tips(job["payout"]["venue_id"], start, end))
+    # Characters a PDF string escapes, and some outside ASCII
+    names = ["Jo (bar)", "back\\slash", "Zoë", "plain"]
+    tips = [dict(tip, tipper_name=names[i % len(names)]) for i, tip in enumerate(tips)]
+    source.close()
+    return job, tips
+
+
+def _words(data):
+    return [
+        [(w[4], round(w[0], 1), round(w[1], 1)) for w in page.get_text("words")]
+        for page in fitz.open(stream=data, filetype="pdf")
+    ]
+
+
+def test_fastpath_places_text_as_platypus_does(statement):
+    job, tips = statement
+    assert simple(job)
+    platypus = io.BytesIO()
+    doc = statement_doc(job, platypus)
+    doc.build(StreamingStory(iter_story(job, doc.width, tips)))
+    fast = io.BytesIO()
+    draw_statement(job, fast, tips)
+
+    expected, found = _words(platypus.getvalue()), _words(fast.getvalue())
+    assert len(found) == len(expected) > 1
+    for page_expected, page_found in zip(expected, found):
+        assert [w[0] for w in page_found] == [w[0] for w in page_expected]
+        for (_, x0, y0), (_, x1, y1) in zip(page_expected, page_found):
+            assert abs(x0 - x1) <= 0.15 and abs(y0 - y1) <= 0.15
+
+
+def test_metrics_instrument_the_fastpath(statement):
+    job, tips = statement
+    plain, instrumented = io.BytesIO(), io.BytesIO()
+    build_statement(job, plain, tips)
+    metrics = BuildMetrics(profile={"Tip Ledger"})
+    build_statement(job, instrumented, tips, metrics=metrics)
+
+    assert instrumented.getvalue() == plain.getvalue()
+    result = metrics.as_dict()
+    assert result["renderer"] == "fastpath"
+    assert result["bytes"] == len(plain.getvalue())
+    sections = {s["name"]: s for s in result["sections"]}
+    assert list(sections) == [
+        "Header", "Summary", "Employee Distributions", "Charts", "Tip Ledger", "Footer",
+        WRITE_SECTION,
+    ]
+    assert sections["Tip Ledger"]["pages"] > 1
+    assert sections["Tip Ledger"]["last_page"] == result["pages"]
+    assert all(s["seconds"] > 0 for s in sections.values())
+    assert list(metrics.profiles) == ["Tip Ledger"]
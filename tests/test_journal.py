@@ -0,0 +1,149 @@
+"""Journal checkpoints and resuming a batch run that died part way through."""
+
+import os
+
+import pytest
+
+from reports.batch import run_journalled
+from reports.journal import JOURNAL_NAME, Journal
+
+
+class Crash(Exception):
+    """Stands in for the process being killed mid-run."""
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def fake_render(jobs, previous, out_dir, log, crash_at=None, failing=()):
+    """A render_chunk() writing each job's key into its file and skipping confirmed keys."""
+    results = []
+    for job, prev in zip(jobs, previous):
+        path = os.path.join(out_dir, job["name"])
+        if job["name"] == crash_at:
+            raise Crash(job["name"])
+        log.append((job["name"], prev))
+        if job["name"] in failing:
+            results.append((path, None, "failed: bad data", None))
+        elif prev == job["key"]:
+            results.append((path, job["key"], "skipped", None))
+        else:
+            _write(path, job["key"].encode())
+            results.append((path, job["key"], "rendered", None))
+    return results
+
+
+def _run(out_dir, jobs, log, manifest=None, **kwargs):
+    names = [job["name"] for job in jobs]
+    render_kwargs = {k: kwargs.pop(k) for k in ("crash_at", "failing") if k in kwargs}
+    return run_journalled(
+        jobs, names, lambda *a: fake_render(*a, **render_kwargs), (out_dir, log),
+        manifest or {}, workers=1, **kwargs,
+    )
+
+
+def test_resume_key_only_for_an_unchanged_finished_file(tmp_path):
+    out = str(tmp_path)
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        _write(os.path.join(out, name), name.encode())
+    with Journal(out) as journal:
+        journal.record([
+            (os.path.join(out, "a.pdf"), "ka", "rendered", None),
+            (os.path.join(out, "b.pdf"), "kb", "rendered", None),
+            (os.path.join(out, "c.pdf"), "kc", "rendered", None),
+            (os.path.join(out, "d.pdf"), None, "failed: boom", None),
+        ])
+
+    # Reopened, as the next run after a crash would
+    _write(os.path.join(out, "b.pdf"), b"changed")
+    os.remove(os.path.join(out, "c.pdf"))
+    with Journal(out) as journal:
+        assert journal.resume_key(os.path.join(out, "a.pdf")) == "ka"
+        assert journal.resume_key(os.path.join(out, "b.pdf")) is None
+        assert journal.resume_key(os.path.join(out, "c.pdf")) is None
+        assert journal.resume_key(os.path.join(out, "d.pdf")) is None
+        assert journal.resume_key(os.path.join(out, "e.pdf")) is None
+        assert [e["name"] for e in journal.failed()] == ["d.pdf"]
+        assert journal.entry("d.pdf")["error"] == "boom"
+
+
+def test_attempts_count_across_runs(tmp_path):
+    out = str(tmp_path)
+    failure = [(os.path.join(out, "d.pdf"), None, "failed: boom", None)]
+    for attempt in (1, 2, 3):
+        with Journal(out) as journal:
+            journal.record(failure)
+        with Journal(out) as journal:
+            assert journal.attempts("d.pdf") == attempt
+    with Journal(out) as journal:
+        assert journal.exhausted("d.pdf", max_attempts=3)
+        assert journal.retry_failed() == 1
+        assert not journal.exhausted("d.pdf", max_attempts=3)
+    with Journal(out) as journal:
+        assert journal.attempts("d.pdf") == 0
+
+    # Rendering it at last clears the error
+    _write(os.path.join(out, "d.pdf"), b"d")
+    with Journal(out) as journal:
+        journal.record([(os.path.join(out, "d.pdf"), "kd", "rendered", None)])
+    with Journal(out) as journal:
+        assert journal.failed() == []
+        assert journal.resume_key(os.path.join(out, "d.pdf")) == "kd"
+
+
+def test_run_resumes_after_a_crash(tmp_path):
+    out = str(tmp_path)
+    jobs = [{"name": f"s{i}.pdf", "key": f"k{i}"} for i in range(4)]
+
+    log = []
+    with pytest.raises(Crash):
+        _run(out, jobs, log, crash_at="s2.pdf")
+    assert log == [("s0.pdf", None), ("s1.pdf", None)]
+
+    # The finished statements resume with their keys; only the rest render
+    log = []
+    results = _run(out, jobs, log)
+    assert log == [("s0.pdf", "k0"), ("s1.pdf", "k1"), ("s2.pdf", None), ("s3.pdf", None)]
+    assert [r[2] for r in results] == ["skipped", "skipped", "rendered", "rendered"]
+
+
+def test_run_falls_back_to_the_manifest_and_rerenders_changed_files(tmp_path):
+    out = str(tmp_path)
+    jobs = [{"name": f"s{i}.pdf", "key": f"k{i}"} for i in range(3)]
+    _run(out, jobs, [])
+    _write(os.path.join(out, "s1.pdf"), b"truncated")
+    os.remove(os.path.join(out, JOURNAL_NAME))
+
+    # No journal: the manifest's keys are handed on as they are
+    log = []
+    _run(out, jobs, log, manifest={"s0.pdf": "k0"})
+    assert log == [("s0.pdf", "k0"), ("s1.pdf", None), ("s2.pdf", None)]
+
+    # A journalled file that changed on disk is rendered again
+    _write(os.path.join(out, "s1.pdf"), b"truncated")
+    log = []
+    _run(out, jobs, log)
+    assert log == [("s0.pdf", "k0"), ("s1.pdf", None), ("s2.pdf", "k2")]
+
+
+def test_run_gives_up_after_max_attempts(tmp_path):
+    out = str(tmp_path)
+    jobs = [{"name": "ok.pdf", "key": "k"}, {"name": "bad.pdf", "key": "kb"}]
+
+    log = []
+    results = _run(out, jobs, log, failing={"bad.pdf"}, max_attempts=2)
+    # Retried once within the run, then held back
+    assert [name for name, _prev in log] == ["ok.pdf", "bad.pdf", "bad.pdf"]
+    assert results[1][2] == "failed: bad data"
+
+    log = []
+    results = _run(out, jobs, log, failing={"bad.pdf"}, max_attempts=2)
+    assert [name for name, _prev in log] == ["ok.pdf"]
+    assert results[1][2] == "failed: gave up after 2 attempts (bad data)"
+
+    log = []
+    results = _run(out, jobs, log, max_attempts=2, retry_failed=True)
+    assert log == [("ok.pdf", "k"), ("bad.pdf", None)]
+    assert [r[2] for r in results] == ["skipped", "rendered"]
@@ -0,0 +1,133 @@
+"""split_fee, days_active, prorate and reconcile against the edge functions' arithmetic.
+
+process-payout and auto-payout share the same fee and proration code;
+js_payout() below is a line-by-line port of it, one payout at a time.
+"""
+
+import math
+import random
+
+from reports.payouts import (
+    MS_PER_DAY, days_active, js_round, prorate, reconcile, split_fee, to_epoch_ms,
+)
+
+
+def js_math_round(x):
+    return math.floor(x + 0.5)
+
+
+def js_payout(total, period_start, period_end, employees):
+    """(platform_fee, net_amount, [(days_active, amount)]) as the edge functions compute them.
+
+    employees is a list of (activated_at, deactivated_at or None) in epoch ms.
+    """
+    platform_fee = js_math_round(total * 0.05)
+    net_amount = total - platform_fee
+    total_period_days = max(1, math.ceil((period_end - period_start) / MS_PER_DAY) + 1)
+    rows = []
+    for activated, deactivated in employees:
+        start = max(activated, period_start)
+        end = deactivated if deactivated is not None and deactivated < period_end else period_end
+        rows.append(max(1, math.ceil((end - start) / MS_PER_DAY) + 1))
+    total_days = sum(rows)
+    amounts = [js_math_round(net_amount * (days / total_days)) for days in rows]
+    if amounts:
+        amounts[0] += net_amount - sum(amounts)
+    return platform_fee, net_amount, total_period_days, list(zip(rows, amounts))
+
+
+def test_js_round_rounds_halves_up():
+    assert js_round([0.5, 1.5, 2.5, -0.5, -1.5, 2.4999]).tolist() == [1, 2, 3, 0, -1, 2]
+
+
+def test_split_fee_matches_edge_functions():
+    totals = [0, 1, 10, 30, 50, 70, 9271, 18611, 75606]
+    fee, net = split_fee(totals)
+    assert fee.tolist() == [0, 0, 1, 2, 3, 4, 464, 931, 3780]
+    assert net.tolist() == [0, 1, 9, 28, 47, 66, 8807, 17680, 71826]
+    for total, f, n in zip(totals, fee, net):
+        assert (f, n) == js_payout(total, 0, 0, [])[:2]
+
+
+def test_days_and_shares_match_edge_functions():
+    rng = random.Random(7)
+    day = MS_PER_DAY
+    for _ in range(200):
+        start = to_epoch_ms([f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"])[0]
+        end = start + rng.randint(0, 30) * day + rng.choice([0, day - 1, 12345])
+        employees = []
+        for _ in range(rng.randint(1, 8)):
+            activated = start + rng.randint(-10, 20) * day + rng.randint(0, day - 1)
+            deactivated = rng.choice([None, activated + rng.randint(0, 40) * day])
+            employees.append((activated, deactivated))
+        total = rng.randint(0, 500000)
+
+        fee, net, total_period_days, rows = js_payout(total, start, end, employees)
+        got_fee, got_net = split_fee([total])
+        days, period_days = days_active(
+            [start], [end],
+            [a for a, _d in employees], [-1 if d is None else d for _a, d in employees],
+            [0] * len(employees),
+        )
+        shares = prorate(got_net, days, [0] * len(employees))
+        assert (got_fee[0], got_net[0]) == (fee, net)
+        assert period_days.tolist() == [total_period_days] * len(employees)
+        assert list(zip(days.tolist(), shares.tolist())) == rows
+        assert shares.sum() == net
+
+
+def test_prorate_many_payouts_at_once():
+    # Two payouts interleaved: each keeps its own remainder on its own first row
+    net = [8807, 100]
+    days = [7, 3, 7, 3, 7, 7, 7]
+    index = [0, 1, 0, 1, 0, 0, 0]
+    assert prorate(net, days, index).tolist() == [1763, 50, 1761, 50, 1761, 1761, 1761]
+
+
+def _payout(pid, total, fee=None, net=None):
+    expected_fee, expected_net = js_payout(total, 0, 0, [])[:2]
+    return {
+        "id": pid, "total_amount": total,
+        "platform_fee": expected_fee if fee is None else fee,
+        "net_amount": expected_net if net is None else net,
+    }
+
+
+def _distributions(pid, amounts, days=7):
+    return [{"payout_id": pid, "amount": a, "days_active": days} for a in amounts]
+
+
+def test_reconcile_accepts_edge_function_output():
+    payouts = [_payout("p1", 9271), _payout("p2", 18611), _payout("p3", 500)]
+    distributions = (
+        _distributions("p1", [1763, 1761, 1761, 1761, 1761])
+        # The remainder may sit on any one row: the original order isn't stored
+        + _distributions("p2", [5893, 5893, 5894])
+    )
+    assert reconcile(payouts, distributions) == {"p1": [], "p2": [], "p3": []}
+
+
+def test_reconcile_flags_each_discrepancy():
+    payouts = [
+        _payout("fee", 18611, fee=930, net=17681),
+        _payout("net", 18611, net=17000),
+        _payout("sum", 9271),
+        _payout("split", 9271),
+    ]
+    distributions = (
+        _distributions("fee", [17681])
+        + _distributions("net", [17000])
+        + _distributions("sum", [1763, 1761, 1761, 1761, 1760])
+        + _distributions("split", [1762, 1762, 1761, 1761, 1761])
+    )
+    issues = reconcile(payouts, distributions)
+    assert issues["fee"] == [
+        "platform_fee 930 != 931 (5% of 18611)", "net_amount 17681 != 17680",
+    ]
+    # Distributions are checked against the stored net_amount, which they do split
+    assert issues["net"] == ["net_amount 17000 != 17680"]
+    assert issues["sum"] == [
+        "distributions sum to 8806, net_amount is 8807",
+        "distribution amounts don't match the days-active split",
+    ]
+    assert issues["split"] == ["distribution amounts don't match the days-active split"]
@@ -0,0 +1,91 @@
+"""StatementService coalescing and backpressure, with a thread pool for the renderers."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from reports import service
+from reports.service import ServiceBusy, StatementService
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Renders block until gate.set(); each returns "<venue> <period>" and is logged."""
+    gate = threading.Event()
+    gate.rendered = []
+
+    def render(source_path, venue_id, period_start, theme=None, cache_dir=None, job=None):
+        gate.wait(5)
+        gate.rendered.append((venue_id, period_start))
+        return f"{venue_id} {period_start}".encode()
+
+    monkeypatch.setattr(service, "render_statement", render)
+    monkeypatch.setattr(service, "warm_pool", lambda workers, themes: ThreadPoolExecutor(workers))
+    return gate
+
+
+async def _until(condition):
+    while not condition():
+        await asyncio.sleep(0.001)
+
+
+def test_identical_requests_share_one_render(gate):
+    async def main():
+        async with StatementService("unused.db", workers=1) as svc:
+            first = asyncio.create_task(svc.statement("v1", "2026-02-09"))
+            second = asyncio.create_task(svc.statement("v1", "2026-02-09T00:00:00Z"))
+            await asyncio.sleep(0.01)
+            gate.set()
+            assert await first == await second == b"v1 2026-02-09"
+            assert svc.metrics()["coalesced"] == 1
+
+    asyncio.run(main())
+    assert gate.rendered == [("v1", "2026-02-09")]
+
+
+def test_full_queue_rejects(gate):
+    async def main():
+        async with StatementService("unused.db", workers=1, queue_size=1) as svc:
+            running = asyncio.create_task(svc.statement("v1", "2026-02-09"))
+            await _until(lambda: svc.metrics()["queue_depth"] == 0 and svc.metrics()["in_flight"])
+            queued = asyncio.create_task(svc.statement("v2", "2026-02-09"))
+            await _until(lambda: svc.metrics()["queue_depth"] == 1)
+            with pytest.raises(ServiceBusy):
+                await svc.statement("v3", "2026-02-09")
+            assert svc.metrics()["rejected"] == 1
+            gate.set()
+            await asyncio.gather(running, queued)
+            assert await svc.statement("v3", "2026-02-09") == b"v3 2026-02-09"
+
+    asyncio.run(main())
+
+
+def test_request_cancelled_while_waiting_for_space_is_forgotten(gate):
+    async def main():
+        async with StatementService("unused.db", workers=1, queue_size=1, enqueue_timeout=5) as svc:
+            running = asyncio.create_task(svc.statement("v1", "2026-02-09"))
+            await _until(lambda: svc.metrics()["queue_depth"] == 0 and svc.metrics()["in_flight"])
+            queued = asyncio.create_task(svc.statement("v2", "2026-02-09"))
+            await _until(lambda: svc.metrics()["queue_depth"] == 1)
+
+            # A client that disconnects while its request waits for a queue slot
+            abandoned = asyncio.create_task(svc.statement("v3", "2026-02-09"))
+            coalesced = asyncio.create_task(svc.statement("v3", "2026-02-09"))
+            await _until(lambda: svc.metrics()["coalesced"] == 1)
+            abandoned.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await abandoned
+            with pytest.raises(asyncio.CancelledError):
+                await coalesced
+            assert svc.metrics()["in_flight"] == 2
+
+            gate.set()
+            await asyncio.gather(running, queued)
+            # A later request renders afresh instead of waiting on the abandoned one
+            result = await asyncio.wait_for(svc.statement("v3", "2026-02-09"), 5)
+            assert result == b"v3 2026-02-09"
+
+    asyncio.run(main())
+    assert gate.rendered.count(("v3", "2026-02-09")) == 1
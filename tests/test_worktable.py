@@ -0,0 +1,153 @@
+"""WorkTable leases: expiry, reclaiming, and a lost lease's writes being refused."""
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+from reports import worktable
+from reports.bench import generate_dataset
+from reports.sources import SQLiteSource
+from reports.worktable import enqueue_statements, open_work_table, render_item, run_worker
+
+
+@pytest.fixture
+def table(tmp_path):
+    with open_work_table(os.path.join(tmp_path, "work.sqlite")) as table:
+        yield table
+
+
+def test_enqueue_is_idempotent(table):
+    items = [("statement", "v1", "2024-01-01"), ("activity", "v1", "2024")]
+    assert table.enqueue(items, now=0) == 2
+    assert table.enqueue(items, now=1) == 0
+    assert table.counts()["pending"] == 2
+    with pytest.raises(ValueError):
+        table.enqueue([("invoice", "v1", "2024")])
+
+
+def test_claim_renew_complete(table):
+    table.enqueue([("statement", "v1", "2024-01-01"), ("statement", "v2", "2024-01-01")], now=0)
+    first = table.claim("a", limit=1, lease=60, now=0)
+    assert [(i["venue_id"], i["attempts"]) for i in first] == [("v1", 1)]
+    second = table.claim("b", limit=5, lease=60, now=1)
+    assert [i["venue_id"] for i in second] == ["v2"]
+    # Both are held, so there's nothing left to claim
+    assert table.claim("c", now=2) == []
+
+    # Renewing keeps the lease past its original expiry
+    assert table.renew(first[0], lease=60, now=50)
+    [reclaimed] = table.claim("c", now=100)
+    assert (reclaimed["id"], reclaimed["attempts"]) == (second[0]["id"], 2)
+    assert table.complete(first[0], "out/v1.pdf", now=105)
+    assert table.counts()["done"] == 1
+    assert table.completed_by() == {"a": 1}
+
+
+def test_expired_lease_is_reclaimed_and_the_old_holder_loses_it(table):
+    table.enqueue([("statement", "v1", "2024-01-01")], now=0)
+    [stale] = table.claim("a", lease=60, now=0)
+
+    # a stalls past its lease; b picks the item up
+    assert table.claim("b", lease=60, now=30) == []
+    [fresh] = table.claim("b", lease=60, now=61)
+    assert fresh["id"] == stale["id"]
+    assert fresh["lease_token"] != stale["lease_token"]
+    assert fresh["attempts"] == 2
+
+    # a wakes up: none of its writes land
+    assert not table.renew(stale, now=62)
+    assert not table.complete(stale, "out/a.pdf", now=62)
+    assert not table.fail(stale, "boom")
+    assert table.counts()["leased"] == 1
+
+    assert table.renew(fresh, now=90)
+    assert table.complete(fresh, "out/b.pdf", now=95)
+    assert not table.complete(fresh, "out/b.pdf", now=96)
+    assert table.completed_by() == {"b": 1}
+
+
+def test_expired_lease_out_of_attempts_fails(table):
+    table.enqueue([("statement", "v1", "2024-01-01")], now=0)
+    now = 0
+    for attempt in (1, 2):
+        [item] = table.claim("a", lease=10, max_attempts=2, now=now)
+        assert item["attempts"] == attempt
+        now += 11
+    # The second lease expired too, with no attempts left
+    assert table.claim("a", lease=10, max_attempts=2, now=now) == []
+    assert table.failures() == [("statement", "v1", "2024-01-01", 2, "lease expired")]
+    assert not table.complete(item, "out/v1.pdf", now=now)
+
+    assert table.retry_failed() == 1
+    [item] = table.claim("a", lease=10, max_attempts=2, now=now)
+    assert item["attempts"] == 1
+
+
+def test_fail_releases_until_out_of_attempts(table):
+    table.enqueue([("activity", "v1", "2024")], now=0)
+    [item] = table.claim("a", now=0)
+    assert table.fail(item, "boom", max_attempts=2)
+    assert table.counts()["pending"] == 1
+    [item] = table.claim("a", now=1)
+    assert table.fail(item, "boom again", max_attempts=2)
+    assert table.failures() == [("activity", "v1", "2024", 2, "boom again")]
+
+
+@pytest.fixture
+def statements_db(tmp_path):
+    path = os.path.join(tmp_path, "tips.db")
+    generate_dataset(path, 40, 2)
+    return path
+
+
+def test_worker_renders_and_completes(tmp_path, statements_db):
+    location = os.path.join(tmp_path, "work.sqlite")
+    out = os.path.join(tmp_path, "out")
+    with open_work_table(location) as table:
+        assert enqueue_statements(table, SQLiteSource(statements_db)) == 2
+    counts = run_worker(location, statements_db, out, worker="w", poll=0.01)
+    assert counts == {"done": 2, "failed": 0, "lost": 0}
+    assert len([f for f in os.listdir(out) if f.endswith(".pdf")]) == 2
+
+
+def test_worker_that_lost_its_lease_publishes_nothing(tmp_path, statements_db, monkeypatch):
+    location = os.path.join(tmp_path, "work.sqlite")
+    out = os.path.join(tmp_path, "out")
+    with open_work_table(location) as table:
+        enqueue_statements(table, SQLiteSource(statements_db))
+    render = worktable.render_item
+    stalled = []
+
+    def stall(item, *args):
+        if not stalled:
+            # The first item is reclaimed and finished elsewhere while this worker renders it
+            with open_work_table(location) as other:
+                [taken] = other.claim("other", limit=1, now=time.time() + 3600)
+                assert taken["id"] == item["id"]
+                assert other.complete(taken, "elsewhere.pdf")
+            stalled.append(item)
+        return render(item, *args)
+
+    monkeypatch.setattr(worktable, "render_item", stall)
+    counts = run_worker(location, statements_db, out, worker="w", claim=1, poll=0.01)
+    assert counts == {"done": 1, "failed": 0, "lost": 1}
+    with open_work_table(location) as table:
+        assert table.completed_by() == {"other": 1, "w": 1}
+    # Only the item this worker completed was published, and no temp file was left
+    name, _data = render(stalled[0], statements_db)
+    published = os.listdir(out)
+    assert len(published) == 1 and name not in published
+
+
+def test_render_item_reads_current_data(statements_db):
+    item = {"kind": "statement", "venue_id": "venue-00000", "period": "2026-02-01"}
+    name, before = render_item(item, statements_db)
+    conn = sqlite3.connect(statements_db)
+    conn.execute("UPDATE payout_distributions SET status = 'failed' WHERE payout_id = 'payout-00000'")
+    conn.commit()
+    conn.close()
+    assert render_item(item, statements_db) != (name, before)
+    with pytest.raises(LookupError):
+        render_item(dict(item, period="2027-01-01"), statements_db)